@@ -0,0 +1,32 @@
+import string
+
+import numpy as np
+from unidecode import unidecode
+
+ALPHABET = string.ascii_lowercase
+MOD = 26
+
+# Frequência das letras no português (%)
+FREQ_PT = {
+    'a': 14.63, 'e': 12.57, 'o': 10.73, 's': 7.81, 'r': 6.53, 'i': 6.18,
+    'n': 5.05, 'd': 4.99, 'm': 4.74, 'u': 4.63, 't': 4.34, 'c': 3.88,
+    'l': 2.78, 'p': 2.52, 'v': 1.67, 'g': 1.30, 'h': 1.28, 'q': 1.20,
+    'b': 1.04, 'f': 1.02, 'z': 0.47, 'j': 0.40, 'x': 0.21, 'k': 0.02,
+    'w': 0.01, 'y': 0.01
+}
+
+
+def texto_para_array(texto):
+    # mesma normalização do GeraEP1.parse: minúsculas, sem acentos, só letras
+    texto = unidecode(texto.lower())
+    return np.array([ord(c) - ord('a') for c in texto if c in ALPHABET], dtype=np.int32)
+
+
+def texto_para_blocos(texto, k):
+    """Blocos (n, k) do texto para a cifra de Hill, completando o último com 'a' (padding)."""
+    nums = texto_para_array(texto)
+    return np.append(nums, np.zeros(-len(nums) % k, dtype=nums.dtype)).reshape(-1, k)
+
+
+def array_para_texto(numeros):
+    return ''.join(ALPHABET[n] for n in numeros)
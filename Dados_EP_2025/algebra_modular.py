@@ -0,0 +1,172 @@
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+
+from alfabeto import MOD
+
+# Álgebra linear inteira mod 26 para as chaves de Hill. Tudo em aritmética exata: nada de
+# np.linalg.det, que erra o arredondamento em matrizes 5x5 com entradas grandes.
+# Como 26 = 2 * 13, as versões em lote trabalham mod 2 e mod 13 (corpos, onde a eliminação
+# de Gauss vale) e juntam os resultados pelo teorema chinês do resto.
+
+# Inverso multiplicativo de cada resíduo (0 quando não existe)
+INVERSOS_26 = np.array([pow(x, -1, MOD) if gcd(x, MOD) == 1 else 0 for x in range(MOD)])
+INVERSOS_P = {p: np.array([pow(x, -1, p) if x else 0 for x in range(p)], dtype=np.int16) for p in (2, 13)}
+
+
+def inverso_mod(a, mod=MOD):
+    """Inverso de `a` mod `mod`, ou None se não existir."""
+    if mod == MOD:
+        inverso = int(INVERSOS_26[a % MOD])
+        return inverso or None
+    return pow(a, -1, mod) if gcd(a, mod) == 1 else None
+
+
+def juntar_2_13(x2, x13):
+    # teorema chinês do resto: o único valor mod 26 com esses restos mod 2 e mod 13
+    return (x13 + 13 * ((x2 - x13) % 2)) % MOD
+
+
+def det_mod(matriz, mod=MOD):
+    """Determinante inteiro exato (Bareiss) reduzido mod `mod`."""
+    m = [[int(x) for x in linha] for linha in matriz]
+    n = len(m)
+    sinal = 1
+    anterior = 1
+    for c in range(n - 1):
+        if m[c][c] == 0:
+            troca = next((r for r in range(c + 1, n) if m[r][c] != 0), None)
+            if troca is None:
+                return 0
+            m[c], m[troca] = m[troca], m[c]
+            sinal = -sinal
+        for r in range(c + 1, n):
+            for j in range(c + 1, n):
+                m[r][j] = (m[r][j] * m[c][c] - m[r][c] * m[c][j]) // anterior
+        anterior = m[c][c]
+    return (sinal * m[n - 1][n - 1]) % mod
+
+
+def posto_mod(matriz, p):
+    m = [[int(x) % p for x in linha] for linha in matriz]
+    posto = 0
+    for c in range(len(m[0])):
+        piv = next((r for r in range(posto, len(m)) if m[r][c]), None)
+        if piv is None:
+            continue
+        m[posto], m[piv] = m[piv], m[posto]
+        inv = pow(m[posto][c], -1, p)
+        for r in range(len(m)):
+            if r != posto and m[r][c]:
+                f = m[r][c] * inv
+                m[r] = [(x - f * y) % p for x, y in zip(m[r], m[posto])]
+        posto += 1
+    return posto
+
+
+def det_mod_p_lote(A, p):
+    """Determinantes mod p (p primo) de um lote (N, k, k), por eliminação com troca de linhas."""
+    M = (np.asarray(A) % p).astype(np.int16)
+    N, k, _ = M.shape
+    det = np.ones(N, dtype=np.int64)
+    todos = np.arange(N)
+    inversos = INVERSOS_P[p]
+
+    for c in range(k):
+        nao_nulos = M[:, c:, c] != 0
+        piv = c + nao_nulos.argmax(axis=1)
+        trocadas = piv != c
+        det[trocadas] = -det[trocadas]
+
+        linha_c = M[todos, c].copy()
+        M[todos, c] = M[todos, piv]
+        M[todos, piv] = linha_c
+
+        pivos = M[:, c, c]
+        det = (det * pivos) % p  # pivô nulo (coluna sem pivô) zera o determinante
+        M[:, c] = (M[:, c] * inversos[pivos][:, None]) % p
+        fator = M[:, c + 1:, c].copy()
+        M[:, c + 1:] = (M[:, c + 1:] - fator[:, :, None] * M[:, None, c]) % p
+    return det
+
+
+def det_mod_26_lote(A):
+    return juntar_2_13(det_mod_p_lote(A, 2), det_mod_p_lote(A, 13))
+
+
+def adjunta_mod_26_lote(A):
+    """Adjuntas mod 26 de um lote (N, k, k), invertível ou não: adj[j, i] = (-1)^(i+j) menor(i, j)."""
+    A = np.asarray(A)
+    N, k, _ = A.shape
+    adj = np.zeros((N, k, k), dtype=np.int64)
+    if k == 1:
+        adj[:] = 1
+        return adj
+    for i in range(k):
+        for j in range(k):
+            menores = np.delete(np.delete(A, i, axis=1), j, axis=2)
+            adj[:, j, i] = ((-1) ** (i + j) * det_mod_26_lote(menores)) % MOD
+    return adj
+
+
+def resolver_mod_p(A, B, p):
+    """Resolve em lote os sistemas A X = B mod p (p primo) por eliminação de Gauss-Jordan.
+
+    A: (N, k, k), B: (N, k, r). Retorna X (N, k, r) e uma máscara dos sistemas com solução única.
+    """
+    M = (np.concatenate([A, B], axis=2) % p).astype(np.int16)
+    N, k, _ = M.shape
+    ok = np.ones(N, dtype=bool)
+    todos = np.arange(N)
+    inversos = INVERSOS_P[p]
+
+    for c in range(k):
+        nao_nulos = M[:, c:, c] != 0
+        ok &= nao_nulos.any(axis=1)
+        piv = c + nao_nulos.argmax(axis=1)
+
+        linha_c = M[todos, c].copy()
+        M[todos, c] = M[todos, piv]
+        M[todos, piv] = linha_c
+
+        M[:, c] = (M[:, c] * inversos[M[:, c, c]][:, None]) % p
+        fator = M[:, :, c].copy()
+        fator[:, c] = 0
+        M = (M - fator[:, :, None] * M[:, None, c]) % p
+
+    return M[:, :, k:].astype(np.int64), ok
+
+
+def resolver_mod_26(A, B):
+    # Resolve mod 2 e mod 13 separadamente e junta pelo teorema chinês do resto
+    X2, ok2 = resolver_mod_p(A, B, 2)
+    X13, ok13 = resolver_mod_p(A, B, 13)
+    return juntar_2_13(X2, X13), ok2 & ok13
+
+
+def inversas_mod_26_lote(A):
+    """Inversas de um lote (N, k, k) e a máscara das que existem (as outras ficam com lixo)."""
+    A = np.asarray(A)
+    identidades = np.broadcast_to(np.eye(A.shape[1], dtype=np.int64), A.shape)
+    return resolver_mod_26(A, identidades)
+
+
+@lru_cache(maxsize=4096)
+def _inversa_em_cache(entradas, k):
+    inversa, ok = inversas_mod_26_lote(np.array(entradas, dtype=np.int64).reshape(1, k, k))
+    if not ok[0]:
+        return None
+    inversa = inversa[0]
+    inversa.setflags(write=False)
+    return inversa
+
+
+def inversa_mod_26(matriz):
+    """Inversa de uma matriz k x k mod 26, ou None se não existir.
+
+    Guardada em cache por chave: decifrar várias vezes com a mesma chave não refaz a conta.
+    O array devolvido é somente leitura.
+    """
+    matriz = np.asarray(matriz)
+    return _inversa_em_cache(tuple(int(x) % MOD for x in matriz.ravel()), len(matriz))
@@ -0,0 +1,143 @@
+import numpy as np
+
+from alfabeto import MOD
+
+# Autômato de Aho-Corasick do vocabulário, guardado como um dict de arrays:
+# - transicoes[estado, letra]: próximo estado (DFA completo, já com os links de falha)
+# - filhos[estado, letra]: aresta da trie (-1 se não existe), para o maior prefixo
+# - fim[estado]: id da palavra que termina exatamente no estado (-1 se nenhuma)
+# - saida[estado]: próximo estado no caminho de falha com fim >= 0 (-1 se nenhum)
+# - peso_total[estado]: soma dos pesos de todas as palavras reconhecidas ao chegar nele
+# - vocabulario: palavra -> peso, como foi compilado
+
+
+def compilar_automato(vocabulario):
+    """Compila o vocabulário (dict palavra -> peso, ou iterável de palavras com peso 1)."""
+    if not isinstance(vocabulario, dict):
+        vocabulario = {palavra: 1 for palavra in vocabulario}
+
+    palavras, pesos = [], []
+    filhos = [[-1] * MOD]
+    fim = [-1]
+    for palavra, peso in vocabulario.items():
+        letras = [ord(c) - ord('a') for c in palavra.lower()]
+        if not letras or any(not 0 <= c < MOD for c in letras):
+            continue
+        estado = 0
+        for c in letras:
+            if filhos[estado][c] < 0:
+                filhos[estado][c] = len(filhos)
+                filhos.append([-1] * MOD)
+                fim.append(-1)
+            estado = filhos[estado][c]
+        if fim[estado] < 0:
+            fim[estado] = len(palavras)
+            palavras.append(palavra)
+            pesos.append(peso)
+        else:
+            pesos[fim[estado]] = max(pesos[fim[estado]], peso)  # mesma palavra com caixa diferente
+
+    filhos = np.array(filhos, dtype=np.int32)
+    fim = np.array(fim, dtype=np.int32)
+    pesos = np.array(pesos, dtype=np.float64)
+    n_estados = len(filhos)
+
+    transicoes = np.zeros((n_estados, MOD), dtype=np.int32)
+    falha = np.zeros(n_estados, dtype=np.int32)
+    saida = np.full(n_estados, -1, dtype=np.int32)
+    peso_total = np.zeros(n_estados)
+    peso_total[fim >= 0] = pesos[fim[fim >= 0]]
+
+    # BFS por nível: o estado de falha de um nó é sempre mais raso, então já está pronto
+    transicoes[0] = np.maximum(filhos[0], 0)
+    nivel = filhos[0][filhos[0] >= 0]
+    while len(nivel):
+        pela_falha = transicoes[falha[nivel]]  # (len(nivel), 26)
+        filhos_nivel = filhos[nivel]
+        transicoes[nivel] = np.where(filhos_nivel >= 0, filhos_nivel, pela_falha)
+
+        pais, letras = np.nonzero(filhos_nivel >= 0)
+        proximos = filhos_nivel[pais, letras]
+        falha[proximos] = pela_falha[pais, letras]
+        f = falha[proximos]
+        saida[proximos] = np.where(fim[f] >= 0, f, saida[f])
+        peso_total[proximos] += peso_total[f]
+        nivel = proximos
+
+    for array in (transicoes, filhos, fim, saida, peso_total):
+        array.setflags(write=False)
+    return {
+        'palavras': palavras,
+        'pesos': pesos,
+        'vocabulario': dict(zip(palavras, pesos.tolist())),
+        'transicoes': transicoes,
+        'filhos': filhos,
+        'fim': fim,
+        'saida': saida,
+        'peso_total': peso_total,
+    }
+
+
+def indices_letras(texto):
+    # letras -> 0..25; qualquer outro caractere vira -1 e reinicia o autômato
+    indices = np.frombuffer(texto.lower().encode('ascii', 'replace'), dtype=np.uint8).astype(np.int32) - ord('a')
+    indices[(indices < 0) | (indices >= MOD)] = -1
+    return indices.tolist()
+
+
+def ocorrencias(automato, texto):
+    """Todas as ocorrências de palavras do vocabulário no texto, em uma passada: (início, id da palavra)."""
+    transicoes, fim, saida = automato['transicoes'], automato['fim'], automato['saida']
+    palavras = automato['palavras']
+    encontradas = []
+    estado = 0
+    for i, c in enumerate(indices_letras(texto)):
+        if c < 0:
+            estado = 0
+            continue
+        estado = int(transicoes[estado, c])
+        atual = estado if fim[estado] >= 0 else int(saida[estado])
+        while atual >= 0:
+            palavra = int(fim[atual])
+            encontradas.append((i + 1 - len(palavras[palavra]), palavra))
+            atual = int(saida[atual])
+    return encontradas
+
+
+def palavras_encontradas(automato, texto):
+    return {automato['palavras'][palavra] for _, palavra in ocorrencias(automato, texto)}
+
+
+def pontuar(automato, texto):
+    """Soma dos pesos das palavras distintas presentes no texto."""
+    pesos = automato['pesos']
+    return float(sum(pesos[palavra] for palavra in {p for _, p in ocorrencias(automato, texto)}))
+
+
+def pontuar_lote(automato, textos):
+    """Soma dos pesos de todas as ocorrências (com repetição) para um lote (m, n) de textos 0..25."""
+    transicoes, peso_total = automato['transicoes'], automato['peso_total']
+    estados = np.zeros(len(textos), dtype=np.int32)
+    scores = np.zeros(len(textos))
+    for coluna in np.asarray(textos).T:
+        estados = transicoes[estados, coluna]
+        scores += peso_total[estados]
+    return scores
+
+
+def maior_prefixo(automato, texto, inicio, min_len=1, max_len=None):
+    """Maior palavra do vocabulário que começa em `inicio` (só pela trie), ou None."""
+    filhos, fim, palavras = automato['filhos'], automato['fim'], automato['palavras']
+    fim_texto = len(texto) if max_len is None else min(len(texto), inicio + max_len)
+    estado = 0
+    melhor = None
+    for i in range(inicio, fim_texto):
+        c = ord(texto[i].lower()) - ord('a')
+        if not 0 <= c < MOD:
+            break
+        estado = int(filhos[estado, c])
+        if estado < 0:
+            break
+        if fim[estado] >= 0 and i + 1 - inicio >= min_len:
+            melhor = palavras[fim[estado]]
+    return melhor
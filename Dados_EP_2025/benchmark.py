@@ -0,0 +1,440 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from alfabeto import array_para_texto, texto_para_array
+from hill_linhas import quebrar_hill_por_linhas
+from hill_subida import quebrar_hill_por_subida
+from hill_texto_conhecido import quebrar_cifrado
+from hill_triangular import quebrar_hill_triangular
+from hill_vetorizado import chaves_invertiveis_2x2, quebrar_hill_2x2
+from isomorfos import indice_do_corpus, quebrar_mono_por_padroes
+from modelo_ngramas import modelo_do_corpus
+from origem_corpus import localizar_vigenere
+from processar_lote import descobrir_tarefas
+from reinicios_paralelos import anelamento_paralelo
+from segmentacao import carregar_vocabulario_com_frequencia
+from vigenere import quebrar_vigenere_em_feixe
+from vigenere_arrasto import preparar_arrasto, quebrar_vigenere_por_arrasto
+
+# Mede a velocidade e a taxa de acerto de cada quebrador contra amostras com gabarito: o
+# lote do GeraEP1 (--lote, .npz + manifesto) ou a árvore Cifrado/ + Aberto/ do save_file.
+# Cada amostra é cortada nos tamanhos pedidos (prefixos; múltiplos de k no Hill), e cada
+# execução é acrescentada a <saida>/historico.jsonl para comparar com as anteriores.
+# A memória de pico (tracemalloc, só o processo principal) vem de uma execução extra da
+# primeira amostra de cada grupo, para não pesar nos tempos.
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+
+
+def carregar_script(relativo):
+    """Importa um script de textos_* pelo caminho (os nomes têm hífen e se repetem entre as pastas)."""
+    pasta, arquivo = os.path.split(relativo)
+    nome = 'bench_' + (pasta + '_' + os.path.splitext(arquivo)[0]).replace('-', '_')
+    if nome not in sys.modules:
+        spec = importlib.util.spec_from_file_location(nome, os.path.join(AQUI, relativo))
+        modulo = importlib.util.module_from_spec(spec)
+        sys.modules[nome] = modulo  # o Pool do 3x3 acha o trabalhador pelo nome do módulo
+        spec.loader.exec_module(modulo)
+    return sys.modules[nome]
+
+
+# --- amostras ------------------------------------------------------------------------------
+
+def _cifra_e_k(conjunto):
+    cifra, _, k = conjunto.partition('_')
+    return cifra, int(k) if k else None
+
+
+def amostras_do_lote(caminho_npz, conjuntos=None, quantidade=None):
+    """Amostras do lote do GeraEP1: dicts com conjunto, cifra, k, id, aberto e cifrado (texto)."""
+    dados = np.load(caminho_npz)
+    nomes = sorted({chave.rsplit('_', 1)[0] for chave in dados.files if chave.endswith('_cifrado')})
+    amostras = []
+    for conjunto in nomes:
+        if conjuntos and conjunto not in conjuntos:
+            continue
+        cifra, k = _cifra_e_k(conjunto)
+        abertos, cifrados = dados[conjunto + '_aberto'], dados[conjunto + '_cifrado']
+        for i in range(len(cifrados) if quantidade is None else min(quantidade, len(cifrados))):
+            amostras.append({'conjunto': conjunto, 'cifra': cifra, 'k': k, 'id': f'{conjunto}[{i}]',
+                             'aberto': array_para_texto(abertos[i]), 'cifrado': array_para_texto(cifrados[i])})
+    return amostras
+
+
+def amostras_da_arvore(raiz, conjuntos=None, quantidade=None):
+    """Amostras de raiz/Cifrado com o texto claro correspondente em raiz/Aberto (as sem gabarito são puladas)."""
+    amostras = []
+    por_conjunto = {}
+    for tarefa in descobrir_tarefas(raiz):
+        cifra = tarefa['cifra'].lower()
+        conjunto = cifra if tarefa['k'] is None else f"{cifra}_{tarefa['k']}"
+        if conjuntos and conjunto not in conjuntos:
+            continue
+        aberto = os.path.join(raiz, tarefa['arquivo'].replace('Cifrado', 'Aberto', 1)
+                              .replace('_texto_cifrado.txt', '_texto_aberto.txt'))
+        if not os.path.exists(aberto) or (quantidade is not None and por_conjunto.get(conjunto, 0) >= quantidade):
+            continue
+        por_conjunto[conjunto] = por_conjunto.get(conjunto, 0) + 1
+        with open(os.path.join(raiz, tarefa['arquivo']), 'r') as f:
+            cifrado = array_para_texto(texto_para_array(f.read()))
+        with open(aberto, 'r') as f:
+            aberto = array_para_texto(texto_para_array(f.read()))
+        amostras.append({'conjunto': conjunto, 'cifra': cifra, 'k': tarefa['k'], 'id': tarefa['arquivo'],
+                         'aberto': aberto, 'cifrado': cifrado})
+    return amostras
+
+
+def cortar(amostra, tamanho):
+    """A amostra reduzida aos primeiros `tamanho` caracteres (None se ela for menor)."""
+    if amostra['cifra'] == 'hill':
+        tamanho -= tamanho % amostra['k']
+    if tamanho <= 0 or tamanho > len(amostra['cifrado']):
+        return None
+    return dict(amostra, aberto=amostra['aberto'][:tamanho], cifrado=amostra['cifrado'][:tamanho])
+
+
+# --- quebradores ---------------------------------------------------------------------------
+# Cada um recebe (cifrado, k, contexto) e devolve (texto decifrado, nº de chaves testadas ou None).
+
+def _em_cache(contexto, nome, criar):
+    if nome not in contexto:
+        contexto[nome] = criar()
+    return contexto[nome]
+
+
+def _vocabulario(contexto):
+    return _em_cache(contexto, 'vocabulario',
+                     lambda: carregar_vocabulario_com_frequencia(contexto['corpus'], contexto['encoding']))
+
+
+def _hill_2x2(cifrado, k, contexto):
+    n_chaves = _em_cache(contexto, 'n_chaves_2x2', lambda: len(chaves_invertiveis_2x2()[0]))
+    _, _, texto = quebrar_hill_2x2(cifrado, contexto['tabelas'][1], top=1)[0]
+    return texto, n_chaves
+
+
+def _hill_linhas(cifrado, k, contexto):
+    _, _, texto = quebrar_hill_por_linhas(cifrado, k, contexto['tabelas'][1], top=1)[0]
+    return texto, None
+
+
+def _hill_subida(cifrado, k, contexto):
+    _, _, texto = quebrar_hill_por_subida(cifrado, k, contexto['tabelas'][1], top=1, semente=contexto['semente'])[0]
+    return texto, None
+
+
+def _hill_triangular(cifrado, k, contexto):
+    _, _, texto = quebrar_hill_triangular(cifrado, k, contexto['tabelas'][1], top=1,
+                                          tabela_final=contexto['tabelas'][3])[0]
+    return texto, None
+
+
+def _ler_corpus(contexto):
+    with open(contexto['corpus'], 'r', encoding=contexto['encoding']) as f:
+        return texto_para_array(f.read())
+
+
+def _hill_texto_conhecido(cifrado, k, contexto):
+    crib = _em_cache(contexto, 'crib', lambda: _ler_corpus(contexto))
+    resultado = quebrar_cifrado(cifrado, crib, k)
+    return (resultado[2] if resultado else ''), None
+
+
+def _hill_busca_3x3(cifrado, k, contexto):
+    script = carregar_script(os.path.join('textos_desconhecidos', 'Descriptografia-hill-3x3.py'))
+    # mesmos pesos de script.carregar_vocabulario, a partir das palavras do corpus
+    vocabulario = _em_cache(contexto, 'vocabulario_3x3', lambda: {
+        p.lower(): min(len(p) ** 2, 100) for p in _vocabulario(contexto) if len(p) >= 4})
+    resultados = script.busca_inteligente(cifrado, vocabulario, num_chaves=contexto['chaves_busca'],
+                                          num_processos=contexto['processos'], top=1)
+    return (resultados[0][2] if resultados else ''), contexto['chaves_busca']
+
+
+def _hill_vocab_4x4(cifrado, k, contexto):
+    script = carregar_script(os.path.join('textos_conhecidos', 'Descriptografia4x4-5x5.py'))
+    # o registro de chaves testadas vai para um diretório descartável, para não deixar
+    # arquivos de cada amostra no diretório atual
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.chdir(diretorio)
+        try:
+            _, texto = script.break_hill_with_vocab(cifrado, _vocabulario(contexto), contexto['tabelas'],
+                                                    max_matrices=contexto['chaves_busca'])
+        finally:
+            os.chdir(anterior)
+    return texto, contexto['chaves_busca']
+
+
+def _vigenere_feixe(cifrado, k, contexto):
+    _, _, texto = quebrar_vigenere_em_feixe(cifrado, k, contexto['tabelas'], top=1)[0]
+    return texto, None
+
+
+def _vigenere_arrasto(cifrado, k, contexto):
+    arrasto = _em_cache(contexto, 'arrasto', lambda: preparar_arrasto(_vocabulario(contexto)))
+    _, _, texto = quebrar_vigenere_por_arrasto(cifrado, k, contexto['tabelas'], arrasto, top=1)[0]
+    return texto, None
+
+
+def _vigenere_texto_conhecido(cifrado, k, contexto):
+    crib = _em_cache(contexto, 'crib', lambda: _ler_corpus(contexto))
+    encontradas = localizar_vigenere(cifrado, crib, k)
+    if not encontradas:
+        return '', None
+    posicao, _ = encontradas[0]
+    return array_para_texto(crib[posicao:posicao + len(texto_para_array(cifrado))]), None
+
+
+def _vigenere_vocab(cifrado, k, contexto):
+    script = carregar_script(os.path.join('textos_conhecidos', 'Descriptografia-vigenere-20.py'))
+    vocabulario = _em_cache(contexto, 'vocabulario_vigenere',
+                            lambda: script.carregar_vocabulario_arquivo(contexto['corpus']))
+    _, _, texto = script.quebrar_vigenere(cifrado, vocabulario, contexto['tabelas'], key_len=k, top=1)[0]
+    return texto, None
+
+
+def _mono_anelamento(cifrado, k, contexto):
+    melhor = anelamento_paralelo(cifrado, contexto['tabelas'][1:3], n_processos=contexto['processos'],
+                                 top=1, semente=contexto['semente'])[0]
+    return melhor['texto'], None
+
+
+def _mono_padroes(cifrado, k, contexto):
+    indice = _em_cache(contexto, 'isomorfos', lambda: indice_do_corpus(contexto['corpus'], contexto['encoding']))
+    return quebrar_mono_por_padroes(cifrado, indice, contexto['tabelas'][1:4], top=1)[0]['texto'], None
+
+
+def _mono_sa_conhecido(cifrado, k, contexto):
+    script = carregar_script(os.path.join('textos_conhecidos', 'Descriptografia-monoalfabetica.py'))
+    random.seed(contexto['semente'])
+    chave, _ = script.simulated_annealing(cifrado, contexto['tabelas'][1], contexto['tabelas'][2])
+    return script.decifra(cifrado, chave), None
+
+
+def _mono_sa_desconhecido(cifrado, k, contexto):
+    script = carregar_script(os.path.join('textos_desconhecidos', 'Descriptografia-monoalfabetica.py'))
+    automato = _em_cache(contexto, 'automato_mono',
+                         lambda: script.automato_segmentacao({p.lower() for p in _vocabulario(contexto)}))
+    chave = script.simulated_annealing(cifrado, automato, contexto['tabelas'][1], seed=contexto['semente'])
+    return script.decodificar(cifrado, chave), None
+
+
+# nome: (cifra, tamanhos de chave aceitos ou None para todos, função)
+QUEBRADORES = {
+    'hill_2x2': ('hill', (2,), _hill_2x2),
+    'hill_linhas': ('hill', None, _hill_linhas),
+    'hill_subida': ('hill', None, _hill_subida),
+    'hill_triangular': ('hill', None, _hill_triangular),
+    'hill_texto_conhecido': ('hill', None, _hill_texto_conhecido),
+    'hill_busca_3x3': ('hill', (3,), _hill_busca_3x3),
+    'hill_vocab_4x4': ('hill', (4,), _hill_vocab_4x4),
+    'vigenere_feixe': ('vigenere', None, _vigenere_feixe),
+    'vigenere_vocab': ('vigenere', None, _vigenere_vocab),
+    'vigenere_arrasto': ('vigenere', (40, 60), _vigenere_arrasto),
+    'vigenere_texto_conhecido': ('vigenere', None, _vigenere_texto_conhecido),
+    'mono_anelamento': ('mono', None, _mono_anelamento),
+    'mono_padroes': ('mono', None, _mono_padroes),
+    'mono_sa_conhecido': ('mono', None, _mono_sa_conhecido),
+    'mono_sa_desconhecido': ('mono', None, _mono_sa_desconhecido),
+}
+PADRAO_QUEBRADORES = ('hill_2x2', 'hill_linhas', 'vigenere_feixe', 'mono_anelamento')
+
+
+def aceita(nome, amostra):
+    cifra, ks, _ = QUEBRADORES[nome]
+    return cifra == amostra['cifra'] and (ks is None or amostra['k'] in ks)
+
+
+# --- medição -------------------------------------------------------------------------------
+
+def acerto(aberto, texto):
+    """Fração das letras do texto claro recuperadas na posição certa."""
+    esperado = texto_para_array(aberto)
+    obtido = texto_para_array(texto or '')[:len(esperado)]
+    if not len(esperado):
+        return 0.0
+    return float((obtido == esperado[:len(obtido)]).sum() / len(esperado))
+
+
+def executar(nome, amostra, contexto, medir_memoria=False):
+    """Roda um quebrador numa amostra, em silêncio; erros viram um campo do resultado."""
+    funcao = QUEBRADORES[nome][2]
+    resultado = {'quebrador': nome, 'conjunto': amostra['conjunto'], 'tamanho': len(amostra['cifrado']),
+                 'id': amostra['id'], 'erro': None}
+    if medir_memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    texto, chaves = '', None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            texto, chaves = funcao(amostra['cifrado'], amostra['k'], contexto)
+    except Exception as erro:
+        resultado['erro'] = f'{type(erro).__name__}: {erro}'
+    resultado['tempo'] = time.perf_counter() - inicio
+    if medir_memoria:
+        resultado['pico_memoria'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    resultado['chaves'] = chaves
+    resultado['acerto'] = acerto(amostra['aberto'], texto)
+    resultado['sucesso'] = resultado['acerto'] == 1.0
+    return resultado
+
+
+def resumir(execucoes, memoria):
+    """Uma linha por (quebrador, conjunto, tamanho) com as médias das execuções."""
+    grupos = {}
+    for r in execucoes:
+        grupos.setdefault((r['quebrador'], r['conjunto'], r['tamanho']), []).append(r)
+    resumo = []
+    for (quebrador, conjunto, tamanho), rs in sorted(grupos.items()):
+        tempos = [r['tempo'] for r in rs]
+        acertos = [r['tempo'] for r in rs if r['sucesso']]
+        chaves = [r['chaves'] for r in rs if r['chaves'] is not None]
+        resumo.append({
+            'quebrador': quebrador,
+            'conjunto': conjunto,
+            'tamanho': tamanho,
+            'amostras': len(rs),
+            'erros': sum(r['erro'] is not None for r in rs),
+            'taxa_sucesso': sum(r['sucesso'] for r in rs) / len(rs),
+            'acerto_medio': float(np.mean([r['acerto'] for r in rs])),
+            'tempo_medio': float(np.mean(tempos)),
+            'tempo_ate_acerto': float(np.mean(acertos)) if acertos else None,
+            'chaves_por_s': sum(chaves) / sum(tempos) if chaves and sum(tempos) > 0 else None,
+            'pico_memoria_mb': memoria.get((quebrador, conjunto, tamanho), 0) / 2 ** 20 or None,
+        })
+    return resumo
+
+
+def rodar(amostras, quebradores, tamanhos, contexto, medir_memoria=True):
+    """Roda cada quebrador em cada amostra compatível, em cada tamanho; devolve (execuções, resumo)."""
+    execucoes = []
+    memoria = {}
+    for nome in quebradores:
+        for tamanho in tamanhos:
+            cortadas = [c for c in (cortar(a, tamanho) for a in amostras if aceita(nome, a)) if c]
+            for i, amostra in enumerate(cortadas, 1):
+                resultado = executar(nome, amostra, contexto)
+                execucoes.append(resultado)
+                situacao = resultado['erro'] or ('ok' if resultado['sucesso'] else f"{resultado['acerto']:.0%}")
+                print(f"[{nome} | {amostra['conjunto']} | {len(amostra['cifrado'])}] {i}/{len(cortadas)} "
+                      f"{amostra['id']} ({resultado['tempo']:.2f}s) {situacao}")
+            if not medir_memoria:
+                continue
+            primeiras = {}
+            for amostra in cortadas:
+                primeiras.setdefault((nome, amostra['conjunto'], len(amostra['cifrado'])), amostra)
+            for grupo, amostra in primeiras.items():
+                memoria[grupo] = executar(nome, amostra, contexto, medir_memoria=True)['pico_memoria']
+    return execucoes, resumir(execucoes, memoria)
+
+
+# --- histórico -----------------------------------------------------------------------------
+
+def versao_do_codigo():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=AQUI, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def carregar_historico(caminho):
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, 'r') as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def salvar_execucao(saida, parametros, execucoes, resumo):
+    """Acrescenta o resumo a saida/historico.jsonl e grava as execuções em saida/<data>.json."""
+    os.makedirs(saida, exist_ok=True)
+    data = datetime.now().strftime('%Y%m%d-%H%M%S')
+    registro = {'data': data, 'commit': versao_do_codigo(), 'python': platform.python_version(),
+                'maquina': platform.node(), 'parametros': parametros, 'grupos': resumo}
+    with open(os.path.join(saida, data + '.json'), 'w') as f:
+        json.dump(dict(registro, execucoes=execucoes), f, ensure_ascii=False, indent=2)
+    with open(os.path.join(saida, 'historico.jsonl'), 'a') as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+    return registro
+
+
+def _formatar(valor, formato):
+    return '-' if valor is None else format(valor, formato)
+
+
+def comparar(anterior, atual):
+    """Tabela com os grupos da execução atual e a variação de cada um em relação à anterior."""
+    antes = {(g['quebrador'], g['conjunto'], g['tamanho']): g for g in anterior['grupos']} if anterior else {}
+    linhas = [f"{'quebrador':<26}{'conjunto':<13}{'tam':>5}{'sucesso':>9}{'Δ':>7}{'tempo(s)':>10}{'Δ%':>7}"
+              f"{'chaves/s':>11}{'mem(MB)':>9}"]
+    for g in atual['grupos']:
+        a = antes.get((g['quebrador'], g['conjunto'], g['tamanho']))
+        delta_sucesso = None if a is None else 100 * (g['taxa_sucesso'] - a['taxa_sucesso'])
+        delta_tempo = None if a is None or not a['tempo_medio'] else 100 * (g['tempo_medio'] / a['tempo_medio'] - 1)
+        linhas.append(f"{g['quebrador']:<26}{g['conjunto']:<13}{g['tamanho']:>5}"
+                      f"{g['taxa_sucesso']:>9.0%}{_formatar(delta_sucesso, '+.0f'):>7}"
+                      f"{g['tempo_medio']:>10.3f}{_formatar(delta_tempo, '+.0f'):>7}"
+                      f"{_formatar(g['chaves_por_s'], '.0f'):>11}{_formatar(g['pico_memoria_mb'], '.1f'):>9}")
+    return '\n'.join(linhas)
+
+
+if __name__ == "__main__":
+    # Uso: python benchmark.py lote.npz textos_conhecidos/avesso_da_pele.txt --amostras 5 --tamanhos 60 120
+    parser = argparse.ArgumentParser(description='Mede velocidade e taxa de acerto dos quebradores.')
+    parser.add_argument('amostras', help='lote .npz do GeraEP1 --lote, ou raiz com Cifrado/ e Aberto/')
+    parser.add_argument('corpus', help='corpus do modelo de n-gramas, do vocabulário e do crib')
+    parser.add_argument('--encoding', default='latin-1')
+    parser.add_argument('--quebradores', nargs='+', choices=sorted(QUEBRADORES), default=list(PADRAO_QUEBRADORES))
+    parser.add_argument('--conjuntos', nargs='+', help='ex.: mono hill_2 vigenere_20 (padrão: todos)')
+    parser.add_argument('--quantidade', type=int, default=10, help='amostras por conjunto')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[120])
+    parser.add_argument('--chaves-busca', type=int, default=20000,
+                        help='chaves por amostra em hill_busca_3x3 (em ordem) e hill_vocab_4x4 (sorteadas)')
+    parser.add_argument('--processos', type=int, default=1,
+                        help='processos dos quebradores paralelos (com 1, tudo entra na medição de memória)')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--sem-memoria', action='store_true', help='pula a execução extra com tracemalloc')
+    parser.add_argument('--saida', default='resultados_benchmark')
+    parser.add_argument('--comparar', action='store_true',
+                        help='só compara as duas últimas execuções do histórico, sem rodar nada')
+    args = parser.parse_args()
+
+    historico = carregar_historico(os.path.join(args.saida, 'historico.jsonl'))
+    if args.comparar:
+        if not historico:
+            sys.exit(f"Nenhuma execução em {args.saida}")
+        print(comparar(historico[-2] if len(historico) > 1 else None, historico[-1]))
+        sys.exit()
+
+    if args.amostras.endswith('.npz'):
+        amostras = amostras_do_lote(args.amostras, args.conjuntos, args.quantidade)
+    else:
+        amostras = amostras_da_arvore(args.amostras, args.conjuntos, args.quantidade)
+    contexto = {'corpus': args.corpus, 'encoding': args.encoding,
+                'tabelas': modelo_do_corpus(args.corpus, encoding=args.encoding),
+                'processos': args.processos, 'chaves_busca': args.chaves_busca, 'semente': args.semente}
+    parametros = {'amostras': args.amostras, 'corpus': args.corpus, 'quantidade': args.quantidade,
+                  'tamanhos': args.tamanhos, 'chaves_busca': args.chaves_busca,
+                  'processos': args.processos, 'semente': args.semente}
+
+    execucoes, resumo = rodar(amostras, args.quebradores, args.tamanhos, contexto, not args.sem_memoria)
+    registro = salvar_execucao(args.saida, parametros, execucoes, resumo)
+    # compara com a última execução de mesmos parâmetros, se houver
+    anteriores = [r for r in historico if r['parametros'] == parametros]
+    print()
+    print(comparar(anteriores[-1] if anteriores else None, registro))
@@ -0,0 +1,110 @@
+import hashlib
+import math
+import os
+import struct
+
+import numpy as np
+
+from alfabeto import MOD, texto_para_array
+
+# Registro das chaves de Hill já testadas para um cifrado: um filtro de Bloom num arquivo
+# mapeado em memória. Abrir custa o mesmo com 10 ou 10 milhões de chaves registradas, e
+# consultar ou registrar um lote é só aritmética vetorizada sobre os bits.
+# Formato: cabeçalho ('KBLM', versão, k, nº de hashes, nº de bits) seguido dos bits.
+MAGICO = b'KBLM'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sIIIQ')
+
+
+def etiqueta(ciphertext):
+    """Identificador do cifrado: uma chave ruim só é ruim para o cifrado em que foi testada."""
+    letras = bytes(texto_para_array(ciphertext).astype(np.uint8))
+    return hashlib.sha1(letras).hexdigest()[:16]
+
+
+def empacotar(chaves):
+    """Cada matriz k x k mod 26 vira dois inteiros de 64 bits (metades da representação em base 26)."""
+    chaves = np.asarray(chaves, dtype=np.uint64)
+    digitos = chaves.reshape(len(chaves), -1) % MOD
+    metade = digitos.shape[1] // 2  # até 13 dígitos por metade: 26^13 < 2^64
+    pesos_alto = (MOD ** np.arange(metade)).astype(np.uint64)
+    pesos_baixo = (MOD ** np.arange(digitos.shape[1] - metade)).astype(np.uint64)
+    return digitos[:, :metade] @ pesos_alto, digitos[:, metade:] @ pesos_baixo
+
+
+def _misturar(x):
+    # splitmix64
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _posicoes(registro, chaves):
+    # hashing duplo: posição i = a + i*b (mod nº de bits), i = 0..n_hashes-1
+    alto, baixo = empacotar(chaves)
+    a = _misturar(baixo ^ _misturar(alto))
+    b = _misturar(a ^ np.uint64(registro['k'])) | np.uint64(1)
+    i = np.arange(registro['n_hashes'], dtype=np.uint64)
+    return (a[:, None] + i[None, :] * b[:, None]) % np.uint64(registro['n_bits'])
+
+
+def abrir_registro(diretorio, ciphertext, k, capacidade=10_000_000, taxa_falsos=1e-3):
+    """Abre (ou cria) o registro de chaves k x k testadas para o cifrado.
+
+    O tamanho é fixado na criação para `capacidade` chaves com `taxa_falsos` de falsos
+    positivos (uma chave nova tomada por testada); não há falsos negativos.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, f'{etiqueta(ciphertext)}_{k}.bloom')
+    if not os.path.exists(caminho):
+        n_bits = math.ceil(-capacidade * math.log(taxa_falsos) / math.log(2) ** 2)
+        n_bits = -(-n_bits // 8) * 8
+        n_hashes = max(1, round(n_bits / capacidade * math.log(2)))
+        with open(caminho, 'wb') as f:
+            f.write(CABECALHO.pack(MAGICO, VERSAO, k, n_hashes, n_bits))
+            f.truncate(CABECALHO.size + n_bits // 8)  # arquivo esparso: só zeros
+
+    with open(caminho, 'rb') as f:
+        magico, versao, k_arquivo, n_hashes, n_bits = CABECALHO.unpack(f.read(CABECALHO.size))
+    if magico != MAGICO or versao != VERSAO or k_arquivo != k:
+        raise ValueError(f"{caminho} não é um registro de chaves {k}x{k} válido")
+    return {
+        'caminho': caminho,
+        'k': k,
+        'n_hashes': n_hashes,
+        'n_bits': n_bits,
+        'bits': np.memmap(caminho, dtype=np.uint8, mode='r+', offset=CABECALHO.size, shape=(n_bits // 8,)),
+    }
+
+
+def contem(registro, chaves):
+    """Máscara das chaves (m, k, k) que já foram registradas."""
+    if len(chaves) == 0:
+        return np.zeros(0, dtype=bool)
+    posicoes = _posicoes(registro, chaves)
+    bytes_ = registro['bits'][(posicoes >> np.uint64(3)).astype(np.int64)]
+    mascaras = np.left_shift(1, (posicoes & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+    return ((bytes_ & mascaras) != 0).all(axis=1)
+
+
+def adicionar(registro, chaves):
+    """Registra um lote de chaves; a escrita em disco fica a cargo do mmap (ver fechar)."""
+    if len(chaves) == 0:
+        return
+    posicoes = _posicoes(registro, chaves).ravel()
+    mascaras = np.left_shift(1, (posicoes & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+    np.bitwise_or.at(registro['bits'], (posicoes >> np.uint64(3)).astype(np.int64), mascaras)
+
+
+def registrar_boas(registro, chaves):
+    """Guarda à parte, em texto e numa única escrita, as poucas chaves que pontuaram."""
+    if len(chaves) == 0:
+        return
+    caminho = os.path.splitext(registro['caminho'])[0] + '.boas'
+    with open(caminho, 'a') as f:
+        f.writelines(','.join(map(str, np.asarray(chave).ravel())) + '\n' for chave in chaves)
+
+
+def fechar(registro):
+    registro['bits'].flush()
@@ -0,0 +1,159 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from alfabeto import MOD
+
+# Enumeração exaustiva das chaves k x k invertíveis mod 26, em ordem fixa.
+# A posição de uma matriz é o número em base 26 formado pelas entradas lidas linha a linha
+# (a entrada [0, 0] é o dígito mais significativo), de 0 a 26^(k*k) - 1. As posições são
+# inteiros do Python: 26^16 já não cabe em 64 bits.
+# A matriz é montada linha a linha e cada nova linha tem de ser independente das anteriores
+# mod 2 e mod 13 (invertível mod 26 = posto cheio nos dois primos). Um prefixo que já perdeu
+# posto é descartado inteiro, com todas as matrizes que começariam por ele; as que chegam à
+# última linha são exatamente as invertíveis, sem nenhum teste de determinante depois.
+
+PRIMOS = (2, 13)
+
+
+def tamanho_espaco(k):
+    return MOD ** (k * k)
+
+
+def fatia(k, indice, total):
+    """Intervalo [inicio, fim) de posições do trabalhador `indice` entre `total`, sem sobreposição."""
+    n = tamanho_espaco(k)
+    return n * indice // total, n * (indice + 1) // total
+
+
+def posicao(matriz):
+    """Posição de uma matriz na enumeração (para retomar logo depois dela)."""
+    valor = 0
+    for entrada in np.asarray(matriz).ravel():
+        valor = valor * MOD + int(entrada) % MOD
+    return valor
+
+
+@lru_cache(maxsize=None)
+def _todas_linhas(k):
+    # as 26^k linhas possíveis, na ordem das posições
+    linhas = np.indices((MOD,) * k, dtype=np.int8).reshape(k, -1).T.copy()
+    linhas.setflags(write=False)
+    return linhas
+
+
+def _escalonar(linhas, p):
+    # base reduzida (Gauss-Jordan) do espaço gerado pelas linhas mod p: [(pivô, linha com pivô 1)]
+    base = []
+    for linha in linhas:
+        linha = [int(x) % p for x in linha]
+        for pivo, b in base:
+            if linha[pivo]:
+                linha = [(x - linha[pivo] * y) % p for x, y in zip(linha, b)]
+        pivo = next((c for c, x in enumerate(linha) if x), None)
+        if pivo is None:
+            continue
+        inv = pow(linha[pivo], -1, p)
+        linha = [x * inv % p for x in linha]
+        base = [(c, [(x - b[pivo] * y) % p for x, y in zip(b, linha)]) for c, b in base]
+        base.append((pivo, linha))
+    return base
+
+
+def _independentes(bases, candidatas):
+    # máscara das candidatas (n, k) fora do espaço das linhas anteriores, mod 2 e mod 13
+    mascara = np.ones(len(candidatas), dtype=bool)
+    for p, base in zip(PRIMOS, bases):
+        resto = candidatas.astype(np.int16) % p
+        for pivo, linha in base:
+            resto = (resto - resto[:, pivo:pivo + 1] * np.array(linha, dtype=np.int16)) % p
+        mascara &= resto.any(axis=1)
+    return mascara
+
+
+def enumerar_invertiveis(k, inicio=0, fim=None, tamanho_lote=1 << 18):
+    """Gera (chaves, proxima_posicao) com todas as chaves invertíveis de posição em [inicio, fim).
+
+    `chaves` é um array (m, k, k) em ordem crescente de posição; `proxima_posicao` é de onde
+    continuar (salve-a como ponto de controle depois de processar o lote).
+    """
+    fim = tamanho_espaco(k) if fim is None else min(fim, tamanho_espaco(k))
+    if inicio >= fim:
+        return
+    todas = _todas_linhas(k)
+    n_linhas = len(todas)
+
+    def linhas_da_posicao(valor):
+        indices = []
+        for _ in range(k):
+            valor, indice = divmod(valor, n_linhas)
+            indices.append(indice)
+        return indices[::-1]
+
+    primeira, ultima = linhas_da_posicao(inicio), linhas_da_posicao(fim - 1)
+
+    def descer(prefixo, valor, colado_inicio, colado_fim):
+        # colado_*: o prefixo coincide com o de inicio / fim - 1, então esta linha está limitada
+        j = len(prefixo)
+        de = primeira[j] if colado_inicio else 0
+        ate = ultima[j] + 1 if colado_fim else n_linhas
+        bases = [_escalonar(prefixo, p) for p in PRIMOS]
+        for comeco in range(de, ate, tamanho_lote):
+            final = min(comeco + tamanho_lote, ate)
+            validas = comeco + np.flatnonzero(_independentes(bases, todas[comeco:final]))
+            if j == k - 1:
+                chaves = np.empty((len(validas), k, k), dtype=np.int64)
+                chaves[:, :j] = prefixo
+                chaves[:, j] = todas[validas]
+                yield chaves, valor * n_linhas + final
+                continue
+            for indice in validas.tolist():
+                yield from descer(prefixo + [todas[indice]], valor * n_linhas + indice,
+                                  colado_inicio and indice == de, colado_fim and indice == ate - 1)
+
+    yield from descer([], 0, True, True)
+
+
+def proximas_chaves(k, inicio, quantidade, fim=None):
+    """As `quantidade` primeiras chaves invertíveis a partir de `inicio` e a posição seguinte à última."""
+    chaves = [np.zeros((0, k, k), dtype=np.int64)]
+    if quantidade <= 0:
+        return chaves[0], inicio
+    proxima = inicio
+    falta = quantidade
+    for lote, proxima in enumerar_invertiveis(k, inicio, fim):
+        if len(lote) >= falta:
+            chaves.append(lote[:falta])
+            return np.concatenate(chaves), posicao(lote[falta - 1]) + 1
+        chaves.append(lote)
+        falta -= len(lote)
+    return np.concatenate(chaves), proxima
+
+
+def avancar(k, inicio, quantidade):
+    """Posição logo depois das `quantidade` primeiras chaves invertíveis a partir de `inicio`."""
+    if quantidade <= 0:
+        return inicio
+    proxima = inicio
+    for lote, proxima in enumerar_invertiveis(k, inicio):
+        if len(lote) >= quantidade:
+            return posicao(lote[quantidade - 1]) + 1
+        quantidade -= len(lote)
+    return proxima
+
+
+def carregar_posicao(caminho, padrao=0):
+    """Ponto de controle: a posição salva por salvar_posicao, ou `padrao` se ainda não existe."""
+    if not os.path.exists(caminho):
+        return padrao
+    with open(caminho, 'r') as f:
+        return int(f.read().strip())
+
+
+def salvar_posicao(caminho, proxima):
+    # grava num temporário e troca: uma interrupção no meio não corrompe o ponto de controle
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w') as f:
+        f.write(f"{proxima}\n")
+    os.replace(temporario, caminho)
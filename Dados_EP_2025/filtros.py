@@ -0,0 +1,69 @@
+import numpy as np
+
+from alfabeto import MOD, array_para_texto
+from segmentacao import score_segmentacao
+
+# Um filtro é uma lista de etapas (funcao, manter): `funcao` recebe um lote (m, n) de textos
+# 0..25 e devolve um score por texto (maior = melhor); `manter` é a fração (float < 1) ou a
+# quantidade (int) de textos que seguem para a próxima etapa. As etapas baratas vêm primeiro.
+
+
+def contagens_lote(textos):
+    # contagens[i, letra] para todos os textos de uma vez (um único bincount)
+    m = len(textos)
+    deslocados = textos + MOD * np.arange(m)[:, None]
+    return np.bincount(deslocados.ravel(), minlength=m * MOD).reshape(m, MOD)
+
+
+def qui_quadrado_lote(tabela_mono):
+    """Etapa: menos o qui-quadrado das frequências de letras contra o modelo."""
+    esperadas = np.exp(np.asarray(tabela_mono, dtype=np.float64))
+
+    def funcao(textos):
+        contagens = contagens_lote(textos)
+        esperados = textos.shape[1] * esperadas[None, :]
+        return -((contagens - esperados) ** 2 / esperados).sum(axis=1)
+    return funcao
+
+
+def indice_coincidencia_lote(textos):
+    """Etapa: índice de coincidência de cada texto (português fica perto de 0,07; aleatório, 0,038)."""
+    contagens = contagens_lote(textos)
+    n = textos.shape[1]
+    return (contagens * (contagens - 1)).sum(axis=1) / (n * (n - 1))
+
+
+def ngramas_lote(tabela):
+    """Etapa: soma das log-probabilidades dos n-gramas (n = dimensão da tabela)."""
+    tabela = np.asarray(tabela)
+    n = tabela.ndim
+
+    def funcao(textos):
+        return tabela[tuple(textos[:, i:textos.shape[1] - n + 1 + i] for i in range(n))].sum(axis=1)
+    return funcao
+
+
+def segmentacao_lote(modelo):
+    """Etapa: log-prob da melhor segmentação em palavras (cara; só para os últimos candidatos)."""
+    def funcao(textos):
+        return np.array([score_segmentacao(array_para_texto(texto), modelo) for texto in textos])
+    return funcao
+
+
+def aplicar_filtros(textos, etapas):
+    """Passa o lote pelas etapas e devolve (índices dos sobreviventes, scores da última etapa),
+    em ordem decrescente de score.
+    """
+    indices = np.arange(len(textos))
+    scores = np.zeros(len(textos))
+    for funcao, manter in etapas:
+        if len(indices) == 0:
+            break
+        scores = np.asarray(funcao(textos[indices]), dtype=np.float64)
+        quantos = int(np.ceil(manter * len(indices))) if isinstance(manter, float) else manter
+        quantos = max(1, min(quantos, len(indices)))
+        melhores = np.argpartition(scores, -quantos)[-quantos:]
+        indices, scores = indices[melhores], scores[melhores]
+
+    ordem = np.argsort(scores)[::-1]
+    return indices[ordem], scores[ordem]
@@ -0,0 +1,126 @@
+import numpy as np
+
+from alfabeto import MOD, texto_para_blocos, array_para_texto
+from algebra_modular import inversa_mod_26, posto_mod
+
+# Quantas linhas candidatas manter por tamanho de bloco
+TOP_LINHAS = {2: 100, 3: 200, 4: 500, 5: 4000}
+
+
+def linhas_independentes(matriz):
+    # Só pode compor uma matriz invertível mod 26 se tiver posto cheio mod 2 e mod 13
+    return posto_mod(matriz, 2) == len(matriz) and posto_mod(matriz, 13) == len(matriz)
+
+
+def melhores_linhas(blocos, tabela_mono, top):
+    """Pontua todas as 26^k linhas possíveis da inversa e devolve as `top` melhores.
+
+    A linha r da inversa gera sozinha as letras r, r+k, r+2k... do texto claro,
+    então cada linha é avaliada pela frequência de letras da sua saída.
+    """
+    k = blocos.shape[1]
+    prefixos = np.indices((MOD,) * (k - 1)).reshape(k - 1, -1).T
+    base = (prefixos @ blocos[:, :-1].T) % MOD
+    ultima = blocos[:, -1]
+
+    # índice da linha = índice do prefixo * 26 + último coeficiente
+    scores = np.empty((len(prefixos), MOD))
+    for v in range(MOD):
+        scores[:, v] = tabela_mono[(base + v * ultima) % MOD].sum(axis=1)
+    scores = scores.ravel()
+
+    # linhas nulas mod 2 ou mod 13 nunca fazem parte de uma inversa
+    forma = (MOD,) * k
+    pares = np.ones(forma, dtype=bool)
+    multiplos_13 = np.ones(forma, dtype=bool)
+    for eixo in range(k):
+        formato_eixo = [1] * k
+        formato_eixo[eixo] = MOD
+        pares &= (np.arange(MOD) % 2 == 0).reshape(formato_eixo)
+        multiplos_13 &= (np.arange(MOD) % 13 == 0).reshape(formato_eixo)
+    scores[(pares | multiplos_13).ravel()] = -np.inf
+
+    top = min(top, len(scores))
+    indices = np.argpartition(scores, -top)[-top:]
+    indices = indices[np.argsort(scores[indices])[::-1]]
+    linhas = np.array(np.unravel_index(indices, forma)).T
+    saidas = (linhas @ blocos.T) % MOD
+    return linhas, saidas, scores[indices]
+
+
+def matrizes_de_transicao(saidas, tabela_cond, tamanho_lote=64):
+    # tabela_cond[a, b] = log P(b | a)
+    # dentro[i, j]: bigramas entre a saída da linha i e a da linha j no mesmo bloco
+    # virada[i, j]: bigramas entre a última letra de um bloco (i) e a primeira do próximo (j)
+    n = len(saidas)
+    dentro = np.empty((n, n), dtype=np.float32)
+    virada = np.empty((n, n), dtype=np.float32)
+    for inicio in range(0, n, tamanho_lote):
+        lote = saidas[inicio:inicio + tamanho_lote, None, :]
+        dentro[inicio:inicio + tamanho_lote] = tabela_cond[lote, saidas[None, :, :]].sum(axis=2)
+        virada[inicio:inicio + tamanho_lote] = tabela_cond[lote[:, :, :-1], saidas[None, :, 1:]].sum(axis=2)
+    return dentro, virada
+
+
+def montar_chaves(linhas, scores_linhas, dentro, virada, k, feixe=2000):
+    """Busca em feixe pela ordem das linhas que maximiza os bigramas do texto montado."""
+    n = len(linhas)
+    estados = np.arange(n)[:, None]
+    scores = scores_linhas.astype(np.float32)
+
+    for _ in range(1, k):
+        ultimos = estados[:, -1]
+        novos = scores[:, None] + dentro[ultimos]
+        # não repete a mesma linha
+        repetidas = (estados[:, :, None] == np.arange(n)[None, None, :]).any(axis=1)
+        novos[repetidas] = -np.inf
+
+        planos = novos.ravel()
+        quantos = min(4 * feixe, np.isfinite(planos).sum())
+        escolhidos = np.argpartition(planos, -quantos)[-quantos:]
+        escolhidos = escolhidos[np.argsort(planos[escolhidos])[::-1]]
+        origem, proxima = np.divmod(escolhidos, n)
+        candidatos = np.hstack([estados[origem], proxima[:, None]])
+
+        # descarta prefixos com linhas dependentes, que nunca viram chave válida
+        validos = []
+        for i, estado in enumerate(candidatos):
+            if linhas_independentes(linhas[estado]):
+                validos.append(i)
+                if len(validos) >= feixe:
+                    break
+        estados = candidatos[validos]
+        scores = planos[escolhidos[validos]]
+
+    scores = scores + virada[estados[:, -1], estados[:, 0]]
+    ordem = np.argsort(scores)[::-1]
+    return estados[ordem], scores[ordem]
+
+
+def quebrar_hill_por_linhas(ciphertext, k, tabela_bi, top=10, top_linhas=None, feixe=2000):
+    """Recupera chaves de Hill kxk atacando cada linha da inversa separadamente.
+
+    Cada resultado é (score, chave de cifragem, texto decifrado).
+    """
+    if top_linhas is None:
+        top_linhas = TOP_LINHAS.get(k, 4000)
+    tabela_mono = np.log(np.exp(tabela_bi).sum(axis=1))
+    tabela_cond = tabela_bi - tabela_mono[:, None]
+
+    blocos = texto_para_blocos(ciphertext, k)
+
+    linhas, saidas, scores_linhas = melhores_linhas(blocos, tabela_mono, top_linhas)
+    dentro, virada = matrizes_de_transicao(saidas, tabela_cond)
+    estados, scores = montar_chaves(linhas, scores_linhas, dentro, virada, k, feixe)
+
+    resultados = []
+    for estado, score in zip(estados, scores):
+        inversa = linhas[estado]
+        chave = inversa_mod_26(inversa)
+        if chave is None:
+            continue
+        texto = saidas[estado].T.reshape(-1)
+        resultados.append((float(score), chave.tolist(), array_para_texto(texto)))
+        if len(resultados) >= top:
+            break
+    return resultados
@@ -0,0 +1,203 @@
+import time
+
+import numpy as np
+
+from alfabeto import MOD, texto_para_blocos, array_para_texto
+from algebra_modular import inversa_mod_26
+from hill_linhas import melhores_linhas, linhas_independentes
+from melhores import novo_coletor, adicionar, melhores
+
+# Busca local (simulated annealing com reinícios) sobre a inversa da chave de Hill.
+# A linha r da inversa gera sozinha a coluna r do texto claro (letras r, r+k, r+2k...):
+# mudar uma entrada da linha ou trocá-la inteira só mexe nessa coluna, e o score de
+# bigramas só muda nos bigramas que tocam a coluna. Os movimentos de uma linha são as
+# 26 escolhas de cada uma das suas k entradas e as linhas do banco de candidatas de
+# melhores_linhas; a variação de todos sai de uma vez, por linha, e só é refeita nas linhas
+# vizinhas da que mudou.
+# No fim de cada cadeia, cada linha ainda é trocada pela melhor de um banco bem maior, dadas
+# as outras: com k - 1 linhas certas, os bigramas com as colunas vizinhas acham a que falta.
+
+
+def preparar_subida(ciphertext, k, tabela_bi, linhas_candidatas=500, linhas_polimento=20000):
+    """Blocos do cifrado e os bancos de linhas candidatas (as melhores por frequência de
+    letras): as `linhas_candidatas` primeiras entram nos movimentos, todas no polimento.
+    """
+    blocos = texto_para_blocos(ciphertext, k)
+    tabela_mono = np.log(np.exp(tabela_bi).sum(axis=1))
+    linhas, saidas, _ = melhores_linhas(blocos, tabela_mono, max(linhas_candidatas, linhas_polimento))
+    return {
+        'k': k,
+        'blocos': blocos,
+        'tabela': np.asarray(tabela_bi, dtype=np.float64),
+        'linhas': linhas[:linhas_candidatas],
+        'linhas_polimento': linhas,
+        'saidas_polimento': saidas,
+        'planos': indices_planos(saidas[:linhas_candidatas]),
+        'planos_polimento': indices_planos(saidas),
+        'valores': np.arange(MOD),
+    }
+
+
+def score_texto(texto, tabela):
+    # texto (n, k): bloco a bloco, lido linha a linha
+    letras = texto.reshape(-1)
+    return float(tabela[letras[:-1], letras[1:]].sum())
+
+
+def pesos_coluna(texto, i, tabela):
+    """pesos[j, x]: score dos bigramas que a letra x faria na posição j da coluna i (n, 26)."""
+    k = texto.shape[1]
+    pesos = np.zeros((len(texto), MOD))
+    if i > 0:
+        pesos += tabela[texto[:, i - 1], :]
+    else:  # a coluna 0 vem depois da última coluna do bloco anterior
+        pesos[1:] += tabela[texto[:-1, k - 1], :]
+    if i < k - 1:
+        pesos += tabela[:, texto[:, i + 1]].T
+    else:
+        pesos[:-1] += tabela[:, texto[1:, 0]].T
+    return pesos.ravel()
+
+
+def indices_planos(colunas):
+    # colunas (m, n) -> índices em pesos_coluna(...) achatado: posição j * 26 + letra
+    return colunas + MOD * np.arange(colunas.shape[-1])
+
+
+def colunas_vizinhas(inversa, i, estado):
+    """Colunas do texto para as k * 26 trocas de entrada da linha i, como índices planos."""
+    blocos = estado['blocos']
+    atual = blocos @ inversa[i] % MOD
+    # entrada c vira v: a coluna muda de (v - inversa[i, c]) * blocos[:, c]
+    passos = (estado['valores'][None, :] - inversa[i][:, None]) % MOD
+    entradas = (atual[None, None, :] + passos[:, :, None] * blocos.T[:, None, :]) % MOD
+    return indices_planos(entradas.reshape(-1, len(blocos)))
+
+
+def deltas_da_linha(inversa, texto, i, estado):
+    """Variação do score para cada movimento da linha i: as k * 26 trocas de entrada e as
+    linhas do banco, nessa ordem.
+    """
+    pesos = pesos_coluna(texto, i, estado['tabela'])
+    atual = pesos[indices_planos(texto[:, i])].sum()
+    entradas = pesos[colunas_vizinhas(inversa, i, estado)].sum(axis=1)
+    banco = pesos[estado['planos']].sum(axis=1)
+    return np.concatenate([entradas, banco]) - atual
+
+
+def aplicar_movimento(inversa, i, movimento, estado):
+    """Nova inversa depois do movimento (índice na ordem de colunas_vizinhas) na linha i."""
+    k = estado['k']
+    nova = inversa.copy()
+    if movimento < k * MOD:
+        c, v = divmod(movimento, MOD)
+        nova[i, c] = v
+    else:
+        nova[i] = estado['linhas'][movimento - k * MOD]
+    return nova
+
+
+def inversa_inicial(estado, rng, tentativas=1000):
+    # k linhas sorteadas do banco, independentes mod 2 e mod 13
+    k, linhas = estado['k'], estado['linhas']
+    for _ in range(tentativas):
+        inversa = linhas[rng.choice(len(linhas), k, replace=False)].astype(np.int64)
+        if linhas_independentes(inversa):
+            return inversa
+    return np.eye(k, dtype=np.int64)
+
+
+def polir(inversa, estado, max_voltas=10):
+    """Troca cada linha pela melhor do banco de polimento dadas as outras, até nada mudar."""
+    k, tabela = estado['k'], estado['tabela']
+    inversa = inversa.copy()
+    texto = estado['blocos'] @ inversa.T % MOD
+    for _ in range(max_voltas):
+        mudou = False
+        for i in range(k):
+            pesos = pesos_coluna(texto, i, tabela)
+            ganhos = pesos[estado['planos_polimento']].sum(axis=1) - pesos[indices_planos(texto[:, i])].sum()
+            for j in np.argsort(ganhos)[::-1][:k]:
+                if not ganhos[j] > 1e-9:
+                    break
+                nova = inversa.copy()
+                nova[i] = estado['linhas_polimento'][j]
+                if linhas_independentes(nova):
+                    inversa = nova
+                    texto[:, i] = estado['saidas_polimento'][j]
+                    mudou = True
+                    break
+        if not mudou:
+            break
+    return inversa, score_texto(texto, tabela)
+
+
+def executar_subida(estado, rng, temp_inicial=20.0, temp_final=1.0, alpha=0.95, iteracoes_por_temp=100,
+                    paciencia=3000):
+    """Uma cadeia de annealing a partir de uma inversa sorteada; devolve (melhor inversa, score).
+
+    A cada passo uma linha sorteada recebe um dos seus movimentos com probabilidade
+    proporcional a exp(delta / temperatura) (banho térmico: quase todo passo anda, mesmo
+    com milhares de movimentos possíveis). Depois, só as linhas vizinhas da que mudou têm
+    os deltas refeitos. A cadeia para quando esfria ou quando passa `paciencia` passos sem
+    melhorar o próprio recorde (o chamador então recomeça de outro ponto); o recorde
+    passa por polir antes de voltar.
+    """
+    k = estado['k']
+    inversa = inversa_inicial(estado, rng)
+    texto = estado['blocos'] @ inversa.T % MOD
+    score_atual = score_texto(texto, estado['tabela'])
+    deltas = [deltas_da_linha(inversa, texto, i, estado) for i in range(k)]
+    melhor_inversa, melhor_score = inversa.copy(), score_atual
+
+    desde_recorde = 0
+    temp = temp_inicial
+    while temp > temp_final and desde_recorde < paciencia:
+        for _ in range(iteracoes_por_temp):
+            desde_recorde += 1
+            i = int(rng.integers(k))
+            pesos = np.exp((deltas[i] - deltas[i].max()) / temp)
+            movimento = int(rng.choice(len(pesos), p=pesos / pesos.sum()))
+            nova = aplicar_movimento(inversa, i, movimento, estado)
+            if not linhas_independentes(nova):
+                continue
+            score_atual += deltas[i][movimento]
+            inversa = nova
+            texto[:, i] = estado['blocos'] @ inversa[i] % MOD
+            # os bigramas que tocam a coluna i também tocam as colunas i - 1 e i + 1
+            for j in {(i - 1) % k, i, (i + 1) % k}:
+                deltas[j] = deltas_da_linha(inversa, texto, j, estado)
+            if score_atual > melhor_score + 1e-9:
+                melhor_inversa, melhor_score = inversa.copy(), score_atual
+                desde_recorde = 0
+        temp *= alpha
+    return polir(melhor_inversa, estado)
+
+
+def quebrar_hill_por_subida(ciphertext, k, tabela_bi, reinicios=50, top=10, linhas_candidatas=500,
+                            linhas_polimento=20000, confirmacoes=3, tempo_maximo=None, semente=None,
+                            **parametros_cadeia):
+    """Recupera chaves de Hill kxk por busca local na inversa, com até `reinicios` cadeias
+    (ou até `tempo_maximo` segundos). Para antes disso quando `confirmacoes` cadeias
+    independentes chegam ao mesmo melhor score. Os demais parâmetros vão para executar_subida.
+
+    Cada resultado é (score, chave de cifragem, texto decifrado).
+    """
+    rng = np.random.default_rng(semente)
+    estado = preparar_subida(ciphertext, k, tabela_bi, linhas_candidatas, linhas_polimento)
+    coletor = novo_coletor(top, deduplicar=True)
+    inicio = time.time()
+    recorde, vezes = -np.inf, 0
+    for _ in range(reinicios):
+        inversa, score = executar_subida(estado, rng, **parametros_cadeia)
+        if score > recorde + 1e-6:
+            recorde, vezes = score, 1
+        elif score > recorde - 1e-6:
+            vezes += 1
+        chave = inversa_mod_26(inversa)
+        if chave is not None:
+            texto = array_para_texto((estado['blocos'] @ inversa.T % MOD).reshape(-1))
+            adicionar(coletor, score, (score, chave.tolist(), texto), texto)
+        if vezes >= confirmacoes or (tempo_maximo is not None and time.time() - inicio > tempo_maximo):
+            break
+    return melhores(coletor)
@@ -0,0 +1,146 @@
+import itertools
+import os
+import re
+import sys
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from alfabeto import MOD, texto_para_array, array_para_texto
+from algebra_modular import inversa_mod_26
+
+# Letras além do sistema k x k usadas para confirmar uma chave (26^12 torna falso positivo improvável)
+LETRAS_CONFERENCIA = 12
+
+
+def blocos_de_conferencia(k):
+    return -(-LETRAS_CONFERENCIA // k)
+
+
+def blocos_invertiveis(blocos, k, limite=100000):
+    """Índices de k blocos, não necessariamente seguidos, que formam uma matriz invertível mod 26."""
+    for indices in itertools.islice(itertools.combinations(range(len(blocos)), k), limite):
+        if inversa_mod_26(blocos[list(indices)]) is not None:
+            return list(indices)
+    return None
+
+
+def chaves_por_alinhamento(ciphertext, crib, k, blocos_extras=None, alinhamentos=None, sistema=None):
+    """Desliza o texto claro conhecido (crib) sobre o cifrado e resolve a chave em cada alinhamento.
+
+    Com os blocos como linhas, P = C D^T. Para cada posição do cifrado (múltipla de k) cujos
+    k primeiros blocos (ou os blocos de índices `sistema` da janela) formam uma matriz
+    invertível, D^T = C^-1 P: cada letra de um bloco de conferência é então uma combinação
+    fixa, (C_conf C^-1) P, das letras dos blocos do sistema. As posições do crib são
+    filtradas letra a letra por essa previsão (cada letra corta ~25/26 delas), até
+    LETRAS_CONFERENCIA letras dos `blocos_extras` além dos k, e só as que sobram têm D resolvida.
+    Retorna uma lista de (posição no crib, posição no cifrado, chave de cifragem).
+    """
+    cifra = texto_para_array(ciphertext)
+    crib = texto_para_array(crib) if isinstance(crib, str) else np.asarray(crib, dtype=np.int64)
+    if blocos_extras is None:
+        blocos_extras = blocos_de_conferencia(k)
+    blocos_total = k + blocos_extras
+    tamanho = k * blocos_total
+    if len(crib) < tamanho:
+        return []
+
+    if alinhamentos is None:
+        alinhamentos = range(0, len(cifra) - tamanho + 1, k)
+    sistema = list(range(k)) if sistema is None else list(sistema)
+    conferencia = [b for b in range(blocos_total) if b not in sistema][:blocos_de_conferencia(k)]
+
+    encontradas = []
+    for pos_cifra in alinhamentos:
+        C = cifra[pos_cifra:pos_cifra + tamanho].reshape(blocos_total, k).astype(np.int64)
+        C_inv = inversa_mod_26(C[sistema])
+        if C_inv is None:
+            continue
+        combinacoes = (C[conferencia] @ C_inv) % MOD
+        posicoes = np.arange(len(crib) - tamanho + 1)
+        for linha, bloco in zip(combinacoes, conferencia):
+            for coluna in range(k):
+                previsto = sum(int(peso) * crib[posicoes + j * k + coluna] for peso, j in zip(linha, sistema))
+                posicoes = posicoes[previsto % MOD == crib[posicoes + bloco * k + coluna]]
+
+        # janelas[s] = crib[s:s + tamanho] organizado em blocos (blocos_total, k)
+        janelas = sliding_window_view(crib, tamanho)[posicoes].reshape(-1, blocos_total, k)
+        for posicao, P in zip(posicoes, janelas):
+            chave = inversa_mod_26((C_inv @ P[sistema] % MOD).T)
+            if chave is not None:
+                encontradas.append((int(posicao), int(pos_cifra), chave.tolist()))
+    return encontradas
+
+
+def decifrar_hill(ciphertext, chave):
+    """Decifra com a chave de cifragem, conferindo a inversa pelo mesmo solver modular."""
+    k = len(chave)
+    nums = texto_para_array(ciphertext)
+    inversa = inversa_mod_26(chave)
+    if inversa is None:
+        return None
+    return array_para_texto((nums.reshape(-1, k) @ inversa.T).reshape(-1) % MOD)
+
+
+def quebrar_cifrado(ciphertext, crib, k):
+    """Ataque de texto conhecido a um único cifrado tirado inteiro do corpus (crib).
+
+    Retorna (posição no crib, chave, texto decifrado) ou None.
+    """
+    crib = texto_para_array(crib) if isinstance(crib, str) else np.asarray(crib)
+    blocos_extras = blocos_de_conferencia(k)
+    cifra = texto_para_array(ciphertext)
+
+    # alinha o início do cifrado e só avança de bloco quando os k primeiros
+    # blocos cifrados não formam matriz invertível
+    for pos_cifra in range(0, len(cifra) - k * (k + blocos_extras) + 1, k):
+        if inversa_mod_26(cifra[pos_cifra:pos_cifra + k * k].reshape(k, k)) is None:
+            continue
+        encontradas = chaves_por_alinhamento(ciphertext, crib, k, blocos_extras, alinhamentos=[pos_cifra])
+        if encontradas:
+            pos_crib, _, chave = encontradas[0]
+            return pos_crib - pos_cifra, chave, decifrar_hill(ciphertext, chave)
+        return None
+
+    # nenhum grupo de k blocos seguidos é invertível (comum mod 2 no 5x5): o sistema usa k
+    # blocos quaisquer do texto, e a janela cobre o cifrado inteiro
+    blocos = cifra[:len(cifra) // k * k].reshape(-1, k).astype(np.int64)
+    sistema = blocos_invertiveis(blocos, k)
+    if sistema is None:
+        return None
+    encontradas = chaves_por_alinhamento(ciphertext, crib, k, len(blocos) - k, alinhamentos=[0], sistema=sistema)
+    if encontradas:
+        pos_crib, _, chave = encontradas[0]
+        return pos_crib, chave, decifrar_hill(ciphertext, chave)
+    return None
+
+
+def quebrar_diretorio(diretorio, crib):
+    """Aplica o ataque de texto conhecido a todos os arquivos GrupoNN_k_texto_cifrado.txt do diretório."""
+    padrao = re.compile(r'(Grupo\d+)_(\d+)_texto_cifrado\.txt$')
+    crib = texto_para_array(crib)
+    resultados = {}
+    for nome in sorted(os.listdir(diretorio)):
+        casamento = padrao.match(nome)
+        if not casamento:
+            continue
+        with open(os.path.join(diretorio, nome), 'r') as f:
+            ciphertext = f.read().strip()
+        resultados[nome] = quebrar_cifrado(ciphertext, crib, int(casamento.group(2)))
+    return resultados
+
+
+if __name__ == "__main__":
+    diretorio = sys.argv[1] if len(sys.argv) > 1 else os.path.join('textos_conhecidos', 'Cifrado', 'Hill')
+    corpus = sys.argv[2] if len(sys.argv) > 2 else os.path.join('textos_conhecidos', 'avesso_da_pele.txt')
+
+    with open(corpus, 'r', encoding='latin-1') as f:
+        crib = f.read()
+
+    for nome, resultado in quebrar_diretorio(diretorio, crib).items():
+        if resultado is None:
+            print(f"{nome}: nenhum alinhamento encontrado")
+            continue
+        pos_crib, chave, texto = resultado
+        print(f"{nome}: posição texto claro {pos_crib} | Chave: {chave}")
+        print(f"    {texto}")
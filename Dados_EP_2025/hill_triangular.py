@@ -0,0 +1,103 @@
+import numpy as np
+
+from alfabeto import MOD, texto_para_blocos, array_para_texto
+from algebra_modular import INVERSOS_26, inversa_mod_26
+from filtros import ngramas_lote
+
+# Chaves do GeraEP1.enc_hill: triangulares superiores com diagonal de unidades mod 26.
+# A inversa também é triangular superior com diagonal de unidades, então a letra i de cada
+# bloco claro só depende das letras i..k-1 do bloco cifrado: a linha i da inversa tem só
+# 12 * 26^(k-1-i) possibilidades (12 unidades na diagonal, zeros à esquerda). As linhas são
+# escolhidas de baixo para cima; a coluna i do texto é pontuada pelos bigramas com a coluna
+# i + 1, já fixada, e só as melhores combinações seguem (busca em feixe).
+
+UNIDADES = np.flatnonzero(INVERSOS_26)
+
+
+def n_linhas_triangulares(k, i):
+    return len(UNIDADES) * MOD ** (k - 1 - i)
+
+
+def linhas_triangulares(k, i, inicio=0, fim=None):
+    """Linhas i possíveis da inversa, da `inicio`-ésima até antes da `fim`-ésima (uint8).
+
+    Zeros antes de i, unidade em i, livre depois; a posição de uma linha é o número formado
+    pela unidade (dígito mais significativo) e pelas entradas livres em base 26.
+    """
+    fim = n_linhas_triangulares(k, i) if fim is None else fim
+    unidade, resto = np.divmod(np.arange(inicio, fim), MOD ** (k - 1 - i))
+    linhas = np.zeros((fim - inicio, k), dtype=np.uint8)
+    linhas[:, i] = UNIDADES[unidade]
+    for j in range(k - 1, i, -1):
+        resto, linhas[:, j] = np.divmod(resto, MOD)
+    return linhas
+
+
+def candidatas(blocos, i, tabela_mono, quantidade, tamanho_lote=1 << 16):
+    """As `quantidade` linhas i mais prováveis pela frequência de letras e as colunas que geram.
+
+    As linhas são geradas e pontuadas lote a lote, guardando só as melhores até ali: para
+    k = 5 e i = 0 são 5,5 milhões de linhas, que não precisam existir todas ao mesmo tempo.
+    """
+    k = blocos.shape[1]
+    linhas = np.zeros((0, k), dtype=np.uint8)
+    scores = np.zeros(0)
+    for inicio in range(0, n_linhas_triangulares(k, i), tamanho_lote):
+        lote = linhas_triangulares(k, i, inicio, min(inicio + tamanho_lote, n_linhas_triangulares(k, i)))
+        linhas = np.concatenate([linhas, lote])
+        scores = np.concatenate([scores, tabela_mono[lote @ blocos.T % MOD].sum(axis=1)])
+        if len(linhas) > quantidade:
+            manter = np.argpartition(scores, -quantidade)[-quantidade:]
+            linhas, scores = linhas[manter], scores[manter]
+    ordem = np.argsort(scores)[::-1]
+    linhas = linhas[ordem].astype(np.int64)
+    return linhas, linhas @ blocos.T % MOD
+
+
+def quebrar_hill_triangular(ciphertext, k, tabela_bi, top=10, feixe=100, linhas_por_posicao=20000,
+                            tabela_final=None):
+    """Recupera chaves triangulares superiores (as do GeraEP1) linha a linha, de baixo para cima.
+
+    As chaves completas do feixe são ordenadas pelos n-gramas de `tabela_final` (padrão: os
+    bigramas): com quadrigramas, chaves que só diferem por 13 numa entrada deixam de empatar.
+    Cada resultado é (score, chave de cifragem, texto decifrado).
+    """
+    tabela_bi = np.asarray(tabela_bi, dtype=np.float64)
+    tabela_mono = np.log(np.exp(tabela_bi).sum(axis=1))
+    blocos = texto_para_blocos(ciphertext, k)
+    posicoes = MOD * np.arange(len(blocos))
+
+    # estado: linhas i..k-1 da inversa já escolhidas; score = log P das colunas i..k-1
+    # pela regra da cadeia (bigramas entre colunas vizinhas menos o monograma da de baixo)
+    linhas, colunas = candidatas(blocos, k - 1, tabela_mono, linhas_por_posicao)
+    scores = tabela_mono[colunas].sum(axis=1)
+    ordem = np.argsort(scores)[::-1][:feixe]
+    inversas = np.zeros((len(ordem), k, k), dtype=np.int64)
+    inversas[:, k - 1] = linhas[ordem]
+    topo, scores = colunas[ordem], scores[ordem]
+
+    for i in range(k - 2, -1, -1):
+        linhas, colunas = candidatas(blocos, i, tabela_mono, linhas_por_posicao)
+        planos = colunas + posicoes
+        # pesos[j * 26 + x] = bigrama (x, letra já fixada logo depois) na posição j
+        novos = np.empty((len(inversas), len(linhas)))
+        for e in range(len(inversas)):
+            pesos = tabela_bi[:, topo[e]].T.ravel()
+            novos[e] = scores[e] - tabela_mono[topo[e]].sum() + pesos[planos].sum(axis=1)
+        planos_novos = novos.ravel()
+        quantos = min(feixe, len(planos_novos))
+        escolhidos = np.argpartition(planos_novos, -quantos)[-quantos:]
+        escolhidos = escolhidos[np.argsort(planos_novos[escolhidos])[::-1]]
+        origem, linha = np.divmod(escolhidos, len(linhas))
+        inversas = inversas[origem]
+        inversas[:, i] = linhas[linha]
+        topo, scores = colunas[linha], planos_novos[escolhidos]
+
+    # com todas as linhas, o texto inteiro (inclusive as viradas de bloco) decide a ordem
+    textos = np.einsum('bij,nj->bni', inversas, blocos).reshape(len(inversas), -1) % MOD
+    scores = ngramas_lote(tabela_bi if tabela_final is None else tabela_final)(textos)
+    resultados = []
+    for e in np.argsort(scores)[::-1][:top]:
+        chave = inversa_mod_26(inversas[e])
+        resultados.append((float(scores[e]), chave.tolist(), array_para_texto(textos[e])))
+    return resultados
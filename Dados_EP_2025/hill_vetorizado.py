@@ -0,0 +1,71 @@
+from functools import lru_cache
+
+import numpy as np
+
+from alfabeto import ALPHABET, FREQ_PT, MOD, texto_para_blocos, array_para_texto
+from algebra_modular import INVERSOS_26
+from filtros import aplicar_filtros
+from melhores import novo_coletor, adicionar_lote, melhores
+
+def tabela_log_monogramas(freq=FREQ_PT):
+    probs = np.array([freq.get(c, 0.01) for c in ALPHABET], dtype=np.float64)
+    return np.log(probs / probs.sum())
+
+
+@lru_cache(maxsize=None)
+def chaves_invertiveis_2x2():
+    """Todas as matrizes 2x2 invertíveis mod 26 e suas inversas, calculadas uma única vez."""
+    todas = np.indices((MOD,) * 4).reshape(4, -1).T.astype(np.int32)
+    a, b, c, d = todas.T
+    inv_det = INVERSOS_26[(a * d - b * c) % MOD]
+    validas = inv_det > 0
+
+    chaves = todas[validas]
+    inv_det = inv_det[validas, None]
+    a, b, c, d = chaves.T
+    inversas = (inv_det * np.stack([d, -b, -c, a], axis=1)) % MOD
+
+    chaves = chaves.reshape(-1, 2, 2)
+    inversas = inversas.reshape(-1, 2, 2).astype(np.int32)
+    chaves.setflags(write=False)
+    inversas.setflags(write=False)
+    return chaves, inversas
+
+
+def decifrar_lote(blocos, inversas):
+    # blocos: (n_blocos, k), inversas: (n_chaves, k, k) -> (n_chaves, n_blocos, k)
+    return np.matmul(blocos, inversas.transpose(0, 2, 1)) % MOD
+
+
+def pontuar_lote(textos, tabela_log):
+    # textos: (n_chaves, n) com valores 0..25; tabela 1D (monogramas) ou 2D (bigramas)
+    if tabela_log.ndim == 1:
+        return tabela_log[textos].sum(axis=1)
+    return tabela_log[textos[:, :-1], textos[:, 1:]].sum(axis=1)
+
+
+def quebrar_hill_2x2(ciphertext, tabela_log=None, top=10, tamanho_lote=20000, etapas=None):
+    """Decifra o texto com todas as chaves 2x2 de uma vez e retorna as `top` melhores.
+
+    Cada lote de decifragens passa pelas `etapas` de filtros.aplicar_filtros (por padrão,
+    só a pontuação por `tabela_log`). Cada resultado é (score, chave de cifragem, texto decifrado).
+    """
+    if tabela_log is None:
+        tabela_log = tabela_log_monogramas()
+    if etapas is None:
+        etapas = [(lambda textos: pontuar_lote(textos, tabela_log), top)]
+
+    blocos = texto_para_blocos(ciphertext, 2)
+
+    chaves, inversas = chaves_invertiveis_2x2()
+    coletor = novo_coletor(top)
+    for inicio in range(0, len(chaves), tamanho_lote):
+        lote = inversas[inicio:inicio + tamanho_lote]
+        textos = decifrar_lote(blocos, lote).reshape(len(lote), -1)
+        sobreviventes, scores_lote = aplicar_filtros(textos, etapas)
+
+        def montar(i):
+            texto = array_para_texto(textos[sobreviventes[i]])
+            return (float(scores_lote[i]), chaves[inicio + sobreviventes[i]].tolist(), texto), texto
+        adicionar_lote(coletor, scores_lote, montar)
+    return melhores(coletor)
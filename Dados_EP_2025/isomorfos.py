@@ -0,0 +1,209 @@
+import os
+import struct
+
+import numpy as np
+
+from alfabeto import ALPHABET, MOD, texto_para_array
+from mono_incremental import PARES, preparar_termos, score_completo, iniciar_deltas, atualizar_deltas, trocar
+from segmentacao import carregar_vocabulario_com_frequencia
+
+# Índice de padrões de repetição (isomorfos) do vocabulário: 'casa' e 'mala' têm o mesmo
+# padrão 0-1-2-1, e um trecho cifrado por substituição simples tem o padrão da palavra
+# clara. Cada trecho do cifrado com letras repetidas só pode ser uma das poucas palavras
+# do seu padrão, e cada palavra fixa parte da chave; trechos compatíveis entre si (mesma
+# letra clara para a mesma cifrada, sem duas cifradas na mesma clara) formam uma chave parcial.
+# Formato do arquivo: cabeçalho ('ISOM', versão, nº de palavras, nº de letras) seguido das
+# letras (uint8), dos padrões (uint8, mesma posição das letras), dos inícios de cada palavra
+# (uint32, nº de palavras + 1) e dos pesos (float32). As palavras ficam agrupadas por padrão.
+MAGICO = b'ISOM'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sIII')
+
+
+def assinatura(letras):
+    """Padrão de repetição: cada letra vira a ordem da sua primeira aparição ('casa' -> 0 1 2 1)."""
+    vistos = {}
+    return bytes(vistos.setdefault(c, len(vistos)) for c in letras)
+
+
+def construir_indice(vocabulario, min_len=3, max_len=20):
+    """Índice em memória: padrão -> (palavras (m, L) com as letras 0..25, pesos (m,))."""
+    if not isinstance(vocabulario, dict):
+        vocabulario = {palavra: 1 for palavra in vocabulario}
+    entradas = {}
+    for palavra, peso in vocabulario.items():
+        letras = [ord(c) - ord('a') for c in palavra.lower()]
+        if min_len <= len(letras) <= max_len and all(0 <= c < MOD for c in letras):
+            entradas[tuple(letras)] = max(entradas.get(tuple(letras), 0), peso)
+
+    grupos = {}
+    for letras, peso in entradas.items():
+        grupos.setdefault(assinatura(letras), []).append((peso, letras))
+    indice = {}
+    for padrao, palavras in grupos.items():
+        palavras.sort(reverse=True)
+        indice[padrao] = (np.array([p for _, p in palavras], dtype=np.int8),
+                          np.array([peso for peso, _ in palavras], dtype=np.float32))
+    return indice
+
+
+def salvar_indice(caminho, indice):
+    palavras = [(padrao, letras, peso) for padrao, (lista, pesos) in indice.items()
+                for letras, peso in zip(lista, pesos)]
+    letras = np.concatenate([l for _, l, _ in palavras]).astype(np.uint8)
+    padroes = np.frombuffer(b''.join(p for p, _, _ in palavras), dtype=np.uint8)
+    inicios = np.concatenate([[0], np.cumsum([len(l) for _, l, _ in palavras])]).astype('<u4')
+    with open(caminho, 'wb') as f:
+        f.write(CABECALHO.pack(MAGICO, VERSAO, len(palavras), len(letras)))
+        for array in (letras, padroes, inicios, np.array([p for _, _, p in palavras], dtype='<f4')):
+            f.write(array.tobytes())
+
+
+def carregar_indice(caminho):
+    with open(caminho, 'rb') as f:
+        magico, versao, n_palavras, n_letras = CABECALHO.unpack(f.read(CABECALHO.size))
+        if magico != MAGICO or versao != VERSAO:
+            raise ValueError(f"{caminho} não é um índice de padrões válido")
+        letras = np.frombuffer(f.read(n_letras), dtype=np.uint8)
+        padroes = f.read(n_letras)
+        inicios = np.frombuffer(f.read(4 * (n_palavras + 1)), dtype='<u4')
+        pesos = np.frombuffer(f.read(4 * n_palavras), dtype='<f4')
+
+    grupos = {}
+    for i in range(n_palavras):
+        de, ate = int(inicios[i]), int(inicios[i + 1])
+        grupos.setdefault(padroes[de:ate], []).append(i)
+    indice = {}
+    for padrao, ids in grupos.items():
+        de = int(inicios[ids[0]])
+        # palavras do mesmo padrão são consecutivas e têm o mesmo tamanho
+        indice[padrao] = (letras[de:de + len(ids) * len(padrao)].reshape(len(ids), len(padrao)).astype(np.int8),
+                          pesos[ids[0]:ids[0] + len(ids)].astype(np.float32))
+    return indice
+
+
+def indice_do_corpus(caminho_corpus, encoding='latin-1'):
+    """Carrega o índice compilado ao lado do corpus (ou lista de palavras), recompilando só se o
+    arquivo for mais novo.
+    """
+    caminho_indice = os.path.splitext(caminho_corpus)[0] + '.isomorfos'
+    if (os.path.exists(caminho_indice)
+            and os.path.getmtime(caminho_indice) >= os.path.getmtime(caminho_corpus)):
+        return carregar_indice(caminho_indice)
+    indice = construir_indice(carregar_vocabulario_com_frequencia(caminho_corpus, encoding))
+    salvar_indice(caminho_indice, indice)
+    return carregar_indice(caminho_indice)
+
+
+def encaixes(nums, indice, min_len=5, max_len=12, max_candidatas=50):
+    """Trechos do cifrado com letra repetida e poucas palavras do mesmo padrão.
+
+    Cada encaixe é (início, letras cifradas distintas (u,), letras claras de cada candidata
+    (m, u), pesos (m,)), do mais informativo (longo, com poucas candidatas) para o menos.
+    """
+    encontrados = []
+    for tamanho in range(min_len, max_len + 1):
+        for inicio in range(len(nums) - tamanho + 1):
+            trecho = nums[inicio:inicio + tamanho]
+            padrao = assinatura(trecho.tolist())
+            if max(padrao) + 1 == tamanho or padrao not in indice:
+                continue  # sem repetição, quase toda palavra do tamanho serviria
+            palavras, pesos = indice[padrao]
+            if len(palavras) > max_candidatas:
+                continue
+            cifradas, primeiras = np.unique(trecho, return_index=True)
+            encontrados.append((inicio, tamanho, cifradas, palavras[:, primeiras].astype(np.int64), pesos))
+    encontrados.sort(key=lambda e: (-e[1], len(e[3])))
+    return encontrados
+
+
+def chaves_parciais(texto_cifrado, indice, feixe=64, **parametros_encaixes):
+    """Busca em feixe por conjuntos de encaixes compatíveis e sem sobreposição no texto.
+
+    Devolve os mapas parciais (mapa[letra cifrada] = letra clara, -1 se livre) dos estados
+    do feixe, do que cobre mais letras do cifrado com palavras para o que cobre menos.
+    """
+    nums = texto_para_array(texto_cifrado)
+    mapas = np.full((1, MOD), -1, dtype=np.int64)   # cifrada -> clara
+    inversos = np.full((1, MOD), -1, dtype=np.int64)  # clara -> cifrada
+    cobertas = np.zeros((1, len(nums)), dtype=bool)
+    scores = np.zeros(1)
+
+    for inicio, tamanho, cifradas, claras, pesos in encaixes(nums, indice, **parametros_encaixes):
+        # (m, B): a candidata m cabe no estado b?
+        atuais = mapas[:, cifradas]
+        compativeis = ((atuais[None] == claras[:, None]) | (atuais[None] < 0)).all(axis=2)
+        donos = inversos[:, claras].transpose(1, 0, 2)
+        compativeis &= ((donos == cifradas) | (donos < 0)).all(axis=2)
+        compativeis &= ~cobertas[:, inicio:inicio + tamanho].any(axis=1)[None]
+
+        m, b = np.nonzero(compativeis)
+        if not len(m):
+            continue
+        # o peso de um encaixe cresce com o tamanho da palavra e, pouco, com a frequência
+        ganhos = tamanho + np.log1p(pesos[m]) / 10
+        novos_scores = np.concatenate([scores, scores[b] + ganhos])
+        ordem = np.argsort(novos_scores)[::-1][:feixe]
+        velhos, novos = ordem[ordem < len(scores)], ordem[ordem >= len(scores)] - len(scores)
+
+        novos_mapas, novos_inversos = mapas[b[novos]].copy(), inversos[b[novos]].copy()
+        linhas = np.arange(len(novos))[:, None]
+        novos_mapas[linhas, cifradas[None, :]] = claras[m[novos]]
+        novos_inversos[linhas, claras[m[novos]]] = cifradas[None, :]
+        novas_cobertas = cobertas[b[novos]].copy()
+        novas_cobertas[:, inicio:inicio + tamanho] = True
+
+        mapas = np.concatenate([mapas[velhos], novos_mapas])
+        inversos = np.concatenate([inversos[velhos], novos_inversos])
+        cobertas = np.concatenate([cobertas[velhos], novas_cobertas])
+        scores = np.concatenate([scores[velhos], novos_scores[ordem[ordem >= len(scores)]]])
+
+    ordem = np.argsort(scores)[::-1]
+    return mapas[ordem], cobertas[ordem].sum(axis=1)
+
+
+def completar(mapa_parcial, nums, termos, frequencias_claras):
+    """Preenche as letras livres por frequência e sobe por trocas de n-gramas até parar.
+
+    As trocas também podem desfazer letras fixadas por palavras erradas.
+    """
+    mapa = np.array(mapa_parcial, dtype=np.int64)
+    livres_cifradas = [c for c in np.argsort(np.bincount(nums, minlength=MOD))[::-1] if mapa[c] < 0]
+    livres_claras = [p for p in np.argsort(frequencias_claras)[::-1] if p not in set(mapa.tolist())]
+    mapa[livres_cifradas] = livres_claras
+    score = score_completo(mapa, termos)
+    estado = iniciar_deltas(mapa, termos)
+    while True:
+        par = int(np.argmax(estado['deltas']))
+        if estado['deltas'][par] <= 1e-9:
+            return mapa, score
+        score += estado['deltas'][par]
+        trocar(mapa, *PARES[par])
+        atualizar_deltas(estado, mapa, termos, *PARES[par])
+
+
+def quebrar_mono_por_padroes(texto_cifrado, indice, tabelas, top=5, sementes=32, feixe=64,
+                             **parametros_encaixes):
+    """Chaves de substituição simples a partir dos padrões de palavras, sem annealing.
+
+    As `sementes` melhores chaves parciais da busca em feixe são completadas por
+    completar(); cada resultado é um dict com mapa, texto, score e quantas letras do
+    cifrado a chave parcial cobria com palavras (os mapas servem de partida para
+    anelamento_paralelo).
+    """
+    nums = texto_para_array(texto_cifrado)
+    tabelas = [np.array(t) for t in tabelas]
+    termos = preparar_termos(texto_cifrado, tabelas)
+    # letras claras mais frequentes pela tabela de menor ordem (log-probabilidades)
+    menor = min(tabelas, key=lambda t: t.ndim)
+    frequencias_claras = np.exp(menor).reshape(MOD, -1).sum(axis=1)
+
+    parciais, cobertas = chaves_parciais(texto_cifrado, indice, feixe, **parametros_encaixes)
+    resultados = {}
+    for parcial, coberto in zip(parciais[:sementes], cobertas[:sementes]):
+        mapa, score = completar(parcial, nums, termos, frequencias_claras)
+        texto = ''.join(ALPHABET[mapa[c]] for c in nums)
+        if texto not in resultados or resultados[texto]['score'] < score:
+            resultados[texto] = {'mapa': mapa.tolist(), 'texto': texto, 'score': score,
+                                 'cobertas': int(coberto)}
+    return sorted(resultados.values(), key=lambda r: r['score'], reverse=True)[:top]
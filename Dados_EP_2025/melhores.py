@@ -0,0 +1,70 @@
+import heapq
+import math
+
+import numpy as np
+
+# Coletor dos K melhores resultados de uma busca, em memória constante: um heap de mínimo
+# com no máximo K entradas (score, desempate, texto, resultado), alimentado conforme a busca
+# anda. Quem entra depois com o mesmo score perde o desempate e sai primeiro.
+# Com deduplicar=True, resultados com o mesmo texto decifrado (ex.: chaves que só diferem
+# em letras ausentes do cifrado) ocupam uma única vaga, a do melhor score.
+
+
+def novo_coletor(k, deduplicar=False):
+    return {'k': k, 'heap': [], 'por_texto': {} if deduplicar else None, 'contador': 0}
+
+
+def limiar(coletor):
+    """Score que um resultado precisa superar para entrar (-inf enquanto houver vaga)."""
+    if len(coletor['heap']) < coletor['k']:
+        return -math.inf
+    return coletor['heap'][0][0]
+
+
+def adicionar(coletor, score, resultado, texto=None):
+    """Oferece um resultado; devolve True se ele entrou entre os K melhores."""
+    heap, por_texto = coletor['heap'], coletor['por_texto']
+    if coletor['k'] <= 0 or (len(heap) >= coletor['k'] and not score > heap[0][0]):
+        return False
+    coletor['contador'] += 1
+    entrada = (score, -coletor['contador'], texto, resultado)
+
+    if por_texto is not None and texto is not None:
+        anterior = por_texto.get(texto)
+        if anterior is not None:
+            if not score > anterior[0]:
+                return False
+            # troca a entrada antiga pela nova no mesmo lugar e refaz o heap (K é pequeno)
+            heap[heap.index(anterior)] = entrada
+            heapq.heapify(heap)
+            por_texto[texto] = entrada
+            return True
+        por_texto[texto] = entrada
+
+    if len(heap) < coletor['k']:
+        heapq.heappush(heap, entrada)
+    else:
+        removida = heapq.heapreplace(heap, entrada)
+        if por_texto is not None and removida[2] is not None:
+            del por_texto[removida[2]]
+    return True
+
+
+def adicionar_lote(coletor, scores, montar):
+    """Oferece um lote de scores; `montar(i)` devolve (resultado, texto) e só é chamada para
+    os índices que superam o limiar, do melhor para o pior.
+    """
+    scores = np.asarray(scores)
+    candidatos = np.flatnonzero(scores > limiar(coletor))
+    if coletor['por_texto'] is None and len(candidatos) > coletor['k']:
+        candidatos = candidatos[np.argpartition(scores[candidatos], -coletor['k'])[-coletor['k']:]]
+    for i in candidatos[np.argsort(scores[candidatos])[::-1]]:
+        if not scores[i] > limiar(coletor):
+            break
+        resultado, texto = montar(i)
+        adicionar(coletor, scores[i].item(), resultado, texto)
+
+
+def melhores(coletor):
+    """Os resultados guardados, do melhor para o pior."""
+    return [entrada[3] for entrada in sorted(coletor['heap'], reverse=True)]
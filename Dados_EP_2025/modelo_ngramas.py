@@ -0,0 +1,87 @@
+import os
+import struct
+import sys
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from alfabeto import MOD, texto_para_array
+
+# Formato do arquivo: cabeçalho de 16 bytes ('NGRM', versão, ordem máxima, reservado)
+# seguido das tabelas float32 de log-probabilidades de 26^1, 26^2, ..., 26^ordem posições.
+MAGICO = b'NGRM'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sIII')
+
+# Contagem atribuída a n-gramas que nunca aparecem no corpus
+PISO = 0.01
+
+
+def indices_ngramas(numeros, n):
+    """Índice inteiro (base 26) de cada n-grama da sequência."""
+    if len(numeros) < n:
+        return np.zeros(0, dtype=np.int64)
+    pesos = MOD ** np.arange(n - 1, -1, -1)
+    return sliding_window_view(np.asarray(numeros, dtype=np.int64), n) @ pesos
+
+
+def construir_modelo(texto, ordem_max=4):
+    """Tabelas densas de log-probabilidade para 1- a `ordem_max`-gramas, com forma (26,)*n."""
+    numeros = texto_para_array(texto)
+    tabelas = []
+    for n in range(1, ordem_max + 1):
+        contagem = np.bincount(indices_ngramas(numeros, n), minlength=MOD ** n).astype(np.float64)
+        total = contagem.sum()
+        contagem[contagem == 0] = PISO
+        tabelas.append(np.log(contagem / total).astype(np.float32).reshape((MOD,) * n))
+    return tabelas
+
+
+def salvar_modelo(caminho, tabelas):
+    with open(caminho, 'wb') as f:
+        f.write(CABECALHO.pack(MAGICO, VERSAO, len(tabelas), 0))
+        for tabela in tabelas:
+            f.write(np.ascontiguousarray(tabela, dtype='<f4').tobytes())
+
+
+def carregar_modelo(caminho):
+    """Abre o modelo por mapeamento de memória; as tabelas só são lidas do disco quando usadas."""
+    with open(caminho, 'rb') as f:
+        magico, versao, ordem_max, _ = CABECALHO.unpack(f.read(CABECALHO.size))
+    if magico != MAGICO or versao != VERSAO:
+        raise ValueError(f"{caminho} não é um modelo de n-gramas válido")
+
+    tabelas = []
+    deslocamento = CABECALHO.size
+    for n in range(1, ordem_max + 1):
+        tabelas.append(np.memmap(caminho, dtype='<f4', mode='r', offset=deslocamento, shape=(MOD,) * n))
+        deslocamento += 4 * MOD ** n
+    return tabelas
+
+
+def modelo_do_corpus(caminho_corpus, ordem_max=4, encoding='latin-1'):
+    """Carrega o modelo compilado ao lado do corpus, recompilando só se o corpus for mais novo."""
+    caminho_modelo = os.path.splitext(caminho_corpus)[0] + '.ngramas'
+    if (os.path.exists(caminho_modelo)
+            and os.path.getmtime(caminho_modelo) >= os.path.getmtime(caminho_corpus)):
+        tabelas = carregar_modelo(caminho_modelo)
+        if len(tabelas) >= ordem_max:
+            return tabelas[:ordem_max]
+
+    with open(caminho_corpus, 'r', encoding=encoding) as f:
+        tabelas = construir_modelo(f.read(), ordem_max)
+    salvar_modelo(caminho_modelo, tabelas)
+    return carregar_modelo(caminho_modelo)
+
+
+def pontuar(numeros, tabela):
+    """Soma das log-probabilidades de todos os n-gramas do texto (n = dimensão da tabela)."""
+    return float(tabela.reshape(-1)[indices_ngramas(numeros, tabela.ndim)].sum())
+
+
+if __name__ == "__main__":
+    # Uso: python modelo_ngramas.py corpus.txt [ordem_max]
+    corpus = sys.argv[1]
+    ordem = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    modelo_do_corpus(corpus, ordem)
+    print(f"Modelo de 1 a {ordem}-gramas salvo em {os.path.splitext(corpus)[0]}.ngramas")
@@ -0,0 +1,155 @@
+import numpy as np
+
+from alfabeto import ALPHABET, MOD, texto_para_array
+from modelo_ngramas import indices_ngramas
+
+# O "mapa" é um array de 26 posições: mapa[letra cifrada] = letra clara.
+# Trocar duas letras da chave equivale a trocar mapa[a] e mapa[b].
+
+# Todas as trocas possíveis, na ordem usada por deltas_todas_trocas
+PARES = [(a, b) for a in range(MOD) for b in range(a + 1, MOD)]
+
+
+def mapa_de_chave_decifragem(chave):
+    # chave[i] = letra clara da letra cifrada i (formato do str.maketrans)
+    return np.array([ord(c) - ord('a') for c in chave])
+
+
+def chave_decifragem_de_mapa(mapa):
+    return ''.join(ALPHABET[m] for m in mapa)
+
+
+def mapa_de_chave_cifragem(chave):
+    # chave[i] = letra cifrada da letra clara i
+    mapa = np.empty(MOD, dtype=np.int64)
+    for claro, cifrado in enumerate(chave):
+        mapa[ord(cifrado) - ord('a')] = claro
+    return mapa
+
+
+def chave_cifragem_de_mapa(mapa):
+    chave = [''] * MOD
+    for cifrado, claro in enumerate(mapa):
+        chave[claro] = ALPHABET[cifrado]
+    return ''.join(chave)
+
+
+def preparar_termos(texto_cifrado, tabelas):
+    """Pré-calcula, para cada tabela de n-gramas, a contagem fixa dos n-gramas do cifrado.
+
+    Para cada troca (a, b) só importam os n-gramas que contêm a ou b. Eles são
+    concatenados par a par, de modo que as 325 trocas são avaliadas de uma vez: ao trocar,
+    o índice de cada n-grama afetado muda de `peso * (mapa[b] - mapa[a])`, com peso fixo.
+    """
+    nums = texto_para_array(texto_cifrado)
+    grupos = []
+    deslocamento = 0
+    total_distintos = 0
+    for tabela in tabelas:
+        n = tabela.ndim
+        distintos, contagens = np.unique(indices_ngramas(nums, n), return_counts=True)
+        ngramas = np.array(np.unravel_index(distintos, (MOD,) * n)).T
+        pesos = MOD ** np.arange(n - 1, -1, -1)
+        grupos.append((ngramas, contagens, pesos, deslocamento, total_distintos))
+        deslocamento += MOD ** n
+        total_distintos += len(ngramas)
+
+    linhas, pesos_troca, pares, inicios = [], [], [], []
+    total_linhas = 0
+    for p, (a, b) in enumerate(PARES):
+        inicios.append(total_linhas)
+        for ngramas, _, pesos, _, primeiro in grupos:
+            afetadas = np.nonzero(((ngramas == a) | (ngramas == b)).any(axis=1))[0]
+            g = ngramas[afetadas]
+            linhas.append(primeiro + afetadas)
+            # a entra no lugar de b e vice-versa
+            pesos_troca.append(((g == a).astype(np.int64) - (g == b)) @ pesos)
+            pares.append(np.full(len(afetadas), p))
+            total_linhas += len(afetadas)
+
+    linhas = np.concatenate(linhas)
+    pares = np.concatenate(pares)
+    contagens = np.concatenate([contagens for _, contagens, _, _, _ in grupos]).astype(np.float64)
+
+    # letras[d, x]: o n-grama distinto d contém a letra cifrada x
+    letras = np.zeros((total_distintos, MOD), dtype=bool)
+    for ngramas, _, _, _, primeiro in grupos:
+        letras[primeiro + np.arange(len(ngramas))[:, None], ngramas] = True
+    # uma troca (a, b) muda a linha se o n-grama dela contém a ou b, ou se o par dela envolve a ou b
+    pa = np.array([a for a, _ in PARES])
+    pb = np.array([b for _, b in PARES])
+    tocadas = letras[linhas]
+    tocadas[np.arange(len(linhas)), pa[pares]] = True
+    tocadas[np.arange(len(linhas)), pb[pares]] = True
+    return {
+        'grupos': [(ngramas, pesos, deslocamento) for ngramas, _, pesos, deslocamento, _ in grupos],
+        'tabela': np.concatenate([np.asarray(t, dtype=np.float64).reshape(-1) for t in tabelas]),
+        'contagens': contagens,
+        'linhas': linhas,
+        'contagens_linhas': contagens[linhas],
+        'pesos_troca': np.concatenate(pesos_troca),
+        'pares': pares,
+        # reduceat precisa de inícios válidos; pares sem n-gramas afetados ficam com delta 0
+        'inicios': np.minimum(inicios, max(total_linhas - 1, 0)),
+        'vazios': np.diff(np.append(inicios, total_linhas)) == 0,
+        'pa': pa,
+        'pb': pb,
+        'tocadas': np.ascontiguousarray(tocadas.T),  # (26, linhas)
+    }
+
+
+def indices_atuais(mapa, termos):
+    # índice na tabela concatenada de cada n-grama distinto do cifrado, sob o mapa atual
+    return np.concatenate([mapa[ngramas] @ pesos + deslocamento
+                           for ngramas, pesos, deslocamento in termos['grupos']])
+
+
+def score_completo(mapa, termos):
+    return float(termos['contagens'] @ termos['tabela'][indices_atuais(mapa, termos)])
+
+
+def variacao_das_linhas(mapa, termos, linhas=slice(None)):
+    # contribuição de cada linha (n-grama afetado de um par) para o delta do seu par
+    tabela = termos['tabela']
+    antes = indices_atuais(mapa, termos)[termos['linhas'][linhas]]
+    diferenca = (mapa[termos['pb']] - mapa[termos['pa']])[termos['pares'][linhas]]
+    depois = antes + termos['pesos_troca'][linhas] * diferenca
+    return termos['contagens_linhas'][linhas] * (tabela[depois] - tabela[antes])
+
+
+def deltas_todas_trocas(mapa, termos):
+    """Variação do score para cada troca de PARES, sem reconstruir o texto.
+
+    Passa por todas as linhas: cerca de 25 vezes o número de n-gramas distintos do cifrado.
+    """
+    if len(termos['linhas']) == 0:
+        return np.zeros(len(PARES))
+    deltas = np.add.reduceat(variacao_das_linhas(mapa, termos), termos['inicios'])
+    deltas[termos['vazios']] = 0.0
+    return deltas
+
+
+def iniciar_deltas(mapa, termos):
+    """Estado para atualizar_deltas: os deltas de todas as trocas e a contribuição de cada linha."""
+    variacao = variacao_das_linhas(mapa, termos)
+    deltas = np.bincount(termos['pares'], weights=variacao, minlength=len(PARES))
+    return {'deltas': deltas, 'variacao': variacao}
+
+
+def atualizar_deltas(estado, mapa, termos, a, b):
+    """Atualiza o estado depois da troca (a, b), já aplicada ao mapa.
+
+    Só mudam as linhas cujo n-grama contém a ou b e as dos pares que envolvem a ou b; o
+    custo é proporcional a elas mais um passo pelos n-gramas distintos. Não é O(26): numa
+    mensagem de 120 letras, uma letra frequente divide n-gramas com quase todas as outras,
+    e uma troca refaz de 30% a 50% das linhas.
+    """
+    linhas = np.flatnonzero(termos['tocadas'][a] | termos['tocadas'][b])
+    nova = variacao_das_linhas(mapa, termos, linhas)
+    estado['deltas'] += np.bincount(termos['pares'][linhas], weights=nova - estado['variacao'][linhas],
+                                    minlength=len(PARES))
+    estado['variacao'][linhas] = nova
+
+
+def trocar(mapa, a, b):
+    mapa[a], mapa[b] = mapa[b], mapa[a]
@@ -0,0 +1,92 @@
+import os
+import sys
+
+import numpy as np
+
+from alfabeto import MOD, texto_para_array, array_para_texto
+from hill_texto_conhecido import quebrar_cifrado
+
+# O GeraEP1 cifra um trecho contíguo de um texto do corpus (conteudo[r:r + tamanho]). Com os
+# textos de origem em mãos, basta achar r: cada texto é normalizado uma vez (mesmo parse do
+# GeraEP1) e todas as posições são testadas de uma vez.
+# Vigenère de período k: c[i] - c[i - k] = p[i] - p[i - k], porque a chave se cancela. A
+# sequência de diferenças do cifrado aparece literalmente nas diferenças do texto de origem:
+# as posições sobreviventes são filtradas letra a letra (cada letra corta ~25/26 delas), e a
+# chave sai de c - p nas k primeiras. Hill: hill_texto_conhecido já resolve o sistema k x k
+# em todas as posições e confere nos blocos seguintes.
+
+
+def normalizar_fontes(caminhos, encoding='latin-1'):
+    """Textos de origem normalizados: lista de (nome, letras 0..25 em uint8). Aceita diretórios."""
+    arquivos = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            arquivos += [os.path.join(caminho, nome) for nome in sorted(os.listdir(caminho))
+                         if nome.endswith('.txt')]
+        else:
+            arquivos.append(caminho)
+    fontes = []
+    for arquivo in arquivos:
+        with open(arquivo, 'r', encoding=encoding) as f:
+            fontes.append((os.path.basename(arquivo), texto_para_array(f.read()).astype(np.uint8)))
+    return fontes
+
+
+def diferencas(letras, k):
+    return (letras[k:].astype(np.int16) - letras[:-k]) % MOD
+
+
+def localizar_vigenere(ciphertext, fonte, k, diferencas_fonte=None):
+    """Posições da fonte onde o cifrado casa com uma chave de período k: lista de (posição, chave)."""
+    cifra = texto_para_array(ciphertext)
+    fonte = np.asarray(fonte)
+    if len(cifra) <= k or len(fonte) < len(cifra):
+        return []
+    alvo = diferencas(cifra, k)
+    if diferencas_fonte is None:
+        diferencas_fonte = diferencas(fonte, k)
+
+    posicoes = np.arange(len(fonte) - len(cifra) + 1)
+    for i, d in enumerate(alvo):
+        posicoes = posicoes[diferencas_fonte[posicoes + i] == d]
+        if not len(posicoes):
+            return []
+
+    encontradas = []
+    for r in posicoes:
+        chave = (cifra[:k] - fonte[r:r + k].astype(np.int64)) % MOD
+        encontradas.append((int(r), array_para_texto(chave)))
+    return encontradas
+
+
+def localizar_origem(ciphertext, cifra, k, fontes):
+    """Procura o trecho de origem em todas as fontes.
+
+    Retorna (nome da fonte, posição, chave, texto claro) ou None. Para Vigenère a chave é o
+    texto de k letras; para Hill, a matriz de cifragem.
+    """
+    for nome, letras in fontes:
+        if cifra == 'Vigenere':
+            encontradas = localizar_vigenere(ciphertext, letras, k)
+            if encontradas:
+                posicao, chave = encontradas[0]
+                return nome, posicao, chave, array_para_texto(letras[posicao:posicao + len(texto_para_array(ciphertext))])
+        elif cifra == 'Hill':
+            resultado = quebrar_cifrado(ciphertext, letras, k)
+            if resultado is not None:
+                posicao, chave, texto = resultado
+                return nome, posicao, chave, texto
+    return None
+
+
+if __name__ == "__main__":
+    # Uso: python origem_corpus.py <cifrado> <Hill|Vigenere> <k> <fonte ou diretório>...
+    with open(sys.argv[1], 'r') as f:
+        cifrado = f.read().strip()
+    resultado = localizar_origem(cifrado, sys.argv[2], int(sys.argv[3]), normalizar_fontes(sys.argv[4:]))
+    if resultado is None:
+        print("Trecho não encontrado nas fontes")
+    else:
+        nome, posicao, chave, texto = resultado
+        print(f"{nome}, posição {posicao} | Chave: {chave}")
+        print(texto)
@@ -0,0 +1,227 @@
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from multiprocessing import Pool, cpu_count
+
+from alfabeto import array_para_texto, texto_para_array
+from hill_linhas import quebrar_hill_por_linhas
+from hill_texto_conhecido import quebrar_cifrado
+from hill_triangular import quebrar_hill_triangular
+from hill_vetorizado import quebrar_hill_2x2
+from isomorfos import indice_do_corpus, quebrar_mono_por_padroes
+from modelo_ngramas import modelo_do_corpus, pontuar
+from mono_incremental import chave_cifragem_de_mapa
+from origem_corpus import localizar_vigenere
+from reinicios_paralelos import anelamento_paralelo
+from segmentacao import carregar_vocabulario_com_frequencia
+from vigenere import quebrar_vigenere_em_feixe
+from vigenere_arrasto import preparar_arrasto, quebrar_vigenere_por_arrasto, confianca
+
+# Convenção do GeraEP1.save_file: Cifrado/<Cifra>/GrupoNN[_k]_texto_cifrado.txt
+CIFRAS = ('Hill', 'Mono', 'Vigenere')
+PADRAO = re.compile(r'(Grupo\d+)(?:_(\d+))?_texto_cifrado\.txt$')
+CAMPOS = ['arquivo', 'cifra', 'grupo', 'k', 'metodo', 'chave', 'score', 'confianca', 'tempo', 'texto', 'erro']
+
+# Estado de cada processo, preenchido uma vez pelo inicializador do Pool
+_raiz = None
+_tabelas = None
+_isomorfos = None
+_arrasto = None
+_crib = None
+_cadeias_mono = None
+_triangular = False
+
+
+def descobrir_tarefas(raiz, cifras=CIFRAS):
+    """Lista os cifrados de raiz/Cifrado/{Hill,Mono,Vigenere}, com cifra, grupo e k tirados do caminho."""
+    tarefas = []
+    for cifra in cifras:
+        diretorio = os.path.join(raiz, 'Cifrado', cifra)
+        if not os.path.isdir(diretorio):
+            continue
+        for nome in sorted(os.listdir(diretorio)):
+            casamento = PADRAO.match(nome)
+            if not casamento:
+                continue
+            k = int(casamento.group(2)) if casamento.group(2) else None
+            if cifra != 'Mono' and k is None:
+                continue
+            tarefas.append({'arquivo': os.path.join('Cifrado', cifra, nome),
+                            'cifra': cifra, 'grupo': casamento.group(1), 'k': k})
+    return tarefas
+
+
+def _iniciar_trabalhador(raiz, caminho_corpus, encoding, texto_conhecido, cadeias_mono, triangular, cifras):
+    global _raiz, _tabelas, _isomorfos, _arrasto, _crib, _cadeias_mono, _triangular
+    _raiz = raiz
+    # o modelo é aberto por mmap: os processos compartilham as mesmas páginas
+    _tabelas = modelo_do_corpus(caminho_corpus, encoding=encoding)
+    # o resto só é carregado se alguma das cifras do lote usa
+    _isomorfos = indice_do_corpus(caminho_corpus, encoding=encoding) if 'Mono' in cifras else None
+    _arrasto = None
+    if 'Vigenere' in cifras:
+        _arrasto = preparar_arrasto(carregar_vocabulario_com_frequencia(caminho_corpus, encoding))
+    _crib = None
+    if texto_conhecido and ('Hill' in cifras or 'Vigenere' in cifras):
+        with open(caminho_corpus, 'r', encoding=encoding) as f:
+            _crib = texto_para_array(f.read())
+    _cadeias_mono = cadeias_mono
+    _triangular = triangular
+
+
+def quebrar_hill(ciphertext, k):
+    if _crib is not None:
+        resultado = quebrar_cifrado(ciphertext, _crib, k)
+        if resultado is not None:
+            _, chave, texto = resultado
+            return 'texto conhecido', chave, texto, 'alta'
+    if k == 2:
+        _, chave, texto = quebrar_hill_2x2(ciphertext, _tabelas[1], top=1)[0]
+        return 'forca bruta 2x2', chave, texto, None
+    if _triangular:
+        _, chave, texto = quebrar_hill_triangular(ciphertext, k, _tabelas[1], top=1, tabela_final=_tabelas[3])[0]
+        return 'triangular', chave, texto, None
+    _, chave, texto = quebrar_hill_por_linhas(ciphertext, k, _tabelas[1], top=1)[0]
+    return 'linhas', chave, texto, None
+
+
+def quebrar_mono(ciphertext, k):
+    # a chave dos padrões de palavras é a partida de uma das cadeias; fica a de melhor score
+    # (as duas buscas usam as mesmas tabelas, então os scores são comparáveis)
+    padroes = quebrar_mono_por_padroes(ciphertext, _isomorfos, _tabelas[1:4], top=1)
+    # o trabalhador já é um processo do Pool: as cadeias rodam em sequência nele
+    melhor = anelamento_paralelo(ciphertext, _tabelas[1:4], n_cadeias=_cadeias_mono, n_processos=1, top=1,
+                                 mapas_iniciais=[r['mapa'] for r in padroes])[0]
+    if padroes and padroes[0]['score'] >= melhor['score']:
+        return 'padroes', chave_cifragem_de_mapa(padroes[0]['mapa']), padroes[0]['texto'], None
+    return 'annealing', chave_cifragem_de_mapa(melhor['mapa']), melhor['texto'], None
+
+
+def quebrar_vigenere(ciphertext, k):
+    if _crib is not None:
+        encontradas = localizar_vigenere(ciphertext, _crib, k)
+        if encontradas:
+            posicao, chave = encontradas[0]
+            texto = array_para_texto(_crib[posicao:posicao + len(texto_para_array(ciphertext))])
+            return 'texto conhecido', chave, texto, 'alta'
+    if k >= 40:
+        # poucas letras por coluna: a estatística das colunas não basta, só as palavras prováveis;
+        # com k = 60 o resultado costuma estar errado, e a confiança diz isso no relatório
+        _, chave, texto = quebrar_vigenere_por_arrasto(ciphertext, k, _tabelas, _arrasto, top=1)[0]
+        return 'arrasto', chave, texto, confianca(texto, k, _arrasto)
+    _, chave, texto = quebrar_vigenere_em_feixe(ciphertext, k, _tabelas, top=1)[0]
+    return 'feixe', chave, texto, None
+
+
+QUEBRADORES = {'Hill': quebrar_hill, 'Mono': quebrar_mono, 'Vigenere': quebrar_vigenere}
+
+
+def processar_tarefa(tarefa):
+    """Quebra um arquivo; erros viram um campo do resultado para não derrubar o lote."""
+    resultado = dict(tarefa, metodo=None, chave=None, score=None, confianca=None, texto=None, erro=None)
+    inicio = time.time()
+    try:
+        with open(os.path.join(_raiz, tarefa['arquivo']), 'r') as f:
+            ciphertext = f.read().strip()
+        metodo, chave, texto, nivel = QUEBRADORES[tarefa['cifra']](ciphertext, tarefa['k'])
+        numeros = texto_para_array(texto)
+        # mesmo critério para todas as cifras: log-prob média de bigramas do texto decifrado
+        resultado.update(metodo=metodo, chave=chave, texto=texto, confianca=nivel,
+                         score=pontuar(numeros, _tabelas[1]) / max(len(numeros) - 1, 1))
+    except Exception as erro:
+        resultado['erro'] = f'{type(erro).__name__}: {erro}'
+    resultado['tempo'] = time.time() - inicio
+    return resultado
+
+
+def carregar_parciais(caminho):
+    """Lê o relatório parcial (JSON Lines) e o regrava sem a última linha, se ela ficou cortada."""
+    if not os.path.exists(caminho):
+        return {}
+    feitos = {}
+    with open(caminho, 'r') as f:
+        for linha in f:
+            try:
+                resultado = json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+            feitos[resultado['arquivo']] = resultado
+
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w') as f:
+        for resultado in feitos.values():
+            f.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+    os.replace(temporario, caminho)
+    return feitos
+
+
+def escrever_relatorios(resultados, prefixo):
+    resultados = sorted(resultados, key=lambda r: r['arquivo'])
+    with open(prefixo + '.json', 'w') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    with open(prefixo + '.csv', 'w', newline='') as f:
+        escritor = csv.DictWriter(f, fieldnames=CAMPOS)
+        escritor.writeheader()
+        for resultado in resultados:
+            escritor.writerow({campo: resultado.get(campo) for campo in CAMPOS})
+
+
+def processar_lote(raiz, caminho_corpus, encoding='latin-1', texto_conhecido=False, processos=None,
+                   cadeias_mono=4, cifras=CIFRAS, prefixo=None, triangular=False):
+    """Quebra todos os cifrados de `raiz` em um Pool e escreve prefixo.json / prefixo.csv.
+
+    Cada resultado é gravado em prefixo.jsonl assim que fica pronto; ao rodar de novo,
+    arquivos já resolvidos (sem erro) são pulados.
+    """
+    if processos is None:
+        processos = cpu_count() - 1 or 1
+    if prefixo is None:
+        prefixo = os.path.join(raiz, 'relatorio_lote')
+    parcial = prefixo + '.jsonl'
+
+    feitos = carregar_parciais(parcial)
+    pendentes = [t for t in descobrir_tarefas(raiz, cifras)
+                 if t['arquivo'] not in feitos or feitos[t['arquivo']]['erro']]
+    print(f"{len(feitos)} resultados anteriores, {len(pendentes)} arquivos pendentes")
+
+    with open(parcial, 'a') as saida, Pool(processos, initializer=_iniciar_trabalhador,
+                                           initargs=(raiz, caminho_corpus, encoding, texto_conhecido,
+                                                     cadeias_mono, triangular,
+                                                     {t['cifra'] for t in pendentes})) as pool:
+        for i, resultado in enumerate(pool.imap_unordered(processar_tarefa, pendentes), 1):
+            saida.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+            saida.flush()
+            os.fsync(saida.fileno())
+            feitos[resultado['arquivo']] = resultado
+            situacao = resultado['erro'] or f"{resultado['metodo']} | Chave: {resultado['chave']}"
+            if resultado['confianca'] == 'baixa':
+                situacao += ' (confiança baixa)'
+            print(f"[{i}/{len(pendentes)}] {resultado['arquivo']} ({resultado['tempo']:.1f}s) {situacao}")
+
+    escrever_relatorios(feitos.values(), prefixo)
+    return feitos
+
+
+if __name__ == "__main__":
+    # Uso: python processar_lote.py textos_conhecidos textos_conhecidos/avesso_da_pele.txt --texto-conhecido
+    parser = argparse.ArgumentParser(description='Quebra em lote todos os arquivos de <raiz>/Cifrado.')
+    parser.add_argument('raiz')
+    parser.add_argument('corpus', help='corpus do modelo de n-gramas (e crib, com --texto-conhecido)')
+    parser.add_argument('--encoding', default='latin-1')
+    parser.add_argument('--texto-conhecido', action='store_true',
+                        help='os textos claros foram tirados do próprio corpus (Hill e Vigenère); para '
+                             'Vigenère com k >= 40 é o caminho confiável: sem ele, o arrasto de palavras '
+                             'erra a maioria dos textos com k = 60 (marcados com confiança baixa)')
+    parser.add_argument('--triangular', action='store_true',
+                        help='as chaves de Hill são triangulares superiores (GeraEP1.enc_hill)')
+    parser.add_argument('--processos', type=int)
+    parser.add_argument('--cadeias-mono', type=int, default=4)
+    parser.add_argument('--cifras', nargs='+', choices=CIFRAS, default=list(CIFRAS))
+    parser.add_argument('--saida', help='prefixo dos relatórios (padrão: <raiz>/relatorio_lote)')
+    args = parser.parse_args()
+
+    processar_lote(args.raiz, args.corpus, args.encoding, args.texto_conhecido, args.processos,
+                   args.cadeias_mono, args.cifras, args.saida, args.triangular)
@@ -0,0 +1,126 @@
+import math
+import random
+import time
+from multiprocessing import Pool, Value, cpu_count
+
+import numpy as np
+
+from alfabeto import ALPHABET, MOD, texto_para_array
+from melhores import novo_coletor, adicionar, melhores
+from mono_incremental import PARES, preparar_termos, score_completo, iniciar_deltas, atualizar_deltas, trocar
+
+# Estado de cada processo, preenchido uma vez pelo inicializador do Pool
+_melhor_global = None
+_termos = None
+
+
+def _iniciar_trabalhador(melhor_global, texto_cifrado, tabelas):
+    global _melhor_global, _termos
+    _melhor_global = melhor_global
+    _termos = preparar_termos(texto_cifrado, tabelas)
+
+
+def executar_cadeia(args):
+    """Uma cadeia de simulated annealing a partir de uma chave aleatória (ou do mapa dado).
+
+    Ao fim de cada temperatura publica o próprio recorde no melhor score global; depois da
+    metade do resfriamento, a cadeia desiste se estiver mais de `margem` abaixo dele.
+    """
+    semente, mapa_inicial, temp_inicial, temp_final, alpha, iteracoes_por_temp, margem = args
+    rng = random.Random(semente)
+    inicio = time.time()
+
+    if mapa_inicial is None:
+        mapa = np.array(rng.sample(range(MOD), MOD))
+    else:
+        mapa = np.array(mapa_inicial)
+    score_atual = score_completo(mapa, _termos)
+    estado = iniciar_deltas(mapa, _termos)
+    melhor_mapa = mapa.copy()
+    melhor_score = score_atual
+
+    niveis = math.ceil(math.log(temp_final / temp_inicial) / math.log(alpha))
+    interrompida = False
+    temp = temp_inicial
+    for nivel in range(niveis):
+        for _ in range(iteracoes_por_temp):
+            par = rng.randrange(len(PARES))
+            delta = estado['deltas'][par]
+            if delta > 0 or rng.random() < math.exp(delta / temp):
+                trocar(mapa, *PARES[par])
+                score_atual += delta
+                atualizar_deltas(estado, mapa, _termos, *PARES[par])
+                if score_atual > melhor_score:
+                    melhor_score = score_atual
+                    melhor_mapa = mapa.copy()
+
+        with _melhor_global.get_lock():
+            if melhor_score > _melhor_global.value:
+                _melhor_global.value = melhor_score
+            global_atual = _melhor_global.value
+        if nivel >= niveis // 2 and melhor_score < global_atual - margem:
+            interrompida = True
+            break
+        temp *= alpha
+
+    return semente, melhor_mapa.tolist(), melhor_score, time.time() - inicio, interrompida
+
+
+def anelamento_paralelo(texto_cifrado, tabelas, n_cadeias=None, n_processos=None, top=5,
+                        temp_inicial=10.0, temp_final=0.01, alpha=0.95, iteracoes_por_temp=5000,
+                        margem=25.0, semente=None, mapas_iniciais=None):
+    """Roda `n_cadeias` cadeias independentes em um Pool e devolve as `top` melhores chaves distintas.
+
+    As primeiras cadeias podem partir de `mapas_iniciais` (ex.: as chaves de
+    isomorfos.quebrar_mono_por_padroes, com uma temperatura inicial baixa); as demais
+    partem de chaves aleatórias.
+
+    Cada resultado é um dict com mapa (mapa[letra cifrada] = letra clara), texto, score,
+    tempo da cadeia e se ela foi interrompida por estar muito abaixo do melhor global.
+    """
+    if n_processos is None:
+        n_processos = cpu_count() - 1 or 1
+    if n_cadeias is None:
+        n_cadeias = 4 * n_processos
+    if semente is None:
+        semente = random.randrange(2 ** 32)
+
+    tabelas = [np.array(t) for t in tabelas]
+    melhor_global = Value('d', -math.inf)
+    mapas_iniciais = list(mapas_iniciais or [])
+    tarefas = [(semente + i, mapas_iniciais[i] if i < len(mapas_iniciais) else None,
+                temp_inicial, temp_final, alpha, iteracoes_por_temp, margem)
+               for i in range(n_cadeias)]
+
+    # chaves que só diferem em letras ausentes do cifrado dão o mesmo texto: uma vaga por texto
+    nums = texto_para_array(texto_cifrado)
+    coletor = novo_coletor(top, deduplicar=True)
+
+    def coletar(semente_cadeia, mapa, score, tempo, interrompida):
+        texto = ''.join(ALPHABET[mapa[c]] for c in nums)
+        adicionar(coletor, score, {
+            'mapa': mapa,
+            'texto': texto,
+            'score': score,
+            'semente': semente_cadeia,
+            'tempo': tempo,
+            'interrompida': interrompida,
+        }, texto)
+
+    inicio = time.time()
+    if n_processos == 1:
+        # no próprio processo (ex.: dentro de um trabalhador do lote, que não pode abrir outro Pool)
+        _iniciar_trabalhador(melhor_global, texto_cifrado, tabelas)
+        for resultado in map(executar_cadeia, tarefas):
+            coletar(*resultado)
+    else:
+        with Pool(n_processos, initializer=_iniciar_trabalhador,
+                  initargs=(melhor_global, texto_cifrado, tabelas)) as pool:
+            for resultado in pool.imap_unordered(executar_cadeia, tarefas):
+                coletar(*resultado)
+    tempo_total = time.time() - inicio
+
+    resultados = melhores(coletor)
+    for resultado in resultados:
+        resultado['tempo_total'] = tempo_total
+    return resultados
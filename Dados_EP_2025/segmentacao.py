@@ -0,0 +1,95 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from automato_palavras import compilar_automato, indices_letras
+
+
+def carregar_vocabulario_com_frequencia(caminho_arquivo, encoding='latin-1'):
+    with open(caminho_arquivo, 'r', encoding=encoding) as f:
+        texto = f.read()
+
+    texto = unicodedata.normalize('NFD', texto)
+    texto = texto.encode('ascii', 'ignore').decode('latin-1')
+
+    palavras = re.findall(r'\b[a-zA-Z]{3,}\b', texto)
+    palavras = [p.upper() for p in palavras]
+
+    contagem = Counter(palavras)
+    return dict(contagem)  # retorna dicionário palavra->frequência
+
+
+def modelo_segmentacao(vocab_freq, fator_desconhecida=1.0):
+    """Modelo de unigramas: cada palavra vale log(freq / total) e cada letra fora de
+    palavra vale `fator_desconhecida` * log(1 / total), o custo de uma palavra vista uma vez.
+    """
+    if not isinstance(vocab_freq, dict):
+        vocab_freq = {palavra: 1 for palavra in vocab_freq}
+    total = sum(vocab_freq.values())
+    log_probs = {palavra: math.log(freq / total) for palavra, freq in vocab_freq.items()}
+    return {
+        'automato': compilar_automato(log_probs),
+        'custo_desconhecida': fator_desconhecida * math.log(1 / total),
+    }
+
+
+def _viterbi(texto, modelo, guardar_caminho):
+    # melhor[i] = melhor log-prob de texto[:i]; as palavras que terminam em i saem do
+    # autômato na mesma passada, então só há um float por posição (e os ponteiros, se pedidos)
+    automato = modelo['automato']
+    transicoes, fim, saida = automato['transicoes'], automato['fim'], automato['saida']
+    log_probs, palavras = automato['pesos'], automato['palavras']
+    desconhecida = modelo['custo_desconhecida']
+
+    n = len(texto)
+    melhor = [0.0] * (n + 1)
+    origem = [0] * (n + 1) if guardar_caminho else None
+    palavra_em = [-1] * (n + 1) if guardar_caminho else None
+
+    estado = 0
+    for i, c in enumerate(indices_letras(texto)):
+        melhor[i + 1] = melhor[i] + desconhecida
+        if guardar_caminho:
+            origem[i + 1] = i
+        if c < 0:
+            estado = 0
+            continue
+        estado = int(transicoes[estado, c])
+        atual = estado if fim[estado] >= 0 else int(saida[estado])
+        while atual >= 0:
+            palavra = int(fim[atual])
+            inicio = i + 1 - len(palavras[palavra])
+            score = melhor[inicio] + log_probs[palavra]
+            if score > melhor[i + 1]:
+                melhor[i + 1] = score
+                if guardar_caminho:
+                    origem[i + 1] = inicio
+                    palavra_em[i + 1] = palavra
+            atual = int(saida[atual])
+    return melhor[n], origem, palavra_em
+
+
+def score_segmentacao(texto, modelo):
+    """Só o log-prob da melhor segmentação, sem montar a lista de palavras (para laços de busca)."""
+    return _viterbi(texto, modelo, False)[0]
+
+
+def segmentar(texto, modelo):
+    """Melhor segmentação: (log-prob, palavras). Letras fora de palavra viram um '??trecho??'."""
+    score, origem, palavra_em = _viterbi(texto, modelo, True)
+    palavras = []
+    desconhecido = []
+    i = len(texto)
+    while i > 0:
+        if palavra_em[i] < 0:
+            desconhecido.append(texto[i - 1])
+        else:
+            if desconhecido:
+                palavras.append(f"??{''.join(reversed(desconhecido))}??")
+                desconhecido = []
+            palavras.append(texto[origem[i]:i])
+        i = origem[i]
+    if desconhecido:
+        palavras.append(f"??{''.join(reversed(desconhecido))}??")
+    return score, palavras[::-1]
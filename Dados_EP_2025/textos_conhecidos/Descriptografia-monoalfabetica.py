@@ -1,53 +1,28 @@
+import os
 import string
 import random
 import math
-from collections import Counter
+import sys
 
-ALPHABET = string.ascii_lowercase
-
-def preprocess_text(text):
-    text = text.lower()
-    return ''.join(c for c in text if c in ALPHABET)
-
-def get_ngrams(text, n):
-    return [text[i:i+n] for i in range(len(text)-n+1)]
-
-def extrair_frequencias_ngrams(texto_base):
-    texto = preprocess_text(texto_base)
-    bigrams = get_ngrams(texto, 2)
-    trigrams = get_ngrams(texto, 3)
-
-    total_bigrams = len(bigrams)
-    total_trigrams = len(trigrams)
-
-    freq_bigram = Counter(bigrams)
-    freq_trigram = Counter(trigrams)
+import numpy as np
 
-    for k in freq_bigram:
-        freq_bigram[k] /= total_bigrams
-    for k in freq_trigram:
-        freq_trigram[k] /= total_trigrams
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from alfabeto import texto_para_array
+from modelo_ngramas import modelo_do_corpus, pontuar
+from mono_incremental import (PARES, preparar_termos, score_completo, iniciar_deltas,
+                              atualizar_deltas, trocar, chave_cifragem_de_mapa)
+from reinicios_paralelos import anelamento_paralelo
 
-    return freq_bigram, freq_trigram
-
-def score_ngrams(text, freq_bigram, freq_trigram):
-    text = preprocess_text(text)
-    bigrams = get_ngrams(text, 2)
-    trigrams = get_ngrams(text, 3)
-
-    score = 0.0
-
-    bigram_counts = Counter(bigrams)
-    for bg, count in bigram_counts.items():
-        freq = freq_bigram.get(bg, 1e-6)  # valor pequeno para n-gramas raros
-        score += math.log(freq) * count
+ALPHABET = string.ascii_lowercase
 
-    trigram_counts = Counter(trigrams)
-    for tg, count in trigram_counts.items():
-        freq = freq_trigram.get(tg, 1e-6)
-        score += math.log(freq) * count
+def extrair_frequencias_ngrams(caminho_corpus):
+    # Tabelas compiladas uma vez e reabertas por mmap nas execuções seguintes
+    _, tabela_bigramas, tabela_trigramas, _ = modelo_do_corpus(caminho_corpus)
+    return tabela_bigramas, tabela_trigramas
 
-    return score
+def score_ngrams(text, tabela_bigramas, tabela_trigramas):
+    numeros = texto_para_array(text)
+    return pontuar(numeros, tabela_bigramas) + pontuar(numeros, tabela_trigramas)
 
 def decifra(texto_cifrado, chave):
     mapa = {c: chave[i] for i, c in enumerate(ALPHABET)}
@@ -61,39 +36,37 @@ def decifra(texto_cifrado, chave):
             resultado.append(c)
     return ''.join(resultado)
 
-def gerar_vizinho(chave):
-    chave_lista = list(chave)
-    i, j = random.sample(range(len(chave_lista)), 2)
-    chave_lista[i], chave_lista[j] = chave_lista[j], chave_lista[i]
-    return ''.join(chave_lista)
-
-def simulated_annealing(texto_cifrado, freq_bigram, freq_trigram,
+def simulated_annealing(texto_cifrado, tabela_bigramas, tabela_trigramas,
                         temp_inicial=10.0, temp_final=0.01, alpha=0.95, iteracoes_por_temp=5000):
-    chave_atual = ''.join(random.sample(ALPHABET, len(ALPHABET)))
-    texto_decifrado = decifra(texto_cifrado, chave_atual)
-    score_atual = score_ngrams(texto_decifrado, freq_bigram, freq_trigram)
+    # As contagens de n-gramas do cifrado ficam fixas; cada troca só reavalia
+    # os n-gramas que contêm uma das duas letras trocadas. Os deltas de todas as
+    # trocas são calculados de uma vez; uma troca aceita só refaz os n-gramas
+    # que ela mexe.
+    termos = preparar_termos(texto_cifrado, [tabela_bigramas, tabela_trigramas])
+
+    mapa = np.array(random.sample(range(len(ALPHABET)), len(ALPHABET)))
+    score_atual = score_completo(mapa, termos)
+    estado = iniciar_deltas(mapa, termos)
 
-    melhor_chave = chave_atual
+    melhor_chave = chave_cifragem_de_mapa(mapa)
     melhor_score = score_atual
 
     temp = temp_inicial
 
     while temp > temp_final:
         for _ in range(iteracoes_por_temp):
-            chave_vizinha = gerar_vizinho(chave_atual)
-            texto_vizinho = decifra(texto_cifrado, chave_vizinha)
-            score_vizinho = score_ngrams(texto_vizinho, freq_bigram, freq_trigram)
+            par = random.randrange(len(PARES))
+            delta = estado['deltas'][par]
 
-            delta = score_vizinho - score_atual
-            
             if delta > 0 or random.random() < math.exp(delta / temp):
-                chave_atual = chave_vizinha
-                score_atual = score_vizinho
+                trocar(mapa, *PARES[par])
+                score_atual += delta
+                atualizar_deltas(estado, mapa, termos, *PARES[par])
 
                 if score_atual > melhor_score:
-                    print(decifra(texto_cifrado, chave_atual))
                     melhor_score = score_atual
-                    melhor_chave = chave_atual
+                    melhor_chave = chave_cifragem_de_mapa(mapa)
+                    print(decifra(texto_cifrado, melhor_chave))
 
         print(f"Temp: {temp:.4f} | Score: {melhor_score:.4f} | Chave: {melhor_chave}")
         temp *= alpha
@@ -101,16 +74,21 @@ def simulated_annealing(texto_cifrado, freq_bigram, freq_trigram,
     return melhor_chave, melhor_score
 
 if __name__ == "__main__":
-    # Lê arquivo texto base
-    caminho_arquivo = "texto_base.txt"  # coloque aqui o caminho para seu arquivo txt
-    with open(  'avesso_da_pele.txt', "r", encoding="latin-1") as f:
-        texto_base = f.read()
+    # Corpus base (o modelo de n-gramas é compilado ao lado dele na primeira execução)
+    caminho_arquivo = 'avesso_da_pele.txt'
 
     texto_cifrado = "iqnjivhaqjhgwbacivpjmwqarrjabaqhuhafawghfoamhfoihvwyavagiyakavjqarajuariwnjhqwfwivalavwauiqmhrrwfaiywlarjaqaighfoadwugam"
 
-    freq_bigram, freq_trigram = extrair_frequencias_ngrams(texto_base)
-    chave, score = simulated_annealing(texto_cifrado, freq_bigram, freq_trigram)
+    tabela_bigramas, tabela_trigramas = extrair_frequencias_ngrams(caminho_arquivo)
+    # Várias cadeias em paralelo; as que ficam muito atrás da melhor desistem no meio
+    resultados = anelamento_paralelo(texto_cifrado, [tabela_bigramas, tabela_trigramas], top=5)
+    for r in resultados:
+        status = " (interrompida)" if r['interrompida'] else ""
+        print(f"Score: {r['score']:.4f} | Chave: {chave_cifragem_de_mapa(r['mapa'])} | "
+              f"{r['tempo']:.1f}s{status} | {r['texto']}")
 
+    chave = chave_cifragem_de_mapa(resultados[0]['mapa'])
+    print(f"\nTempo total: {resultados[0]['tempo_total']:.1f}s")
     print("\nMelhor chave encontrada:", chave)
     texto_decifrado = decifra(texto_cifrado, 'aelmibkohpsuqfwynvrgjdtxzc')
     print("\nTexto decifrado:\n", texto_decifrado)
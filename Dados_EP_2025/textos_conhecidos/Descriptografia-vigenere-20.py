@@ -1,23 +1,24 @@
+import os
 import string
+import sys
 from collections import Counter
 from unidecode import unidecode
-from itertools import product
-import re
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from alfabeto import FREQ_PT, texto_para_array
+from modelo_ngramas import modelo_do_corpus
+from automato_palavras import compilar_automato, pontuar
+from melhores import novo_coletor, adicionar, melhores
+from vigenere import (estimar_periodos, chi_quadrado_por_coluna, quebrar_vigenere_por_colunas,
+                      busca_em_feixe)
 ALPHABET = string.ascii_lowercase
 ALPHABET_LEN = len(ALPHABET)
 
-# Frequência das letras no português (%)
-FREQ_PT = {
-    'a': 14.63, 'e': 12.57, 'o': 10.73, 's': 7.81, 'r': 6.53, 'i': 6.18,
-    'n': 5.05, 'd': 4.99, 'm': 4.74, 'u': 4.63, 't': 4.34, 'c': 3.88,
-    'l': 2.78, 'p': 2.52, 'v': 1.67, 'g': 1.30, 'h': 1.28, 'q': 1.20,
-    'b': 1.04, 'f': 1.02, 'z': 0.47, 'j': 0.40, 'x': 0.21, 'k': 0.02
-}
-
 # Letras muito raras em português
 LETRAS_PROIBIDAS = {'w', 'y', 'k'}
 PESO_VOCAB = 3
 PESO_FREQ = 1
+PESO_NGRAMAS = 30
 PENALIDADE_PROIBIDAS = -200
 
 def carregar_vocabulario_arquivo(path):
@@ -42,50 +43,32 @@ def score_por_frequencia_letras(texto):
         total += freq_real * freq_esperada
     return total
 
-def letras_mais_provaveis_por_posicao(ciphertext, vocab_counter, key_len, top_n=8):
-    vocab_patterns = [(re.compile(r'\b' + re.escape(palavra) + r'\b'), freq)
-                      for palavra, freq in vocab_counter.items() if len(palavra) > 2]
-    
-    letras_por_posicao = []
-
-    for i in range(key_len):
-        trecho = ciphertext[i::key_len]
-        pontuacoes = []
-
-        for shift in range(ALPHABET_LEN):
-            # Decifra o trecho com o shift atual
-            decifrado = ''.join(
-                ALPHABET[(ALPHABET.index(c) - shift) % ALPHABET_LEN]
-                for c in trecho if c in ALPHABET
-            )
-
-            # Score baseado em palavras encontradas
-            score_vocab = 0
-            for pattern, freq in vocab_patterns:
-                if pattern.search(decifrado):
-                    score_vocab += len(pattern.pattern) * freq  # mais peso a palavras maiores
-
-            # Score baseado em frequência de letras
-            score_freq = score_por_frequencia_letras(decifrado)
+def letras_mais_provaveis_por_posicao(ciphertext, tabelas, key_len, top_n=8):
+    # Qui-quadrado de todas as colunas e deslocamentos de uma vez contra o modelo de letras;
+    # em cada posição, a letra da chave refinada pelos bigramas vem primeiro
+    tabela_mono, tabela_bi = tabelas[0], tabelas[1]
+    chi2 = chi_quadrado_por_coluna(texto_para_array(ciphertext), key_len, tabela_mono)
+    _, chave_refinada, _ = quebrar_vigenere_por_colunas(ciphertext, key_len, tabela_mono, tabela_bi)
 
-            # Score final ponderado (ajuste os pesos conforme testes)
-            score_total = 0.6 * score_vocab + 0.4 * score_freq
-
-            pontuacoes.append((score_total, ALPHABET[shift]))
-
-        melhores = [letra for _, letra in sorted(pontuacoes, reverse=True)[:top_n]]
-        letras_por_posicao.append(melhores)
+    letras_por_posicao = []
+    for i, ordem in enumerate(chi2.argsort(axis=1)):
+        primeira = ALPHABET.index(chave_refinada[i])
+        ordem = [primeira] + [s for s in ordem if s != primeira]
+        letras_por_posicao.append([ALPHABET[s] for s in ordem[:top_n]])
 
     return letras_por_posicao
 
-def gerar_chaves(letras_por_posicao, limite=1000):
-    for i, combinacao in enumerate(product(*letras_por_posicao)):
-        if i >= limite:
-            break
-        yield ''.join(combinacao)
+def gerar_chaves(ciphertext, letras_por_posicao, tabelas, feixe=500):
+    # Busca em feixe: cada posição da chave só estende os `feixe` melhores prefixos,
+    # pontuados pelos n-gramas da decifragem parcial, então todas as posições variam
+    candidatos = [[ALPHABET.index(letra) for letra in letras] for letras in letras_por_posicao]
+    chaves, scores = busca_em_feixe(texto_para_array(ciphertext), len(letras_por_posicao), tabelas, feixe, candidatos)
+    for chave, score in zip(chaves, scores):
+        yield ''.join(ALPHABET[s] for s in chave), float(score)
 
-def score_por_vocabulario(texto, vocab_counter):
-    return sum(freq for palavra, freq in vocab_counter.items() if palavra in texto)
+def score_por_vocabulario(texto, automato):
+    # Soma das frequências das palavras do vocabulário presentes no texto (uma passada)
+    return pontuar(automato, texto)
 
 def score_por_frequencia(texto):
     contagem = Counter(c for c in texto if c in ALPHABET)
@@ -104,26 +87,42 @@ def score_por_frequencia(texto):
 
     return score
 
-def quebrar_vigenere(ciphertext, vocab_counter, key_len=20, top_n=8, limite=1000):
-    letras_por_pos = letras_mais_provaveis_por_posicao(ciphertext, vocab_counter, key_len, top_n)
-    melhores_resultados = []
-
-    for chave in gerar_chaves(letras_por_pos, limite):
-        texto = vigenere_decrypt(ciphertext, chave)
-        score_vocab = score_por_vocabulario(texto, vocab_counter)
-        score_freq = score_por_frequencia(texto)
-        score_total = PESO_VOCAB * score_vocab + PESO_FREQ * score_freq
-        melhores_resultados.append((score_total, chave, texto))
-
-    melhores_resultados.sort(reverse=True)
-    return melhores_resultados[:5]
+def quebrar_vigenere(ciphertext, vocab_counter, tabelas, key_len=None, top_n=8, feixe=500, n_periodos=1, top=5):
+    # Sem key_len, a busca roda só nos períodos mais prováveis pelas diferenças entre letras
+    # da mesma coluna. Chaves longas sempre se ajustam melhor aos n-gramas, então os scores
+    # de períodos diferentes não se comparam: com mais de um, os resultados saem na ordem
+    # de estimar_periodos (os `top` do primeiro período, depois os do segundo...)
+    if key_len is None:
+        periodos = [p for p, _, _ in estimar_periodos(ciphertext)[:n_periodos]]
+    else:
+        periodos = [key_len]
+
+    automato = compilar_automato(vocab_counter)
+    resultados = []
+    for periodo in periodos:
+        coletor = novo_coletor(top, deduplicar=True)
+        letras_por_pos = letras_mais_provaveis_por_posicao(ciphertext, tabelas, periodo, top_n)
+
+        for chave, score_ngramas in gerar_chaves(ciphertext, letras_por_pos, tabelas, feixe):
+            texto = vigenere_decrypt(ciphertext, chave)
+            score_vocab = score_por_vocabulario(texto, automato)
+            score_freq = score_por_frequencia(texto)
+            score_total = PESO_NGRAMAS * score_ngramas + PESO_VOCAB * score_vocab + PESO_FREQ * score_freq
+            adicionar(coletor, score_total, (score_total, chave, texto), texto)
+        resultados += melhores(coletor)
+
+    return resultados
 
 # Execução
 if __name__ == "__main__":
     ciphertext = 'zrzbwrikyidhjzgpsifymfyhjakilvcfimhttjbajwhzujkrixkhykpbggnxxtuczmgumzchoopxrosxnfpyvcuoumepubtgxskxhfzzvdvccikrvdqxcgfr'
     vocabulario = carregar_vocabulario_arquivo("avesso_da_pele.txt")
+    tabelas = modelo_do_corpus("avesso_da_pele.txt")
+
+    for periodo, score, ioc in estimar_periodos(ciphertext):
+        print(f"Período {periodo}: score {score:.2f} | IoC das colunas {ioc:.4f}")
 
-    resultados = quebrar_vigenere(ciphertext, vocabulario, key_len=20, top_n=20, limite=300000)
+    resultados = quebrar_vigenere(ciphertext, vocabulario, tabelas, top_n=20, feixe=500)
 
     for i, (score, chave, texto) in enumerate(resultados, 1):
         print(f"\n🔍 Tentativa #{i}")
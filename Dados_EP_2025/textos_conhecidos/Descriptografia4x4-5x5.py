@@ -1,11 +1,22 @@
 import numpy as np
 import string
-import unicodedata
-import re
-import random
 import os
+import sys
 from collections import Counter
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modelo_ngramas import modelo_do_corpus
+from hill_linhas import quebrar_hill_por_linhas
+from hill_subida import quebrar_hill_por_subida
+from hill_triangular import quebrar_hill_triangular
+from automato_palavras import compilar_automato, maior_prefixo
+from segmentacao import carregar_vocabulario_com_frequencia
+from algebra_modular import inversa_mod_26, inversas_mod_26_lote
+from hill_vetorizado import decifrar_lote
+from filtros import aplicar_filtros, qui_quadrado_lote, ngramas_lote
+from chaves_testadas import abrir_registro, contem, adicionar, registrar_boas, fechar
+from melhores import novo_coletor, adicionar_lote, limiar, melhores
+
 ALPHABET = string.ascii_uppercase
 MOD = 26
 
@@ -23,7 +34,7 @@ def decrypt_hill(ciphertext, key_matrix):
     while len(ciphertext) % 4 != 0:
         ciphertext += 'X'
 
-    inv_key = matrix_mod_inv(key_matrix, MOD)
+    inv_key = inversa_mod_26(key_matrix)
     if inv_key is None:
         return None
 
@@ -35,54 +46,29 @@ def decrypt_hill(ciphertext, key_matrix):
 
     return plaintext
 
-def matrix_mod_inv(matrix, mod):
-    try:
-        det = int(round(np.linalg.det(matrix))) % mod
-        det_inv = modinv(det, mod)
-        if det_inv is None:
-            return None
-        adjugate = np.round(det * np.linalg.inv(matrix)).astype(int) % mod
-        return (det_inv * adjugate) % mod
-    except:
-        return None
-
-def modinv(a, m):
-    a = a % m
-    for x in range(1, m):
-        if (a * x) % m == 1:
-            return x
-    return None
-
-def generate_random_invertible_4x4_matrices(qtd=1000):
-    matrices = []
-    chaves_str = set()
-    tentativas = 0
-    while len(matrices) < qtd and tentativas < qtd * 10:
-        mat = np.random.randint(0, 26, size=(4, 4))
-        det = int(round(np.linalg.det(mat))) % 26
-        if det != 0 and modinv(det, 26) is not None:
-            chave_str = matriz_para_str(mat)
-            if chave_str not in chaves_str:
-                matrices.append(mat)
-                chaves_str.add(chave_str)
-        tentativas += 1
-    return matrices
-
-
-def segmentar_texto(texto, vocab):
+def generate_random_invertible_4x4_matrices(qtd=1000, rng=None):
+    # sorteia em lotes e fica com as invertíveis mod 26 (pouco mais de 1 em cada 4)
+    rng = np.random.default_rng() if rng is None else rng
+    matrices = [np.zeros((0, 4, 4), dtype=np.int64)]
+    faltam = qtd
+    while faltam > 0:
+        lote = rng.integers(0, MOD, size=(4 * faltam, 4, 4))
+        _, invertiveis = inversas_mod_26_lote(lote)
+        matrices.append(lote[invertiveis][:faltam])
+        faltam -= len(matrices[-1])
+    return np.concatenate(matrices)
+
+def segmentar_texto(texto, automato):
+    # Maior palavra (3 a 15 letras) que começa em i, achada descendo a trie uma vez
     texto = texto.upper()
     i = 0
     palavras = []
     while i < len(texto):
-        encontrada = False
-        for j in range(min(len(texto), i + 15), i + 2, -1):
-            palavra = texto[i:j]
-            if palavra in vocab:
-                palavras.append(palavra)
-                i = j
-                encontrada = True
-                break
-        if not encontrada:
+        palavra = maior_prefixo(automato, texto, i, min_len=3, max_len=15)
+        if palavra is not None:
+            palavras.append(palavra)
+            i += len(palavra)
+        else:
             i += 1
     return palavras
 
@@ -95,8 +81,9 @@ def vogal_bonus(text):
     proporcao = num_vogais / total
     return int(proporcao * 100)
 
-def count_vocab_matches(text, vocab_freq, original_ciphertext):
-    palavras = segmentar_texto(text, vocab_freq)
+def count_vocab_matches(text, automato, original_ciphertext):
+    vocab_freq = automato['vocabulario']
+    palavras = segmentar_texto(text, automato)
     contagem = Counter(palavras)
     score = 0
 
@@ -116,90 +103,111 @@ def count_vocab_matches(text, vocab_freq, original_ciphertext):
 
 
 
-def salvar_matriz(nome_arquivo, matriz):
-    with open(nome_arquivo, "a") as f:
-        flat = ','.join(map(str, matriz.flatten()))
-        f.write(flat + "\n")
-
-def carregar_matrizes(nome_arquivo):
-    if not os.path.exists(nome_arquivo):
-        return set()
-    with open(nome_arquivo, "r") as f:
-        return set(line.strip() for line in f.readlines())
-
-def matriz_para_str(matriz):
-    return ','.join(map(str, matriz.flatten()))
-
-def break_hill_with_vocab(ciphertext, vocab_freq, max_matrices=10000):
+def break_hill_with_vocab(ciphertext, vocab_freq, tabelas, max_matrices=10000, tamanho_lote=20000):
+    # Amostragem aleatória: 26^16 chaves 4x4 não cabem numa varredura em ordem (que ficaria
+    # para sempre nas matrizes de primeira linha quase nula). Para 5x5 e para as chaves do
+    # GeraEP1, break_hill_por_linhas e break_hill_triangular
     ciphertext = clean_text(ciphertext)
-    best_score = float('-inf')
-    best_plain = ""
-    best_key = None
-
-    ruins = carregar_matrizes("matrizes_ruins.txt")
-    boas = carregar_matrizes("matrizes_boas.txt")
+    automato = compilar_automato(vocab_freq)
+    blocos = np.array(text_to_vector(ciphertext + 'X' * (-len(ciphertext) % 4))).reshape(-1, 4)
+
+    # O qui-quadrado das letras descarta 99% de cada lote antes dos bigramas, e só as melhores
+    # chegam à contagem de vocabulário, cujo score é o que o coletor compara entre lotes
+    etapas = [
+        (qui_quadrado_lote(tabelas[0]), 0.01),
+        (ngramas_lote(tabelas[1]), 20),
+        (lambda lote: [count_vocab_matches(vector_to_text(t), automato, ciphertext) for t in lote], 20),
+    ]
+
+    registro = abrir_registro("chaves_testadas", ciphertext, 4)
     print(f"Gerando e testando até {max_matrices} matrizes 4x4 invertíveis...")
 
-    matrices = generate_random_invertible_4x4_matrices(max_matrices)
+    # Lotes de tamanho fixo: a memória não depende de max_matrices
+    coletor = novo_coletor(1)
+    testadas = 0
+    for inicio in range(0, max_matrices, tamanho_lote):
+        quantidade = min(tamanho_lote, max_matrices - inicio)
+
+        # chaves já testadas para este cifrado (em execuções anteriores) são trocadas por outras
+        # sorteadas; depois de algumas tentativas, o lote segue com as que sobraram
+        chaves = np.zeros((0, 4, 4), dtype=np.int64)
+        for _ in range(10):
+            novas = generate_random_invertible_4x4_matrices(quantidade - len(chaves))
+            chaves = np.concatenate([chaves, novas[~contem(registro, novas)]])
+            if len(chaves) == quantidade:
+                break
+        if not len(chaves):
+            continue
 
-    melhores_chaves = set()
-    melhores_textos = set()
+        inversas, _ = inversas_mod_26_lote(chaves)
+        textos = decifrar_lote(blocos, inversas).reshape(len(chaves), -1)
+        sobreviventes, scores = aplicar_filtros(textos, etapas)
 
-    for i, key in enumerate(matrices):
-        key_str = matriz_para_str(key)
-        if key_str in ruins or key_str in boas:
-            continue
+        # todo o lote entra no registro de uma vez; as que acharam alguma palavra ficam também à parte
+        adicionar(registro, chaves)
+        registrar_boas(registro, chaves[sobreviventes[np.asarray(scores) > 0]])
+        testadas += len(chaves)
 
-        plain = decrypt_hill(ciphertext, key)
-        if plain is None:
-            continue
+        def montar(i):
+            texto = vector_to_text(textos[sobreviventes[i]])
+            return (chaves[sobreviventes[i]], texto), texto
+        adicionar_lote(coletor, scores, montar)
+        print(f"{testadas} matrizes testadas... Melhor score: {limiar(coletor)}")
+    fechar(registro)
 
-        if plain.count('W') > 1 or plain.count('Y') > 1 or plain.count('K') > 2:
-            salvar_matriz("matrizes_ruins.txt", key)
-            continue
+    resultados = melhores(coletor)
+    if not resultados:
+        return None, ""
+    return resultados[0]
 
-        score = count_vocab_matches(plain, vocab_freq, ciphertext)
 
-        if score == 0:
-            salvar_matriz("matrizes_ruins.txt", key)
-        else:
-            salvar_matriz("matrizes_boas.txt", key)
+def break_hill_por_linhas(ciphertext, k, vocab_freq, tabela_bi, top=10):
+    # Busca determinística: cada linha da inversa é pontuada separadamente e
+    # só as melhores combinações passam pela contagem de vocabulário
+    ciphertext = clean_text(ciphertext)
+    candidatos = quebrar_hill_por_linhas(ciphertext, k, tabela_bi, top=top)
+    if not candidatos:
+        return None, ""
 
-        # Só atualiza se o score for melhor e a chave e texto ainda não foram usados
-        if score > best_score and key_str not in melhores_chaves and plain not in melhores_textos:
-            best_score = score
-            best_plain = plain
-            best_key = key
-            melhores_chaves.add(key_str)
-            melhores_textos.add(plain)
+    automato = compilar_automato(vocab_freq)
+    melhor = max(candidatos, key=lambda c: count_vocab_matches(c[2].upper(), automato, ciphertext))
+    return np.array(melhor[1]), melhor[2].upper()
 
-        if i % 100 == 0:
-            print(best_plain[:100])
-            print(f"{i} matrizes testadas... Melhor score até agora: {best_score}")
 
-    return best_key, best_plain
+def break_hill_por_subida(ciphertext, k, vocab_freq, tabela_bi, top=10, reinicios=50, tempo_maximo=None):
+    # Busca local na inversa: cada movimento muda uma linha, e só os bigramas da coluna
+    # correspondente são repontuados; as melhores chaves passam pela contagem de vocabulário
+    ciphertext = clean_text(ciphertext)
+    candidatos = quebrar_hill_por_subida(ciphertext, k, tabela_bi, reinicios=reinicios, top=top,
+                                         tempo_maximo=tempo_maximo)
+    if not candidatos:
+        return None, ""
 
+    automato = compilar_automato(vocab_freq)
+    melhor = max(candidatos, key=lambda c: count_vocab_matches(c[2].upper(), automato, ciphertext))
+    return np.array(melhor[1]), melhor[2].upper()
 
-def carregar_vocabulario_com_frequencia(caminho_arquivo):
-    with open(caminho_arquivo, 'r', encoding='latin-1') as f:
-        texto = f.read()
 
-    texto = unicodedata.normalize('NFD', texto)
-    texto = texto.encode('ascii', 'ignore').decode('latin-1')
+def break_hill_triangular(ciphertext, k, vocab_freq, tabela_bi, top=10):
+    # Chaves do GeraEP1 (triangulares superiores): a inversa é recuperada linha a linha,
+    # de baixo para cima, e o vocabulário escolhe entre as melhores
+    ciphertext = clean_text(ciphertext)
+    candidatos = quebrar_hill_triangular(ciphertext, k, tabela_bi, top=top)
+    if not candidatos:
+        return None, ""
 
-    palavras = re.findall(r'\b[a-zA-Z]{3,}\b', texto)
-    palavras = [p.upper() for p in palavras]
+    automato = compilar_automato(vocab_freq)
+    melhor = max(candidatos, key=lambda c: count_vocab_matches(c[2].upper(), automato, ciphertext))
+    return np.array(melhor[1]), melhor[2].upper()
 
-    contagem = Counter(palavras)
-    return dict(contagem)  # retorna dicionário palavra->frequência
 
 if __name__ == "__main__":
     ciphertext = "gaigmwrcbgzczweanigkdctvdjeczwnnxwxecfqvgqoclxxniyckxfuapigubwvgasrubgxahtobwcckxfuajoeuzevgsarbezapcotakylekauewhygieiu"
 
     vocab_freq = carregar_vocabulario_com_frequencia("avesso_da_pele.txt")
     print(f"Vocabulário carregado com {len(vocab_freq)} palavras.")
-    print(vocab_freq)
-    key, plain = break_hill_with_vocab(ciphertext, vocab_freq, max_matrices=3000000)
+    tabela_bi = modelo_do_corpus("avesso_da_pele.txt")[1]
+    key, plain = break_hill_por_linhas(ciphertext, 4, vocab_freq, tabela_bi)
 
     print("\nMelhor matriz chave encontrada:")
     print(key)
@@ -207,5 +215,5 @@ if __name__ == "__main__":
     print(plain)
 
     print("\nPalavras segmentadas encontradas:")
-    palavras = segmentar_texto(plain, vocab_freq)
+    palavras = segmentar_texto(plain, compilar_automato(vocab_freq))
     print(palavras)
@@ -1,5 +1,8 @@
 import re
 import os
+import json
+import time
+import argparse
 from unidecode import unidecode
 import numpy as np
 import string
@@ -157,6 +160,103 @@ def enc_vigenere(conteudo,tamanho,grupo,k):
 	save_file('Aberto/Vigenere/' + grupo + '_' + str(k) + '_' +  'texto_aberto.txt',''.join(texto_aberto))
 
 
+# ------------------- Geração em lote -------------------
+# Para medir os quebradores precisamos de milhares de amostras rotuladas: o corpus é lido
+# uma vez e todos os textos de uma cifra/tamanho de chave são cifrados de uma vez com NumPy.
+# Saída: <saida>.npz (arrays uint8 com letras 0..25) e <saida>.json (manifesto).
+
+UNIDADES_26 = np.array([x for x in range(1, 26) if math.gcd(x, 26) == 1])
+
+def parse_diretorio(diretorio):
+	# todos os .txt do diretório, já normalizados como em parse() e convertidos para 0..25
+	nomes = sorted(arquivo for arquivo in os.listdir(diretorio) if arquivo.endswith('.txt'))
+	textos = []
+	for nome in nomes:
+		conteudo = parse(os.path.join(diretorio, nome))
+		textos.append(np.frombuffer(conteudo.encode('ascii'), dtype=np.uint8) - ord('a'))
+	return nomes, textos
+
+def amostrar_trechos(textos, tamanho, quantidade, rng):
+	# sorteia o arquivo (proporcional ao número de trechos possíveis) e a posição dentro dele
+	possiveis = np.array([max(len(t) - tamanho + 1, 0) for t in textos])
+	if possiveis.sum() == 0:
+		raise ValueError(f'nenhum arquivo tem {tamanho} letras')
+	arquivos = rng.choice(len(textos), size=quantidade, p=possiveis / possiveis.sum())
+	posicoes = (rng.random(quantidade) * possiveis[arquivos]).astype(np.int64)
+
+	inicios = np.concatenate([[0], np.cumsum([len(t) for t in textos])[:-1]])
+	todos = np.concatenate(textos)
+	abertos = todos[(inicios[arquivos] + posicoes)[:, None] + np.arange(tamanho)]
+	return abertos, arquivos, posicoes
+
+def lote_mono(abertos, rng):
+	# chave[i] = letra cifrada da letra clara i (mesmo formato de Aberto/Mono/*_key.txt)
+	chaves = np.argsort(rng.random((len(abertos), 26)), axis=1).astype(np.uint8)
+	cifrados = np.take_along_axis(chaves, abertos.astype(np.int64), axis=1)
+	return chaves, cifrados
+
+def lote_hill(abertos, k, rng):
+	# triangular superior com diagonal de unidades mod 26, como em enc_hill: o determinante
+	# é o produto da diagonal, sempre invertível, e não há sorteio repetido
+	n, tamanho = abertos.shape
+	if tamanho % k:
+		raise ValueError(f'o tamanho {tamanho} não é múltiplo de k = {k}')
+	chaves = np.triu(rng.integers(0, 26, (n, k, k)))
+	diagonal = np.arange(k)
+	chaves[:, diagonal, diagonal] = rng.choice(UNIDADES_26, (n, k))
+	blocos = abertos.reshape(n, -1, k).astype(np.int64)
+	cifrados = np.einsum('nij,nbj->nbi', chaves, blocos) % 26
+	return chaves.astype(np.uint8), cifrados.reshape(n, tamanho).astype(np.uint8)
+
+def lote_vigenere(abertos, k, rng):
+	n, tamanho = abertos.shape
+	chaves = rng.integers(0, 26, (n, k)).astype(np.uint8)
+	repetidas = np.tile(chaves, (1, -(-tamanho // k)))[:, :tamanho]
+	cifrados = (abertos.astype(np.int64) + repetidas) % 26
+	return chaves, cifrados.astype(np.uint8)
+
+def gerar_lote(diretorio, saida, quantidade=1000, tamanho=120, hill=(2, 3, 4, 5), vigenere=(20, 30, 40, 60), semente=None):
+	"""Gera `quantidade` triplas (texto aberto, chave, texto cifrado) por cifra e tamanho de chave.
+
+	No .npz, cada conjunto <nome> (mono, hill_<k>, vigenere_<k>) tem <nome>_aberto,
+	<nome>_cifrado, <nome>_chave e, para rastrear a origem, <nome>_arquivo e <nome>_posicao.
+	"""
+	if semente is None:
+		semente = random.randrange(2 ** 32)
+	rng = np.random.default_rng(semente)
+	inicio = time.time()
+	nomes, textos = parse_diretorio(diretorio)
+
+	geradores = [('mono', lambda abertos: lote_mono(abertos, rng))]
+	geradores += [(f'hill_{k}', lambda abertos, k=k: lote_hill(abertos, k, rng)) for k in hill]
+	geradores += [(f'vigenere_{k}', lambda abertos, k=k: lote_vigenere(abertos, k, rng)) for k in vigenere]
+
+	arrays = {}
+	conjuntos = {}
+	for nome, cifrar in geradores:
+		abertos, arquivos, posicoes = amostrar_trechos(textos, tamanho, quantidade, rng)
+		chaves, cifrados = cifrar(abertos)
+		arrays.update({nome + '_aberto': abertos, nome + '_cifrado': cifrados, nome + '_chave': chaves,
+		               nome + '_arquivo': arquivos.astype(np.int32), nome + '_posicao': posicoes})
+		conjuntos[nome] = {'quantidade': quantidade, 'chave': list(chaves.shape[1:])}
+
+	np.savez_compressed(saida + '.npz', **arrays)
+	manifesto = {
+		'semente': semente,
+		'tamanho': tamanho,
+		'arquivos': [{'nome': nome, 'letras': len(texto)} for nome, texto in zip(nomes, textos)],
+		'conjuntos': conjuntos,
+		'formato': {
+			'letras': 'uint8, a = 0 ... z = 25',
+			'mono': 'chave[i] = letra cifrada da letra clara i',
+			'hill': 'bloco cifrado = chave @ bloco aberto (mod 26), blocos consecutivos de k letras',
+			'vigenere': 'cifrado[i] = aberto[i] + chave[i % k] (mod 26)',
+		},
+		'tempo': time.time() - inicio,
+	}
+	save_file(saida + '.json', json.dumps(manifesto, ensure_ascii=False, indent=2))
+	return manifesto
+
 def main():
 
 	group = 'Grupo12'
@@ -208,5 +308,17 @@ def main():
 	enc_vigenere(conteudo,120,group,k)
 
 if __name__ == "__main__":
-    main()
+	# sem argumentos: gera os arquivos do EP; com --lote: gera um conjunto grande para testes
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--lote', metavar='SAIDA', help='prefixo do .npz/.json do conjunto de testes')
+	parser.add_argument('--diretorio', default='textos')
+	parser.add_argument('--quantidade', type=int, default=1000)
+	parser.add_argument('--tamanho', type=int, default=120)
+	parser.add_argument('--semente', type=int)
+	args = parser.parse_args()
+	if args.lote:
+		manifesto = gerar_lote(args.diretorio, args.lote, args.quantidade, args.tamanho, semente=args.semente)
+		print(f"{len(manifesto['conjuntos'])} conjuntos de {args.quantidade} amostras em {manifesto['tempo']:.1f}s")
+	else:
+		main()
 
@@ -1,8 +1,16 @@
+import os
 import string
-from itertools import product
-from math import gcd
+import sys
 from unidecode import unidecode
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from algebra_modular import inversa_mod_26
+from hill_vetorizado import quebrar_hill_2x2
+from modelo_ngramas import modelo_do_corpus
+from segmentacao import carregar_vocabulario_com_frequencia, modelo_segmentacao, score_segmentacao, segmentar
+from filtros import qui_quadrado_lote, ngramas_lote
+from melhores import novo_coletor, adicionar, melhores
+
 # Alfabeto e mapeamentos
 alpha = string.ascii_lowercase
 alpha_map = {letter: idx for idx, letter in enumerate(alpha)}
@@ -14,26 +22,6 @@ def text_to_numbers(text):
 def numbers_to_text(numbers):
     return ''.join([reverse_alpha_map[num] for num in numbers])
 
-def mod_inverse(a, m):
-    for i in range(1, m):
-        if (a * i) % m == 1:
-            return i
-    return None
-
-def matrix_inverse(matrix, mod=26):
-    det = (matrix[0][0]*matrix[1][1] - matrix[0][1]*matrix[1][0]) % mod
-    if gcd(det, mod) != 1:
-        return None
-    det_inv = mod_inverse(det, mod)
-    if det_inv is None:
-        return None
-    adj = [[matrix[1][1], -matrix[0][1]], [-matrix[1][0], matrix[0][0]]]
-    inv = [
-        [(det_inv * adj[0][0]) % mod, (det_inv * adj[0][1]) % mod],
-        [(det_inv * adj[1][0]) % mod, (det_inv * adj[1][1]) % mod]
-    ]
-    return inv
-
 def matrix_multiply(matrix, vector, mod=26):
     return [
         [(matrix[0][0] * vector[0][0] + matrix[0][1] * vector[1][0]) % mod],
@@ -41,9 +29,10 @@ def matrix_multiply(matrix, vector, mod=26):
     ]
 
 def decrypt(ciphertext, key_matrix, mod=26):
-    key_inverse = matrix_inverse(key_matrix, mod)
+    key_inverse = inversa_mod_26(key_matrix)
     if key_inverse is None:
         return None
+    key_inverse = key_inverse.tolist()
     ciphertext_numbers = text_to_numbers(ciphertext)
     if len(ciphertext_numbers) % 2 != 0:
         ciphertext_numbers.append(0)  # padding com 'a'
@@ -54,75 +43,37 @@ def decrypt(ciphertext, key_matrix, mod=26):
         plaintext_numbers.extend([decrypted_block[0][0], decrypted_block[1][0]])
     return numbers_to_text(plaintext_numbers)
 
-def carregar_vocabulario_arquivo(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        palavras = set()
-        for linha in f:
-            palavra = linha.strip().lower()
-            palavra = unidecode(palavra)
-            palavra = ''.join(c for c in palavra if c in alpha)
-            if palavra:
-                palavras.add(palavra)
-    return palavras
-
-def segmentar_texto(texto, vocabulario, max_desconhecidas=2):
-    n = len(texto)
-    dp = [None] * (n + 1)
-    desconhecidas = [float('inf')] * (n + 1)
-    dp[0] = []
-    desconhecidas[0] = 0
-
-    for i in range(1, n + 1):
-        for j in range(max(0, i - 20), i):
-            palavra = texto[j:i]
-            if dp[j] is not None:
-                nova_lista = dp[j] + [palavra if palavra in vocabulario else f'??{palavra}??']
-                novo_contador = desconhecidas[j] + (0 if palavra in vocabulario else 1)
-                if novo_contador < desconhecidas[i]:
-                    dp[i] = nova_lista
-                    desconhecidas[i] = novo_contador
-    return dp[n]
-
-def brute_force_hill(ciphertext, vocabulario, max_results=10):
-    resultados = []
-
-    for key in product(range(26), repeat=4):
-        key_matrix = [[key[0], key[1]], [key[2], key[3]]]
-        if matrix_inverse(key_matrix) is None:
-            continue
-
-        decrypted = decrypt(ciphertext, key_matrix)
-        if not decrypted:
-            continue
-        
+def brute_force_hill(ciphertext, modelo, tabelas, max_results=10):
+    # Decifra com todas as chaves de uma vez (NumPy): o qui-quadrado das letras descarta
+    # 99% de cada lote, os bigramas escolhem as melhores e só essas são segmentadas (Viterbi);
+    # a lista de palavras só é montada para as exibidas
+    etapas = [(qui_quadrado_lote(tabelas[0]), 0.01), (ngramas_lote(tabelas[1]), max_results)]
+    coletor = novo_coletor(max_results, deduplicar=True)
+    for score, key_matrix, decrypted in quebrar_hill_2x2(ciphertext, tabelas[1], top=max_results, etapas=etapas):
         texto = ''.join(c for c in unidecode(decrypted) if c in alpha)
-        segmentacao = segmentar_texto(texto, vocabulario)
-        if segmentacao is None:
-            continue
-
-        desconhecidas_count = sum(1 for palavra in segmentacao if palavra.startswith('??') and palavra.endswith('??'))
-        num_palavras = len(segmentacao)
-        qualidade = num_palavras - desconhecidas_count * 2
-
-        resultados.append({
+        qualidade = score_segmentacao(texto, modelo)
+        adicionar(coletor, (qualidade, score), {
             'key': key_matrix,
             'decrypted': decrypted,
+            'texto': texto,
+            'score': score,
             'qualidade': qualidade,
-            'segmentacao': segmentacao
-        })
+        }, texto)
 
+    resultados = melhores(coletor)
     if not resultados:
         print("❌ Nenhuma chave encontrada.")
         return
 
-    resultados.sort(key=lambda x: x['qualidade'], reverse=True)
+    for res in resultados[:max_results]:
+        res['segmentacao'] = segmentar(res['texto'], modelo)[1]
 
     print(f"\n🔍 Top {min(max_results, len(resultados))} resultados:\n")
     with open('melhores_resultados.txt', 'w', encoding='utf-8') as f:
         for i, res in enumerate(resultados[:max_results], 1):
             texto_segmentado = ' '.join(res['segmentacao'])
             saida = (
-                f"#{i} - Chave: {res['key']} | Qualidade: {res['qualidade']}\n"
+                f"#{i} - Chave: {res['key']} | Qualidade: {res['qualidade']:.2f}\n"
                 f"Texto decifrado (início): {res['decrypted'][:300]}...\n"
                 f"Segmentação: {texto_segmentado[:500]}{'...' if len(texto_segmentado) > 500 else ''}\n\n"
             )
@@ -130,16 +81,18 @@ def brute_force_hill(ciphertext, vocabulario, max_results=10):
             f.write(saida)
 
     for i, res in enumerate(resultados[:max_results], 1):
-        print(f"#{i} - Chave: {res['key']} | Qualidade: {res['qualidade']}")
+        print(f"#{i} - Chave: {res['key']} | Qualidade: {res['qualidade']:.2f}")
         print(f"Texto decifrado (início): {res['decrypted'][:300]}...")
         print(f"Segmentação: {res['segmentacao'][:10]}{'...' if len(res['segmentacao']) > 10 else ''}")
         print()
 
 # --- Uso ---
 ciphertext = "naiywkyaoqkymkroehgaqycyxaxkfogqrkzolaxkvhirgqsyfotbkilaualnsyeaxcfaqsfaprqhcrdkkyscehvowkzoeafcwtmpevgqrkiugnouqoxuwaua"
-vocabulario = carregar_vocabulario_arquivo('palavras.txt')
+vocabulario = carregar_vocabulario_com_frequencia('palavras.txt', encoding='utf-8')
+modelo = modelo_segmentacao(vocabulario)
+tabelas = modelo_do_corpus('palavras.txt', encoding='utf-8')
 
 print("✅ Palavras no vocabulário:", len(vocabulario))
-print("🧪 Teste segmentação:", segmentar_texto(ciphertext, vocabulario))
+print("🧪 Teste segmentação:", segmentar(ciphertext, modelo)[1])
 
-brute_force_hill(ciphertext, vocabulario)
+brute_force_hill(ciphertext, modelo, tabelas)
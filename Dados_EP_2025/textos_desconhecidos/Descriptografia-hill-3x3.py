@@ -1,79 +1,117 @@
 import numpy as np
-import random
-from multiprocessing import Pool, cpu_count
+import os
+import sys
+from multiprocessing import Pool, cpu_count, get_all_start_methods, get_context
 from tqdm import tqdm
 import unidecode
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modelo_ngramas import modelo_do_corpus
+from hill_linhas import quebrar_hill_por_linhas
+from alfabeto import MOD, array_para_texto
+from automato_palavras import compilar_automato, maior_prefixo, pontuar, pontuar_lote
+from algebra_modular import inversa_mod_26, inversas_mod_26_lote
+from enumerador_hill import enumerar_invertiveis, avancar, tamanho_espaco, carregar_posicao, salvar_posicao
+from hill_vetorizado import decifrar_lote
+from melhores import novo_coletor, adicionar, limiar, melhores
+
 def carregar_vocabulario(caminho):
     with open(caminho, 'r', encoding='utf-8') as f:
         palavras = set(unidecode.unidecode(l.strip().lower()) for l in f if len(l.strip()) >= 3)
     return {p: min(len(p)**2, 100) for p in palavras if len(p) >= 4}
 
-def gerar_chave_eficiente():
-    while True:
-        m = np.random.randint(0, 26, size=(3, 3))
-        m[0, 0] = m[1, 1] = m[2, 2] = random.choice([1, 3, 5, 7, 9, 11, 15, 17, 19, 21, 23, 25])
-        det = int(round(np.linalg.det(m))) % 26
-        if det % 2 != 0:
-            return tuple(m.flatten())
-
-def avaliacao_rapida(texto, vocabulario):
-    score = 0
-    palavras_encontradas = set()
-    for tamanho in range(4, 9):
-        for i in range(len(texto) - tamanho + 1):
-            palavra = texto[i:i+tamanho]
-            if palavra in vocabulario and palavra not in palavras_encontradas:
-                score += vocabulario[palavra]
-                palavras_encontradas.add(palavra)
-    return score
-
-def busca_inteligente(ciphertext, vocabulario, num_chaves=20000, num_processos=None):
+def automato_avaliacao(vocabulario):
+    # avaliacao_rapida só conta palavras de 4 a 8 letras
+    return compilar_automato({p: s for p, s in vocabulario.items() if 4 <= len(p) <= 8})
+
+def avaliacao_rapida(texto, automato):
+    # Soma dos pesos das palavras distintas do texto, achadas em uma passada pelo autômato
+    return pontuar(automato, texto)
+
+# Estado de cada processo: o autômato e os blocos do cifrado chegam uma única vez
+_automato = None
+_blocos = None
+_tamanho = None
+
+def _iniciar_trabalhador(automato, blocos, tamanho):
+    global _automato, _blocos, _tamanho
+    _automato = automato
+    _blocos = blocos
+    _tamanho = tamanho
+
+def _criar_pool(num_processos, automato, blocos, tamanho):
+    # com fork os trabalhadores herdam os globais já preenchidos (copy-on-write, sem pickle);
+    # nos outros métodos de início eles vão uma vez por processo pelo inicializador
+    _iniciar_trabalhador(automato, blocos, tamanho)
+    if 'fork' in get_all_start_methods():
+        return get_context('fork').Pool(num_processos)
+    return Pool(num_processos, initializer=_iniciar_trabalhador, initargs=(automato, blocos, tamanho))
+
+def testar_intervalo(args):
+    """Testa todas as chaves invertíveis de posição em [inicio, fim) e devolve só as `top` melhores."""
+    inicio, fim, top = args
+    coletor = novo_coletor(top)
+    testadas = 0
+    for chaves, _ in enumerar_invertiveis(3, inicio, fim):
+        inversas, _ = inversas_mod_26_lote(chaves)
+        textos = decifrar_lote(_blocos, inversas).reshape(len(chaves), -1)[:, :_tamanho]
+        testadas += len(chaves)
+        # pontuar_lote conta palavras repetidas, então nunca fica abaixo da contagem exata:
+        # só os textos que por ele ainda superam o limiar do coletor são pontuados de verdade
+        cotas = pontuar_lote(_automato, textos)
+        for i in np.flatnonzero(cotas > max(limiar(coletor), 0)):
+            if not cotas[i] > limiar(coletor):
+                continue
+            texto = array_para_texto(textos[i])
+            score = avaliacao_rapida(texto, _automato)
+            adicionar(coletor, score, (score, tuple(chaves[i].ravel().tolist()), texto))
+    return melhores(coletor), testadas
+
+def busca_inteligente(ciphertext, vocabulario, num_chaves=20000, num_processos=None, ponto_de_controle=None,
+                      top=10, posicoes_por_tarefa=8 * MOD ** 3):
+    """Testa as próximas `num_chaves` chaves 3x3 invertíveis, em ordem (todas, se None); com
+    `ponto_de_controle` (um arquivo), cada chamada continua de onde a anterior parou.
+
+    O intervalo de posições é dividido em tarefas de `posicoes_por_tarefa`; cada trabalhador
+    enumera, decifra e pontua as chaves da sua tarefa em lote e devolve só o seu top local.
+    """
     if num_processos is None:
         num_processos = cpu_count() - 1 or 1
     ciphertext = ''.join(c for c in ciphertext.lower() if c.isalpha())
-
-    args = [(gerar_chave_eficiente(), ciphertext, vocabulario) for _ in range(num_chaves)]
-
-    resultados = []
-    with Pool(num_processos) as pool:
-        for score, chave, texto in tqdm(pool.imap_unordered(testar_chave_otimizado, args),
-                                        total=num_chaves, desc="Testando chaves"):
-            if score > 0:
-                resultados.append((score, chave, texto))
-    return sorted(resultados, key=lambda x: x[0], reverse=True)[:10]
-
-def testar_chave_otimizado(args):
-    chave, ciphertext, vocabulario = args
-    try:
-        m = np.array(chave).reshape(3, 3)
-        texto = descriptografar_hill_otimizado(ciphertext, m)
-        if texto:
-            score = avaliacao_rapida(texto, vocabulario)
-            return (score, chave, texto)
-    except Exception:
-        pass
-    return (0, None, None)
-
-def matriz_inversa_modular(mat, mod):
-    det = int(round(np.linalg.det(mat))) % mod
-    if det % 2 == 0:
-        return None
-    try:
-        inv_det = pow(det, -1, mod)
-    except ValueError:
-        return None
-
-    cof = np.zeros((3, 3), dtype=int)
-    for r in range(3):
-        for c in range(3):
-            minor = np.delete(np.delete(mat, r, axis=0), c, axis=1)
-            cof[r, c] = ((-1) ** (r + c)) * int(round(np.linalg.det(minor))) % mod
-
-    return (inv_det * cof.T) % mod
-
-def descriptografar_hill_otimizado(texto, chave_matriz):
-    inv_chave = matriz_inversa_modular(chave_matriz, 26)
+    nums = np.array([ord(c) - ord('a') for c in ciphertext])
+    blocos = np.concatenate([nums, np.full(-len(nums) % 3, 4)]).reshape(-1, 3)  # padding com 'e' = 4
+
+    inicio = carregar_posicao(ponto_de_controle) if ponto_de_controle else 0
+    fim = tamanho_espaco(3) if num_chaves is None else avancar(3, inicio, num_chaves)
+    n_tarefas = -(-(fim - inicio) // posicoes_por_tarefa)
+
+    def tarefas(primeira, quantas):
+        for t in range(primeira, min(primeira + quantas, n_tarefas)):
+            de = inicio + t * posicoes_por_tarefa
+            yield de, min(de + posicoes_por_tarefa, fim), top
+
+    coletor = novo_coletor(top)
+    testadas = 0
+    # as tarefas vão em rodadas (o Pool consome o iterável inteiro de uma vez) e em ordem,
+    # para que o ponto de controle só avance sobre intervalos já concluídos
+    rodada = 16 * num_processos
+    with _criar_pool(num_processos, automato_avaliacao(vocabulario), blocos, len(nums)) as pool, \
+            tqdm(total=n_tarefas, desc="Testando intervalos de chaves") as progresso:
+        for primeira in range(0, n_tarefas, rodada):
+            for (de, ate, _), (locais, n) in zip(tarefas(primeira, rodada),
+                                               pool.imap(testar_intervalo, tarefas(primeira, rodada))):
+                for resultado in locais:
+                    adicionar(coletor, resultado[0], resultado)
+                testadas += n
+                progresso.update(1)
+                if ponto_de_controle:
+                    salvar_posicao(ponto_de_controle, ate)
+    print(f"{testadas} chaves testadas")
+    return melhores(coletor)
+
+def descriptografar_hill_otimizado(texto, chave_matriz, inv_chave=None):
+    if inv_chave is None:
+        inv_chave = inversa_mod_26(chave_matriz)
     if inv_chave is None:
         return None
     letras = np.array([ord(c) - ord('a') for c in texto], dtype=np.int8)
@@ -84,16 +122,14 @@ def descriptografar_hill_otimizado(texto, chave_matriz):
     decifrado = (vetores @ inv_chave.T) % 26
     return ''.join(chr(c + ord('a')) for c in decifrado.flatten())[:len(texto)]
 
-def segmentar_texto_rapido(texto, vocabulario, max_len=8):
+def segmentar_texto_rapido(texto, automato, max_len=8):
     palavras = []
     i = 0
     while i < len(texto):
-        for j in range(min(i + max_len, len(texto)), i, -1):
-            palavra = texto[i:j]
-            if palavra in vocabulario:
-                palavras.append(palavra)
-                i = j
-                break
+        palavra = maior_prefixo(automato, texto, i, max_len=max_len)
+        if palavra is not None:
+            palavras.append(palavra)
+            i += len(palavra)
         else:
             palavras.append(texto[i])
             i += 1
@@ -106,9 +142,12 @@ if __name__ == "__main__":
 
     print("Carregando vocabulário...")
     vocabulario = carregar_vocabulario(caminho_vocabulario)
+    automato = compilar_automato(vocabulario)
+
+    tabela_bi = modelo_do_corpus(caminho_vocabulario, encoding='utf-8')[1]
 
-    print("\nIniciando ataque...")
-    resultados = busca_inteligente(ciphertext, vocabulario, num_chaves=50000)
+    print("\nIniciando ataque por linhas da inversa...")
+    resultados = quebrar_hill_por_linhas(ciphertext, 3, tabela_bi, top=10)
 
     print("\nTop 3 resultados:")
     for i, (score, chave, texto) in enumerate(resultados[:3], 1):
@@ -117,4 +156,4 @@ if __name__ == "__main__":
         for linha in np.array(chave).reshape(3, 3):
             print(linha)
         print(f"\nTexto: {texto[:100]}...")
-        print(f"Segmentação: {' '.join(segmentar_texto_rapido(texto[:50], vocabulario))}...")
+        print(f"Segmentação: {' '.join(segmentar_texto_rapido(texto[:50], automato))}...")
@@ -1,47 +1,49 @@
 import math
+import os
 import random
 import string
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from alfabeto import texto_para_array
+from modelo_ngramas import modelo_do_corpus, pontuar
+from mono_incremental import (PARES, preparar_termos, score_completo, iniciar_deltas,
+                              atualizar_deltas, trocar, mapa_de_chave_decifragem, chave_decifragem_de_mapa)
+from reinicios_paralelos import anelamento_paralelo
+from automato_palavras import compilar_automato, ocorrencias
 
 def carregar_vocabulario(caminho='palavras.txt'):
     with open(caminho, 'r', encoding='utf-8') as f:
         return set(line.strip().lower() for line in f if line.strip())
 
-def carregar_bigramas(caminho='bigrams.txt'):
-    bigramas = {}
-    with open(caminho, 'r', encoding='utf-8') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) == 2:
-                bigramas[parts[0]] = float(parts[1])
-    return bigramas
+def carregar_bigramas(caminho='palavras.txt'):
+    # Tabela 26x26 de log-probabilidades lida do modelo compilado (mmap)
+    return modelo_do_corpus(caminho, encoding='utf-8')[1]
 
-MIN_PROB = 1e-10
+def score_bigram(texto, tabela_bigramas):
+    numeros = texto_para_array(texto)
+    if len(numeros) < 2:
+        return -float('inf')
+    return pontuar(numeros, tabela_bigramas) / (len(numeros) - 1)
 
-def score_bigram(texto, bigram_freq):
-    texto = texto.lower()
-    score = 0.0
-    total = 0
-    for i in range(len(texto) - 1):
-        bg = texto[i:i+2]
-        if any(c not in string.ascii_lowercase for c in bg):
-            continue
-        p = bigram_freq.get(bg, MIN_PROB)
-        score += math.log(p)
-        total += 1
-    return score / total if total > 0 else -float('inf')
-
-def segmentar_e_pontuar(texto, vocab, max_len=20):
+def automato_segmentacao(vocab, max_len=20):
+    # segmentar_e_pontuar só usa palavras de 4 a max_len letras
+    return compilar_automato(p for p in vocab if 4 <= len(p) <= max_len)
+
+def segmentar_e_pontuar(texto, automato):
     texto = texto.lower()
     n = len(texto)
+    # palavras que terminam em cada posição, achadas em uma passada pelo autômato
+    terminam_em = [[] for _ in range(n + 1)]
+    for inicio, palavra in ocorrencias(automato, texto):
+        terminam_em[inicio + len(automato['palavras'][palavra])].append(inicio)
     dp = [0]*(n+1)
-    print(f'texto {texto}')
     for i in range(1, n+1):
         melhor = 0
-        for j in range(max(0, i - max_len), i):
-            if texto[j:i] in vocab and len(texto[j:i]) >= 4:
-                pontuacao = dp[j] + (i - j)  # soma comprimento palavra
-                if pontuacao > melhor:
-                    melhor = pontuacao
+        for j in terminam_em[i]:
+            pontuacao = dp[j] + (i - j)  # soma comprimento palavra
+            if pontuacao > melhor:
+                melhor = pontuacao
         dp[i] = max(dp[i-1], melhor)  # permite "não palavra" contando caractere isolado como zero
 
     
@@ -59,48 +61,52 @@ def chave_inicial(seed=None):
     random.shuffle(letras)
     return ''.join(letras)
 
-def trocar_letras(chave_str, i, j):
-    # troca caracteres na posição i e j
-    lista = list(chave_str)
-    lista[i], lista[j] = lista[j], lista[i]
-    return ''.join(lista)
-
-def simulated_annealing(texto_cifrado, vocab, bigram_freq, max_iter=500000,
+def simulated_annealing(texto_cifrado, automato, bigram_freq, max_iter=500000,
                         temp_init=5.0, temp_final=0.01, alpha=0.995, seed=42):
 
     random.seed(seed)
 
+    # A cadeia anda só pelo score de bigramas, atualizado por delta a cada troca
+    # (uma troca aceita só refaz os deltas dos n-gramas que ela mexe);
+    # a segmentação (cara) só entra quando a cadeia bate o próprio recorde
+    termos = preparar_termos(texto_cifrado, [bigram_freq])
+    n_bigramas = len(texto_cifrado) - 1
+
     chave_atual = chave_inicial(seed)
+    mapa = mapa_de_chave_decifragem(chave_atual)
     texto_atual = decodificar(texto_cifrado, chave_atual)
-    score_big = score_bigram(texto_atual, bigram_freq)
-    score_seg = segmentar_e_pontuar(texto_atual, vocab)
+    score_big = score_completo(mapa, termos) / n_bigramas
+    score_seg = segmentar_e_pontuar(texto_atual, automato)
     print(f'score_big:{score_big} score_seg:{score_seg}')
-    score_atual = 0.7 * score_big + 0.3 * (score_seg / len(texto_atual))  # normalizado
+    score_atual = 0.7 * score_big
+    estado = iniciar_deltas(mapa, termos)
+    recorde_cadeia = score_atual
     melhor_chave = chave_atual
-    melhor_score = score_atual
+    melhor_score = score_atual + 0.3 * (score_seg / len(texto_atual))  # normalizado
 
     temperatura = temp_init
-    letras = string.ascii_lowercase
 
     for iter in range(max_iter):
-        i, j = random.sample(range(26), 2)
-        nova_chave = trocar_letras(chave_atual, i, j)
-        novo_texto = decodificar(texto_cifrado, nova_chave)
-        score_big = score_bigram(novo_texto, bigram_freq)
-        score_seg = segmentar_e_pontuar(novo_texto, vocab)
-        score_novo = 0.7 * score_big + 0.3 * (score_seg / len(novo_texto))
-
-        delta = score_novo - score_atual
+        par = random.randrange(len(PARES))
+        delta = 0.7 * estado['deltas'][par] / n_bigramas
 
         if delta > 0 or math.exp(delta / temperatura) > random.random():
-            chave_atual = nova_chave
-            score_atual = score_novo
-
-            if score_novo > melhor_score:
-                melhor_score = score_novo
-                melhor_chave = nova_chave
-                print(f'Iter {iter} | Melhor score: {melhor_score:.5f}')
-                print(f'Trecho texto: {novo_texto[:80]}')
+            trocar(mapa, *PARES[par])
+            score_atual += delta
+            atualizar_deltas(estado, mapa, termos, *PARES[par])
+
+            if score_atual > recorde_cadeia:
+                recorde_cadeia = score_atual
+                nova_chave = chave_decifragem_de_mapa(mapa)
+                novo_texto = decodificar(texto_cifrado, nova_chave)
+                score_seg = segmentar_e_pontuar(novo_texto, automato)
+                score_novo = score_atual + 0.3 * (score_seg / len(novo_texto))
+
+                if score_novo > melhor_score:
+                    melhor_score = score_novo
+                    melhor_chave = nova_chave
+                    print(f'Iter {iter} | Melhor score: {melhor_score:.5f}')
+                    print(f'Trecho texto: {novo_texto[:80]}')
 
         temperatura = max(temp_final, temperatura * alpha)
 
@@ -110,10 +116,21 @@ def main():
     texto_cifrado = 'dstnpwhwrtwzmntudwjiffblmjpfndhitblmlmjmlwnzwstunmjwfmdstnmlptwimlwnwlufntbutlmwzufbiwhdbtlwlmhflwnzfbbfhdzimiflmzsfztfz'
 
     vocab = carregar_vocabulario('palavras.txt')
-    bigram_freq = carregar_bigramas('bigrams.txt')
-
-    print('Iniciando simulated annealing...')
-    melhor_chave = simulated_annealing(texto_cifrado, vocab, bigram_freq)
+    automato = automato_segmentacao(vocab)
+    bigram_freq = carregar_bigramas('palavras.txt')
+
+    print('Iniciando simulated annealing em paralelo...')
+    # As cadeias andam só pelos bigramas; a segmentação desempata as melhores chaves distintas
+    resultados = anelamento_paralelo(texto_cifrado, [bigram_freq], top=10)
+    n_bigramas = len(texto_cifrado) - 1
+    melhor_chave, melhor_score = None, -float('inf')
+    for r in resultados:
+        score_seg = segmentar_e_pontuar(r['texto'], automato)
+        score = 0.7 * r['score'] / n_bigramas + 0.3 * (score_seg / len(r['texto']))
+        print(f"Score: {score:.5f} | {r['tempo']:.1f}s{' (interrompida)' if r['interrompida'] else ''}")
+        if score > melhor_score:
+            melhor_chave, melhor_score = chave_decifragem_de_mapa(r['mapa']), score
+    print(f"Tempo total: {resultados[0]['tempo_total']:.1f}s")
 
     texto_decifrado = decodificar(texto_cifrado, melhor_chave)
     print('\nTexto decifrado completo:')
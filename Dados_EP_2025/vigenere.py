@@ -0,0 +1,210 @@
+import numpy as np
+
+from alfabeto import ALPHABET, FREQ_PT, MOD, texto_para_array, array_para_texto
+
+# Tamanhos de chave usados pelo GeraEP1.enc_vigenere
+PERIODOS_GERAEP1 = (20, 30, 40, 60)
+
+
+def chave_para_array(chave):
+    return np.array([ALPHABET.index(c) for c in chave.lower()])
+
+
+def decifrar_vigenere(ciphertext, chave):
+    nums = texto_para_array(ciphertext)
+    deslocamentos = np.resize(chave_para_array(chave), len(nums))
+    return array_para_texto((nums - deslocamentos) % MOD)
+
+
+def distribuicao_diferencas(freq=FREQ_PT):
+    """diferencas[d] = P(y - x = d) para duas letras claras x e y independentes."""
+    probs = np.array([freq.get(c, 0.01) for c in ALPHABET], dtype=np.float64)
+    probs /= probs.sum()
+    return np.array([probs @ np.roll(probs, -d) for d in range(MOD)])
+
+
+def por_deslocamento(nums, valores):
+    """soma[d] = soma de valores[(nums[i + d] - nums[i]) % 26] em i, para todo d de uma vez."""
+    n = len(nums)
+    i, j = np.triu_indices(n, 1)
+    return np.bincount(j - i, weights=valores[(nums[j] - nums[i]) % MOD], minlength=n)
+
+
+def estimar_periodos(ciphertext, candidatos=PERIODOS_GERAEP1, freq=FREQ_PT):
+    """Ordena os tamanhos de chave candidatos do mais ao menos provável.
+
+    Duas letras a distância múltipla do período p usam a mesma letra da chave, que se
+    cancela na diferença: c[j] - c[i] = p[j] - p[i] segue a distribuição das diferenças do
+    português; nas outras distâncias, a chave espalha as diferenças por igual. O score de p
+    é a log-razão de verossimilhança dessas duas hipóteses em todos os pares a distância
+    múltipla de p. Ele é comparável entre períodos: um múltiplo do período real perde os
+    pares das distâncias que só o período real tem, e um divisor paga pelos pares ao acaso.
+    Retorna uma lista de (período, score, ioc das colunas).
+    """
+    nums = texto_para_array(ciphertext)
+    n = len(nums)
+    razoes = por_deslocamento(nums, np.log(distribuicao_diferencas(freq) * MOD))
+    iguais = np.zeros(MOD)
+    iguais[0] = 1
+    coincidencias = por_deslocamento(nums, iguais)
+    pares = n - np.arange(n)
+
+    medidas = []
+    for p in candidatos:
+        if p >= n:
+            continue
+        multiplos = np.arange(p, n, p)
+        medidas.append((p, float(razoes[multiplos].sum()),
+                        float(coincidencias[multiplos].sum() / pares[multiplos].sum())))
+    return sorted(medidas, key=lambda m: -m[1])
+
+
+def chi_quadrado_por_coluna(nums, k, tabela_mono):
+    """chi2[i, s] = qui-quadrado da coluna i decifrada com o deslocamento s contra o modelo.
+
+    As contagens de todas as colunas saem de um único bincount; o deslocamento s só
+    reindexa as contagens (letra clara x vem da cifrada x + s).
+    """
+    colunas = np.arange(len(nums)) % k
+    contagens = np.bincount(colunas * MOD + nums, minlength=k * MOD).reshape(k, MOD)
+    indices = (np.arange(MOD)[None, :] + np.arange(MOD)[:, None]) % MOD  # [s, x] = x + s
+    observados = contagens[:, indices]  # (k, 26 deslocamentos, 26 letras)
+    esperados = contagens.sum(axis=1)[:, None, None] * np.exp(tabela_mono)[None, None, :]
+    return ((observados - esperados) ** 2 / esperados).sum(axis=2)
+
+
+def score_bigramas(nums, tabela_bi):
+    # aceita um texto (n,) ou um lote de textos (m, n)
+    return tabela_bi[nums[..., :-1], nums[..., 1:]].sum(axis=-1)
+
+
+def score_bi_trigramas(nums, tabela_bi, tabela_tri):
+    return (score_bigramas(nums, tabela_bi)
+            + tabela_tri[nums[..., :-2], nums[..., 1:-1], nums[..., 2:]].sum(axis=-1))
+
+
+def subida_por_coordenadas(nums, deslocamentos, tabela_bi, max_voltas=20):
+    """Refina a chave coluna a coluna: cada coluna recebe o deslocamento que maximiza os
+    bigramas do texto inteiro com as demais fixas, até nenhuma coluna mudar.
+    """
+    k = len(deslocamentos)
+    deslocamentos = np.array(deslocamentos)
+    candidatos = np.arange(MOD)
+    for _ in range(max_voltas):
+        mudou = False
+        for i in range(k):
+            claro = (nums - np.resize(deslocamentos, len(nums))) % MOD
+            lote = np.repeat(claro[None, :], MOD, axis=0)
+            lote[:, i::k] = (nums[i::k][None, :] - candidatos[:, None]) % MOD
+            melhor = int(score_bigramas(lote, tabela_bi).argmax())
+            if melhor != deslocamentos[i]:
+                deslocamentos[i] = melhor
+                mudou = True
+        if not mudou:
+            break
+    return deslocamentos
+
+
+def quebrar_vigenere_por_colunas(ciphertext, k, tabela_mono, tabela_bi=None):
+    """Deslocamento de menor qui-quadrado em cada coluna, refinado pelos bigramas se houver tabela.
+
+    Retorna (score, chave, texto decifrado); o score é o dos bigramas quando há tabela_bi.
+    """
+    nums = texto_para_array(ciphertext)
+    chi2 = chi_quadrado_por_coluna(nums, k, tabela_mono)
+    deslocamentos = chi2.argmin(axis=1)
+    if tabela_bi is None:
+        score = -float(chi2[np.arange(k), deslocamentos].sum())
+    else:
+        deslocamentos = subida_por_coordenadas(nums, deslocamentos, tabela_bi)
+        score = float(score_bigramas((nums - np.resize(deslocamentos, len(nums))) % MOD, tabela_bi))
+    chave = array_para_texto(deslocamentos)
+    return score, chave, decifrar_vigenere(ciphertext, chave)
+
+
+def busca_em_feixe(nums, k, tabelas, feixe=500, candidatos_por_posicao=None):
+    """Monta chaves posição a posição, guardando os `feixe` melhores prefixos.
+
+    Um prefixo de j letras decifra as colunas 0..j-1; ao acrescentar a posição j somam-se,
+    em cada bloco do período, o trigrama (ou bigrama/monograma no início) que termina nela.
+    Trigramas que atravessam a fronteira entre blocos entram só no score final, com o texto
+    inteiro. Retorna (chaves (B, k), scores) em ordem decrescente.
+    """
+    tabela_mono, tabela_bi, tabela_tri = tabelas[0], tabelas[1], tabelas[2]
+    if candidatos_por_posicao is None:
+        candidatos_por_posicao = [np.arange(MOD)] * k
+
+    chaves = np.zeros((1, 0), dtype=np.int64)
+    scores = np.zeros(1)
+    for j in range(k):
+        posicoes = np.arange(j, len(nums), k)
+        candidatos = np.asarray(candidatos_por_posicao[j])
+        # claro[c, m] = letra clara da m-ésima posição da coluna j com o candidato c
+        claro = (nums[posicoes][None, :] - candidatos[:, None]) % MOD
+        if j == 0:
+            ganho = tabela_mono[claro].sum(axis=1)[None, :]
+        else:
+            anterior = (nums[posicoes - 1][None, :] - chaves[:, j - 1:j]) % MOD  # (B, m)
+            if j == 1:
+                ganho = tabela_bi[anterior[:, None, :], claro[None, :, :]].sum(axis=2)
+            else:
+                antes = (nums[posicoes - 2][None, :] - chaves[:, j - 2:j - 1]) % MOD
+                ganho = tabela_tri[antes[:, None, :], anterior[:, None, :], claro[None, :, :]].sum(axis=2)
+
+        total = (scores[:, None] + ganho).reshape(-1)
+        manter = min(feixe, len(total))
+        melhores = np.argpartition(total, -manter)[-manter:]
+        prefixo, candidato = np.divmod(melhores, len(candidatos))
+        chaves = np.concatenate([chaves[prefixo], candidatos[candidato][:, None]], axis=1)
+        scores = total[melhores]
+
+    scores = score_bi_trigramas(decifrar_lote(nums, chaves), tabela_bi, tabela_tri)
+    ordem = np.argsort(scores)[::-1]
+    return chaves[ordem], scores[ordem]
+
+
+def decifrar_lote(nums, chaves):
+    # chaves: (B, k) -> textos claros (B, n); cada linha da chave é repetida ao longo do texto
+    repeticoes = -(-len(nums) // chaves.shape[1])
+    return (nums[None, :] - np.tile(chaves, (1, repeticoes))[:, :len(nums)]) % MOD
+
+
+def quebrar_vigenere_em_feixe(ciphertext, k, tabelas, feixe=500, top=5):
+    """Busca em feixe mais as soluções por coluna; tudo é comparado pelo score de bi+trigramas.
+
+    A subida por bigramas é aplicada à melhor chave do feixe e à solução do qui-quadrado,
+    e as duas entram na disputa. Retorna uma lista de (score, chave, texto decifrado).
+    """
+    nums = texto_para_array(ciphertext)
+    chaves, _ = busca_em_feixe(nums, k, tabelas, feixe)
+    chi2 = chi_quadrado_por_coluna(nums, k, tabelas[0])
+    refinadas = [subida_por_coordenadas(nums, chaves[0], tabelas[1]),
+                 subida_por_coordenadas(nums, chi2.argmin(axis=1), tabelas[1])]
+    chaves = np.unique(np.concatenate([chaves[:top], refinadas]), axis=0)
+
+    scores = score_bi_trigramas(decifrar_lote(nums, chaves), tabelas[1], tabelas[2])
+    resultados = []
+    for i in np.argsort(scores)[::-1][:top]:
+        chave = array_para_texto(chaves[i])
+        resultados.append((float(scores[i]), chave, decifrar_vigenere(ciphertext, chave)))
+    return resultados
+
+
+if __name__ == "__main__":
+    # Uso: python vigenere.py textos_conhecidos textos_desconhecidos
+    # Confere estimar_periodos com o k do nome de cada arquivo de <raiz>/Cifrado/Vigenere
+    import os
+    import sys
+    from processar_lote import descobrir_tarefas
+
+    for raiz in sys.argv[1:]:
+        tarefas = descobrir_tarefas(raiz, ('Vigenere',))
+        erros = []
+        for tarefa in tarefas:
+            with open(os.path.join(raiz, tarefa['arquivo']), 'r') as f:
+                estimado = estimar_periodos(f.read())[0][0]
+            if estimado != tarefa['k']:
+                erros.append(f"{tarefa['arquivo']}: {estimado}")
+        print(f"{raiz}: período certo em {len(tarefas) - len(erros)}/{len(tarefas)}")
+        for erro in erros:
+            print(f"  {erro}")
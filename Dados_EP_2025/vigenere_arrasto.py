@@ -0,0 +1,251 @@
+import numpy as np
+
+from alfabeto import MOD, texto_para_array, array_para_texto
+from melhores import novo_coletor, adicionar, melhores
+from segmentacao import modelo_segmentacao, score_segmentacao, segmentar
+from vigenere import decifrar_lote
+
+# Arrasto de palavras prováveis (crib dragging) para chaves longas (40 e 60 letras em 120):
+# com duas ou três letras por coluna, a estatística de cada coluna não diz nada. Supor que a
+# palavra w está na posição s fixa a chave nas posições (s + i) % k, com chave = c - w (a
+# mesma conta de descobrir_chave_vigenere). Como a chave se repete, essas letras também
+# decifram os ecos do trecho, k, 2k... posições antes ou depois: se a palavra estiver certa,
+# os ecos são português; se não, letras ao acaso. Todas as palavras de um tamanho são
+# testadas em todas as posições de uma vez, e os fragmentos de chave cujos ecos convencem
+# viram bônus numa busca em feixe pela chave, posição a posição: cada prefixo ganha os
+# n-gramas (até a ordem das tabelas) de todas as voltas e o bônus de cada fragmento que ele
+# reproduz. Fragmentos compatíveis se somam; incompatíveis disputam o feixe.
+# Com tão poucas letras por coluna, os n-gramas sozinhos preferem chaves erradas (texto
+# localmente plausível, sem palavras); quem decide é a segmentação em palavras do
+# vocabulário: as melhores chaves do feixe sobem por trocas de letras e de fragmentos
+# inteiros enquanto o texto se segmentar melhor.
+
+LOG_MOD = np.log(MOD)
+
+# Teto do ganho de cada letra: o modelo vem de um corpus pequeno e premia demais as frases
+# que decorou, e sem teto a busca troca duas voltas em lixo por uma volta dessas
+TETO = 1.0
+
+# Confiança do resultado. Com menos de 3 letras por coluna da chave (k = 60 em 120 letras),
+# a subida encaixa palavras em quase qualquer chave: nos cifrados de textos_conhecidos, o
+# texto sai com mais de 90% das letras em palavras e mais da metade delas erradas. Com 3 ou
+# mais, as decifragens erradas deixam mais letras fora de palavras que as certas.
+MINIMO_POR_COLUNA = 3
+COBERTURA_MINIMA = 0.85
+
+
+def preparar_palavras(vocabulario, quantidade=3000, min_len=4, max_len=10):
+    """As `quantidade` palavras mais frequentes, agrupadas por tamanho: {L: palavras (m, L)}."""
+    escolhidas = sorted(((freq, palavra.lower()) for palavra, freq in vocabulario.items()
+                         if min_len <= len(palavra) <= max_len), reverse=True)[:quantidade]
+    grupos = {}
+    for _, palavra in escolhidas:
+        grupos.setdefault(len(palavra), []).append(texto_para_array(palavra))
+    return {tamanho: np.array(lista, dtype=np.int64) for tamanho, lista in grupos.items()}
+
+
+def condicionais(claro, contexto, tabelas, teto=TETO):
+    """log P(letra | `contexto` letras anteriores) + log 26 em cada posição (claro (..., n)), até `teto`.
+
+    contexto (..., n) diz quantas letras anteriores valem (0 até a ordem das tabelas - 1);
+    nas posições sem tantas letras antes, o contexto é cortado.
+    """
+    n = claro.shape[-1]
+    resultado = tabelas[0][claro] + LOG_MOD
+    for ordem in range(1, len(tabelas)):
+        indices = [claro[..., ordem - d:n - d] for d in range(ordem, -1, -1)]
+        valor = np.full(claro.shape, -np.inf)
+        valor[..., ordem:] = tabelas[ordem][tuple(indices)] - tabelas[ordem - 1][tuple(indices[:-1])] + LOG_MOD
+        resultado = np.where(contexto >= ordem, valor, resultado)
+    return np.minimum(resultado, teto)
+
+
+def razao_verossimilhanca(claro, conhecidas, tabelas, teto=TETO):
+    """Log da razão de verossimilhança (modelo contra letras ao acaso) das letras conhecidas.
+
+    Cada letra conhecida é condicionada às conhecidas imediatamente anteriores (até a ordem das tabelas).
+    """
+    contexto = np.zeros(conhecidas.shape, dtype=np.int64)
+    seguidas = np.zeros(conhecidas.shape[:-1], dtype=np.int64)
+    for i in range(conhecidas.shape[-1]):
+        contexto[..., i] = seguidas
+        seguidas = np.where(conhecidas[..., i], np.minimum(seguidas + 1, len(tabelas) - 1), 0)
+    return (condicionais(claro, contexto, tabelas, teto) * conhecidas).sum(axis=-1)
+
+
+def arrastar_palavras(nums, k, palavras, tabelas, ganho_minimo=0.0):
+    """Testa cada palavra em cada posição do cifrado e devolve os fragmentos de chave que convencem.
+
+    O ganho de um encaixe é a razão de verossimilhança dos seus ecos (o texto que a mesma
+    parte da chave decifra nas outras voltas). Cada fragmento é (coluna inicial da chave,
+    letras da chave (L,), ganho), só dos encaixes que não dão a volta na chave e com
+    ganho acima de `ganho_minimo`.
+    """
+    n = len(nums)
+    deslocamentos = [m for m in range(-(n // k) * k, n, k) if m != 0]
+    fragmentos = []
+    for tamanho, lista in palavras.items():
+        if tamanho > min(n, k):
+            continue
+        inicios = np.array([s for s in range(n - tamanho + 1) if s % k + tamanho <= k])
+        posicoes = inicios[:, None] + np.arange(tamanho)[None, :]  # (S, L)
+        chaves = (nums[posicoes][None, :, :] - lista[:, None, :]) % MOD  # (m, S, L): chave = c - w
+
+        ganhos = np.zeros(chaves.shape[:2])
+        for m in deslocamentos:
+            eco = posicoes + m
+            dentro = (eco >= 0) & (eco < n)
+            if not dentro.any():
+                continue
+            claro = (nums[np.clip(eco, 0, n - 1)][None] - chaves) % MOD
+            ganhos += razao_verossimilhanca(claro, np.broadcast_to(dentro, claro.shape), tabelas)
+
+        palavra, inicio = np.nonzero(ganhos > ganho_minimo)
+        for p, s in zip(palavra, inicio):
+            fragmentos.append((int(inicios[s] % k), chaves[p, s], float(ganhos[p, s])))
+    return fragmentos
+
+
+def tabela_de_bonus(fragmentos, k, bonus_por_letra):
+    """bonus[j] = {tamanho: (códigos ordenados, bônus)} dos fragmentos que terminam na coluna j.
+
+    O código de um fragmento são as suas letras da chave em base 26 (cabe em int64 até 13 letras).
+    """
+    por_fim = [dict() for _ in range(k)]
+    for coluna, letras, _ in fragmentos:
+        fim = coluna + len(letras) - 1
+        codigo = int(letras @ MOD ** np.arange(len(letras) - 1, -1, -1))
+        grupo = por_fim[fim].setdefault(len(letras), {})
+        grupo[codigo] = bonus_por_letra * len(letras)
+    bonus = []
+    for grupos in por_fim:
+        bonus.append({tamanho: (np.array(sorted(codigos)), np.array([codigos[c] for c in sorted(codigos)]))
+                      for tamanho, codigos in grupos.items()})
+    return bonus
+
+
+def somar_bonus(codigos, tabela):
+    # bônus de cada código (0 para os que não estão na tabela)
+    ordenados, valores = tabela
+    i = np.minimum(np.searchsorted(ordenados, codigos), len(ordenados) - 1)
+    return np.where(ordenados[i] == codigos, valores[i], 0.0)
+
+
+def busca_com_fragmentos(nums, k, tabelas, bonus, feixe=2000, teto=TETO):
+    """Monta a chave coluna a coluna, guardando os `feixe` melhores prefixos.
+
+    A letra j da chave decifra as posições j, j + k, j + 2k...; cada uma soma a probabilidade
+    condicional dada as letras anteriores da mesma volta (já decifradas pelo prefixo), e
+    cada fragmento que termina em j e bate com o fim do prefixo soma o seu bônus.
+    Retorna (chaves (B, k), scores) em ordem decrescente.
+    """
+    ordem_max = len(tabelas) - 1
+    candidatos = np.arange(MOD)
+    chaves = np.zeros((1, 0), dtype=np.int64)
+    scores = np.zeros(1)
+    for j in range(k):
+        posicoes = np.arange(j, len(nums), k)
+        h = min(j, ordem_max)
+        # janela (B, 26, R, h + 1): as h letras anteriores de cada volta e a nova
+        anteriores = (nums[posicoes[None, :] - np.arange(h, 0, -1)[:, None]][None]
+                      - chaves[:, j - h:j, None]) % MOD  # (B, h, R)
+        novas = (nums[posicoes][None, :] - candidatos[:, None]) % MOD  # (26, R)
+        janela = np.concatenate([np.broadcast_to(anteriores.transpose(0, 2, 1)[:, None],
+                                                 (len(chaves), MOD, len(posicoes), h)),
+                                 np.broadcast_to(novas[None, :, :, None], (len(chaves), MOD, len(posicoes), 1))],
+                                axis=3)
+        letras = (tabelas[h][tuple(np.moveaxis(janela, 3, 0))]
+                  - (tabelas[h - 1][tuple(np.moveaxis(janela[..., :-1], 3, 0))] if h else 0) + LOG_MOD)
+        ganho = np.minimum(letras, teto).sum(axis=2)
+
+        for tamanho, tabela in bonus[j].items():
+            if tamanho > j + 1:
+                continue
+            base = chaves[:, j - tamanho + 1:j] @ MOD ** np.arange(tamanho - 2, -1, -1)
+            ganho = ganho + somar_bonus(base[:, None] * MOD + candidatos[None, :], tabela)
+
+        total = (scores[:, None] + ganho).reshape(-1)
+        manter = min(feixe, len(total))
+        melhores = np.argpartition(total, -manter)[-manter:]
+        prefixo, candidato = np.divmod(melhores, MOD)
+        chaves = np.concatenate([chaves[prefixo], candidatos[candidato][:, None]], axis=1)
+        scores = total[melhores]
+
+    ordem = np.argsort(scores)[::-1]
+    return chaves[ordem], scores[ordem]
+
+
+def decifrar_com(nums, chave):
+    return array_para_texto(decifrar_lote(nums, np.asarray(chave)[None])[0])
+
+
+def subida_por_segmentacao(nums, chave, fragmentos, modelo):
+    """Troca letras da chave, uma a uma ou um fragmento inteiro de cada vez, enquanto a
+    melhor segmentação do texto em palavras do vocabulário melhorar. Devolve (chave, score).
+    """
+    k = len(chave)
+    chave = np.array(chave)
+    atual = score_segmentacao(decifrar_com(nums, chave), modelo)
+    movimentos = [(j, np.array([v])) for j in range(k) for v in range(MOD)]
+    movimentos += [(coluna, letras) for coluna, letras, _ in fragmentos]
+    melhorou = True
+    while melhorou:
+        melhorou = False
+        for coluna, letras in movimentos:
+            if (chave[coluna:coluna + len(letras)] == letras).all():
+                continue
+            nova = chave.copy()
+            nova[coluna:coluna + len(letras)] = letras
+            score = score_segmentacao(decifrar_com(nums, nova), modelo)
+            if score > atual + 1e-9:
+                chave, atual, melhorou = nova, score, True
+    return chave, atual
+
+
+def preparar_arrasto(vocabulario, quantidade=3000, min_len=4, max_len=10):
+    """Palavras do arrasto (as mais frequentes) e o modelo de segmentação do vocabulário inteiro."""
+    return {
+        'palavras': preparar_palavras(vocabulario, quantidade, min_len, max_len),
+        'segmentacao': modelo_segmentacao({palavra.lower(): freq for palavra, freq in vocabulario.items()}),
+    }
+
+
+def quebrar_vigenere_por_arrasto(ciphertext, k, tabelas, arrasto, top=5, feixe=2000, sementes=3, candidatas=200,
+                                 bonus_por_letra=2.0, ganho_minimo=3.0, fragmentos_na_subida=2000):
+    """Chaves de período k a partir das palavras prováveis (`arrasto` vem de preparar_arrasto).
+
+    Das `candidatas` melhores chaves da busca em feixe, as `sementes` que melhor se
+    segmentam em palavras passam pela subida, que também pode aplicar os
+    `fragmentos_na_subida` fragmentos de maior ganho. Retorna uma lista de
+    (score de segmentação, chave, texto decifrado).
+    """
+    nums = texto_para_array(ciphertext)
+    tabelas = [np.asarray(t, dtype=np.float64) for t in tabelas]
+    fragmentos = arrastar_palavras(nums, k, arrasto['palavras'], tabelas, ganho_minimo)
+    bonus = tabela_de_bonus(fragmentos, k, bonus_por_letra)
+    chaves, _ = busca_com_fragmentos(nums, k, tabelas, bonus, feixe)
+
+    modelo = arrasto['segmentacao']
+    scores = [score_segmentacao(decifrar_com(nums, chave), modelo) for chave in chaves[:candidatas]]
+    fragmentos = sorted(fragmentos, key=lambda f: -f[2])[:fragmentos_na_subida]
+    coletor = novo_coletor(top, deduplicar=True)
+    for i in np.argsort(scores)[::-1][:sementes]:
+        chave, score = subida_por_segmentacao(nums, chaves[i], fragmentos, modelo)
+        texto = decifrar_com(nums, chave)
+        adicionar(coletor, score, (score, array_para_texto(chave), texto), texto)
+    return melhores(coletor)
+
+
+def cobertura(texto, modelo):
+    """Fração das letras do texto que caem em palavras do vocabulário na melhor segmentação."""
+    _, palavras = segmentar(texto, modelo)
+    return sum(len(p) for p in palavras if not p.startswith('??')) / max(len(texto), 1)
+
+
+def confianca(texto, k, arrasto):
+    """'alta' ou 'baixa': baixa se há menos de MINIMO_POR_COLUNA letras por coluna da chave
+    ou se a segmentação cobre menos de COBERTURA_MINIMA do texto.
+    """
+    if len(texto) < MINIMO_POR_COLUNA * k:
+        return 'baixa'
+    return 'alta' if cobertura(texto, arrasto['segmentacao']) >= COBERTURA_MINIMA else 'baixa'